@@ -5,8 +5,11 @@ from PyQt6.QtWidgets import (
     QFrame, QMessageBox, QDialog, QFormLayout, QStackedWidget, QDateEdit
 )
 from PyQt6.QtCore import Qt, QDate
-import pymysql
-from datetime import datetime
+from db import (get_connection, get_sales_by_period, get_transactions_between,
+                get_product_sales)
+import catalog
+import metrics
+from datetime import date, datetime
 
 
 def safe_item(value):
@@ -139,9 +142,16 @@ class AdminsPanel(QWidget):
         self.reports_btn.clicked.connect(lambda: self.switch_view(self.reports_card, self.reports_btn))
 
         # Load data
+        self.store = catalog.get_store()
+        self.inventory_rows = {}  # product id -> inventory table row
         self.load_users()
         self.load_inventory()
 
+        # ✅ Keep the inventory table in step with the shared catalog store
+        self.store.rowChanged.connect(self.on_product_changed)
+        self.store.rowsInserted.connect(lambda ids: self.load_inventory())
+        self.store.rowsRemoved.connect(lambda ids: self.load_inventory())
+
     def switch_view(self, widget, btn):
         self.stack.setCurrentWidget(widget)
         self.user_btn.setChecked(False)
@@ -156,10 +166,7 @@ class AdminsPanel(QWidget):
 
     # ===== DB =====
     def db_connect(self):
-        return pymysql.connect(
-            host="localhost", user="root", password="",
-            database="techstore_pos", cursorclass=pymysql.cursors.DictCursor
-        )
+        return get_connection()
 
     # ===== User Management =====
     def create_user_management_card(self):
@@ -193,6 +200,7 @@ class AdminsPanel(QWidget):
 
         return card
 
+    @metrics.timed("admins")
     def load_users(self):
         try:
             conn = self.db_connect()
@@ -291,24 +299,26 @@ class AdminsPanel(QWidget):
 
         return card
 
+    @metrics.timed("admins")
     def load_inventory(self):
-        try:
-            conn = self.db_connect()
-            cur = conn.cursor()
-            cur.execute("SELECT id, name, stock FROM products ORDER BY id ASC")
-            rows = cur.fetchall()
-            conn.close()
-        except Exception as e:
-            print("⚠️ Error loading inventory:", e)
-            rows = []
+        rows = self.store.products()
 
         self.inventory_table.setRowCount(0)
+        self.inventory_rows = {}
         for row in rows:
             r = self.inventory_table.rowCount()
             self.inventory_table.insertRow(r)
             self.inventory_table.setItem(r, 0, safe_item(row.get("id")))
             self.inventory_table.setItem(r, 1, safe_item(row.get("name")))
             self.inventory_table.setItem(r, 2, safe_item(row.get("stock")))
+            self.inventory_rows[row.id] = r
+
+    def on_product_changed(self, pid):
+        r = self.inventory_rows.get(pid)
+        row = self.store.get(pid)
+        if r is not None and row is not None:
+            self.inventory_table.setItem(r, 1, safe_item(row.name))
+            self.inventory_table.setItem(r, 2, safe_item(row.stock))
 
     # ===== Transaction History =====
     def create_transaction_history_card(self):
@@ -392,35 +402,28 @@ class AdminsPanel(QWidget):
 
         return card
 
+    @metrics.timed("admins")
     def load_transactions(self):
         self.transaction_table.setRowCount(0)
         total_revenue = 0
         row_count = 0
 
         try:
-            conn = self.db_connect()
-            cur = conn.cursor()
-
             month = self.month_combo.currentIndex() + 1
             year = int(self.year_combo.currentText())
 
-            # Only select columns that exist: id, created_at, total
-            query = """
-                SELECT id, created_at, total
-                FROM transactions
-                WHERE MONTH(created_at) = %s AND YEAR(created_at) = %s
-                ORDER BY created_at DESC
-            """
-            cur.execute(query, (month, year))
-            rows = cur.fetchall()
-            conn.close()
+            # A date range instead of MONTH()/YEAR() on the column can use the index
+            start = date(year, month, 1)
+            end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+            # Streamed: rows go straight into the table without an intermediate list
+            rows = get_transactions_between(start, end, stream=True)
 
             for row in rows:
                 r = self.transaction_table.rowCount()
                 self.transaction_table.insertRow(r)
 
                 # Parse datetime
-                trans_date = row.get("created_at")
+                trans_date = row.get("transaction_date")
                 date_str = ""
                 time_str = ""
 
@@ -438,9 +441,9 @@ class AdminsPanel(QWidget):
                 self.transaction_table.setItem(r, 0, safe_item(row.get("id")))
                 self.transaction_table.setItem(r, 1, safe_item(date_str))
                 self.transaction_table.setItem(r, 2, safe_item(time_str))
-                self.transaction_table.setItem(r, 3, safe_item(f"₱{row.get('total', 0):.2f}"))
+                self.transaction_table.setItem(r, 3, safe_item(f"₱{row.get('total_amount', 0):.2f}"))
 
-                total_revenue += float(row.get("total", 0))
+                total_revenue += float(row.get("total_amount", 0))
                 row_count += 1
 
         except Exception as e:
@@ -576,19 +579,10 @@ class AdminsPanel(QWidget):
 
     def generate_daily_sales(self):
         try:
-            conn = self.db_connect()
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT DATE(created_at) as date, COUNT(*) as transactions, SUM(total) as total
-                FROM transactions
-                WHERE DATE(created_at) = CURDATE()
-                GROUP BY DATE(created_at)
-            """)
-            rows = cur.fetchall()
-            conn.close()
+            rows = get_sales_by_period("day", periods=0)
 
             if not rows:
-                rows = [{"date": QDate.currentDate().toString("yyyy-MM-dd"), "transactions": 0, "total": 0.00}]
+                rows = [{"period": QDate.currentDate().toString("yyyy-MM-dd"), "transactions": 0, "total": 0.00}]
 
             self.display_report(["Date", "Transactions", "Total Sales"], rows)
         except Exception as e:
@@ -596,22 +590,10 @@ class AdminsPanel(QWidget):
 
     def generate_monthly_sales(self):
         try:
-            conn = self.db_connect()
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT DATE_FORMAT(created_at, '%Y-%m') as month, 
-                       COUNT(*) as transactions, 
-                       SUM(total) as total
-                FROM transactions
-                GROUP BY DATE_FORMAT(created_at, '%Y-%m')
-                ORDER BY month DESC
-                LIMIT 12
-            """)
-            rows = cur.fetchall()
-            conn.close()
+            rows = get_sales_by_period("month", descending=True, limit=12)
 
             if not rows:
-                rows = [{"month": QDate.currentDate().toString("yyyy-MM"), "transactions": 0, "total": 0.00}]
+                rows = [{"period": QDate.currentDate().toString("yyyy-MM"), "transactions": 0, "total": 0.00}]
 
             self.display_report(["Month", "Transactions", "Total Sales"], rows)
         except Exception as e:
@@ -619,21 +601,10 @@ class AdminsPanel(QWidget):
 
     def generate_yearly_sales(self):
         try:
-            conn = self.db_connect()
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT YEAR(created_at) as year, 
-                       COUNT(*) as transactions, 
-                       SUM(total) as total
-                FROM transactions
-                GROUP BY YEAR(created_at)
-                ORDER BY year DESC
-            """)
-            rows = cur.fetchall()
-            conn.close()
+            rows = get_sales_by_period("year", descending=True)
 
             if not rows:
-                rows = [{"year": QDate.currentDate().year(), "transactions": 0, "total": 0.00}]
+                rows = [{"period": QDate.currentDate().year(), "transactions": 0, "total": 0.00}]
 
             self.display_report(["Year", "Transactions", "Total Sales"], rows)
         except Exception as e:
@@ -641,16 +612,7 @@ class AdminsPanel(QWidget):
 
     def generate_low_stock(self):
         try:
-            conn = self.db_connect()
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT id, name, stock, price
-                FROM products
-                WHERE stock < 10
-                ORDER BY stock ASC
-            """)
-            rows = cur.fetchall()
-            conn.close()
+            rows = [p.as_dict(("id", "name", "stock", "price")) for p in self.store.low_stock()]
 
             self.display_report(["Product ID", "Name", "Stock", "Price"], rows)
         except Exception as e:
@@ -658,15 +620,9 @@ class AdminsPanel(QWidget):
 
     def generate_stock_summary(self):
         try:
-            conn = self.db_connect()
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT id, name, stock, price, (stock * price) as value
-                FROM products
-                ORDER BY value DESC
-            """)
-            rows = cur.fetchall()
-            conn.close()
+            rows = [dict(p.as_dict(("id", "name", "stock", "price")), value=p.stock * p.price)
+                    for p in self.store.products()]
+            rows.sort(key=lambda r: r["value"], reverse=True)
 
             self.display_report(["Product ID", "Name", "Stock", "Price", "Total Value"], rows)
         except Exception as e:
@@ -674,19 +630,7 @@ class AdminsPanel(QWidget):
 
     def generate_product_sales(self):
         try:
-            conn = self.db_connect()
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT p.name as name, 
-                       SUM(ti.quantity) as total_sold,
-                       SUM(ti.quantity * ti.price) as revenue
-                FROM transaction_items ti
-                JOIN products p ON ti.product_id = p.id
-                GROUP BY p.id, p.name
-                ORDER BY revenue DESC
-            """)
-            rows = cur.fetchall()
-            conn.close()
+            rows = get_product_sales()
 
             if not rows:
                 QMessageBox.information(self, "No Data", "No product sales data available.")
@@ -696,6 +640,7 @@ class AdminsPanel(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to generate report: {str(e)}")
 
+    @metrics.timed("admins")
     def display_report(self, headers, data):
         self.report_table.setColumnCount(len(headers))
         self.report_table.setHorizontalHeaderLabels(headers)
@@ -0,0 +1,56 @@
+# archive.py
+"""
+Maintenance command for the hot/archive tiers.
+
+Moves sales older than the hot window (db.ARCHIVE_CONFIG["hot_months"], env
+POS_HOT_MONTHS) with their items and receipts into the archive tables, so the
+tables the tills and the dashboard use stay small. Reports that reach further
+back read both tiers on their own. Run it monthly, e.g. from cron or Task
+Scheduler; it is safe while the POS is in use.
+
+Usage (from the project folder):
+    python archive.py --status
+    python archive.py --roll
+    python archive.py --roll --before 2023-01-01
+"""
+import argparse
+import datetime
+import time
+
+import db
+
+
+def print_status():
+    stats = db.get_archive_stats()
+    print(f"Hot window: sales since {db.hot_since()}")
+    for tier, row in stats.items():
+        count = row.get("transactions") or 0
+        span = f"{row['oldest']} .. {row['newest']}" if count else "-"
+        print(f"  {tier:<8} {count:>12,} sales  {span}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Roll old sales into the archive tables")
+    parser.add_argument("--roll", action="store_true", help="archive sales older than the hot window")
+    parser.add_argument("--before", type=datetime.date.fromisoformat,
+                        help="archive only sales before this day (YYYY-MM-DD, at most the hot window start)")
+    parser.add_argument("--status", action="store_true", help="show row counts per tier")
+    args = parser.parse_args()
+    if not (args.roll or args.status):
+        parser.error("nothing to do; pass --roll and/or --status")
+
+    if not db.ensure_database():
+        raise SystemExit(1)
+    if args.roll:
+        start = time.perf_counter()
+        try:
+            moved = db.roll_archive(args.before)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"✓ Moved {moved:,} sales to the archive in {time.perf_counter() - start:.1f}s")
+    if args.status:
+        print_status()
+
+
+if __name__ == "__main__":
+    main()
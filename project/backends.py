@@ -0,0 +1,420 @@
+# backends.py
+"""
+Storage backends for db.py.
+
+A backend opens connections that behave like pymysql DictCursor connections
+(%s placeholders, dict rows, MySQL error codes in e.args[0]) plus streaming
+cursors for safe_query(fetch="iter"), creates and migrates the schema, and
+builds the SQL fragments whose syntax differs between engines (date
+bucketing and arithmetic):
+
+    mysql   MySQL/MariaDB server through pymysql (default)
+    sqlite  embedded SQLite file in WAL mode (see sqlite_standin.py) for
+            single-lane shops, test rigs and benchmarks; no server needed
+
+db.py picks one from DB_CONFIG["backend"] (env POS_DB_BACKEND).
+
+The builders return SQL for statements executed with a params tuple
+(safe_query and _execute always pass one), so literal % signs are doubled:
+
+    d = db.get_backend()
+    safe_query(f"SELECT {d.bucket('transaction_date', 'month')} AS period, ... "
+               f"WHERE transaction_date >= {d.since(12, 'month')} GROUP BY period", fetch="all")
+"""
+import hashlib
+import os
+
+import sqlite_standin
+
+BUCKET_UNITS = ("day", "week", "month", "year")
+
+# Tables with an archive tier (<table>_archive, see db.roll_archive) and the
+# columns copied between tiers; <table>_all views read both tiers
+TIERED_TABLES = {
+    "transactions": ("id", "transaction_date", "cashier_id", "cashier_name", "total_amount", "amount_paid",
+                     "change_amount", "sale_uuid", "items_summary", "item_count", "unit_count", "created_at"),
+    "transaction_items": ("id", "transaction_id", "product_id", "product_name", "product_barcode",
+                          "quantity", "unit_price", "subtotal"),
+    "receipts": ("id", "transaction_id", "frozen", "created_at"),
+}
+
+DEFAULT_ADMIN = ("admin", hashlib.sha256("admin123".encode()).hexdigest(), "admin", "System Administrator")
+
+# Databases created before the schema_version table existed hold the original
+# tables, i.e. version 1; every migration is applied to them
+UNVERSIONED_SCHEMA = 1
+
+
+def _check_unit(unit):
+    if unit not in BUCKET_UNITS:
+        raise ValueError(f"unknown date unit {unit!r}; expected one of {BUCKET_UNITS}")
+    return unit
+
+
+def tier_views():
+    """(Re)create the <table>_all views over the hot and archive tables"""
+    for table, columns in TIERED_TABLES.items():
+        columns = ", ".join(columns)
+        yield f"DROP VIEW IF EXISTS {table}_all"
+        yield (f"CREATE VIEW {table}_all AS SELECT {columns} FROM {table} "
+               f"UNION ALL SELECT {columns} FROM {table}_archive")
+
+
+def _run_migration(cursor, steps):
+    """Steps are SQL strings, or callables taking the cursor for data migrations"""
+    for step in steps:
+        if callable(step):
+            step(cursor)
+        else:
+            cursor.execute(step)
+
+
+# ===== MySQL =====
+class MySQLBackend:
+    name = "mysql"
+    explain = "EXPLAIN "
+
+    def __init__(self, config):
+        self.config = config
+
+    @staticmethod
+    def _pymysql():
+        """Import pymysql on first use so importing db stays cheap at startup"""
+        import pymysql
+        import pymysql.cursors
+        return pymysql
+
+    def _connect_args(self, database=True):
+        keys = ("host", "user", "password", "database", "connect_timeout") if database else \
+            ("host", "user", "password", "connect_timeout")
+        return {key: self.config[key] for key in keys if key in self.config}
+
+    def connect(self):
+        """Open a DictCursor connection to the POS database"""
+        pymysql = self._pymysql()
+        return pymysql.connect(**self._connect_args(), cursorclass=pymysql.cursors.DictCursor)
+
+    def streaming_cursor(self, conn):
+        """Unbuffered server-side cursor: rows are read off the socket as they are fetched"""
+        return conn.cursor(self._pymysql().cursors.SSDictCursor)
+
+    def describe(self):
+        return f"{self.config['host']}/{self.config['database']}"
+
+    def schema_version(self):
+        """
+        Recorded schema version; UNVERSIONED_SCHEMA for tables without a
+        version row, None when there are no tables (or no database) yet.
+        """
+        pymysql = self._pymysql()
+        conn = None
+        try:
+            conn = pymysql.connect(**self._connect_args())
+            cursor = conn.cursor()
+            version = None
+            cursor.execute("SHOW TABLES LIKE 'schema_version'")
+            if cursor.fetchone():
+                cursor.execute("SELECT MAX(version) FROM schema_version")
+                version = cursor.fetchone()[0]
+            if version is None:
+                cursor.execute("SHOW TABLES LIKE 'transactions'")
+                if cursor.fetchone():
+                    version = UNVERSIONED_SCHEMA
+            cursor.close()
+            return version
+        except pymysql.err.OperationalError as e:
+            if e.args and e.args[0] == 1049:  # unknown database
+                return None
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def initialize(self, current_version, target_version, migrations):
+        """
+        Create database and tables if they don't exist, then apply migrations
+        newer than current_version (None for a new database).
+        """
+        pymysql = self._pymysql()
+        conn = None
+        try:
+            # Connect without specifying database to create it if needed
+            conn = pymysql.connect(**self._connect_args(database=False), cursorclass=pymysql.cursors.DictCursor)
+            cursor = conn.cursor()
+
+            # Create database if it doesn't exist
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.config['database']}")
+            print(f"✓ Database '{self.config['database']}' is ready.")
+
+            # Switch to the database
+            cursor.execute(f"USE {self.config['database']}")
+
+            # Create users table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    username VARCHAR(50) UNIQUE NOT NULL,
+                    password VARCHAR(255) NOT NULL,
+                    role ENUM('admin', 'cashier') NOT NULL,
+                    full_name VARCHAR(100),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # Create products table with CHECK constraint
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS products (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    barcode VARCHAR(50) UNIQUE NOT NULL,
+                    name VARCHAR(100) NOT NULL,
+                    category VARCHAR(50),
+                    price DECIMAL(10, 2) NOT NULL,
+                    stock INT NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    INDEX idx_products_updated_at (updated_at)
+                )
+            """)
+
+            # Create transactions table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS transactions (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    transaction_date DATETIME NOT NULL,
+                    cashier_id INT NOT NULL,
+                    cashier_name VARCHAR(100),
+                    total_amount DECIMAL(10, 2) NOT NULL,
+                    amount_paid DECIMAL(10, 2) NOT NULL,
+                    change_amount DECIMAL(10, 2) NOT NULL,
+                    sale_uuid CHAR(36) NULL,
+                    items_summary TEXT NULL,
+                    item_count INT NOT NULL DEFAULT 0,
+                    unit_count INT NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE KEY uq_transactions_sale_uuid (sale_uuid),
+                    INDEX idx_transactions_date (transaction_date),
+                    FOREIGN KEY (cashier_id) REFERENCES users(id)
+                )
+            """)
+
+            # Create transaction_items table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS transaction_items (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    transaction_id INT NOT NULL,
+                    product_id INT NOT NULL,
+                    product_name VARCHAR(100) NOT NULL,
+                    product_barcode VARCHAR(50),
+                    quantity INT NOT NULL,
+                    unit_price DECIMAL(10, 2) NOT NULL,
+                    subtotal DECIMAL(10, 2) NOT NULL,
+                    FOREIGN KEY (transaction_id) REFERENCES transactions(id) ON DELETE CASCADE,
+                    FOREIGN KEY (product_id) REFERENCES products(id)
+                )
+            """)
+
+            # Create receipts table for storing receipt data
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS receipts (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    transaction_id INT NOT NULL,
+                    receipt_data JSON,
+                    frozen BLOB NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (transaction_id) REFERENCES transactions(id) ON DELETE CASCADE
+                )
+            """)
+
+            # Archive tier: sales older than the hot window, compressed, no foreign keys
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS transactions_archive (
+                    id INT PRIMARY KEY,
+                    transaction_date DATETIME NOT NULL,
+                    cashier_id INT NOT NULL,
+                    cashier_name VARCHAR(100),
+                    total_amount DECIMAL(10, 2) NOT NULL,
+                    amount_paid DECIMAL(10, 2) NOT NULL,
+                    change_amount DECIMAL(10, 2) NOT NULL,
+                    sale_uuid CHAR(36) NULL,
+                    items_summary TEXT NULL,
+                    item_count INT NOT NULL DEFAULT 0,
+                    unit_count INT NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP NULL,
+                    INDEX idx_transactions_archive_date (transaction_date),
+                    INDEX idx_transactions_archive_sale_uuid (sale_uuid)
+                ) ROW_FORMAT=COMPRESSED
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS transaction_items_archive (
+                    id INT PRIMARY KEY,
+                    transaction_id INT NOT NULL,
+                    product_id INT NOT NULL,
+                    product_name VARCHAR(100) NOT NULL,
+                    product_barcode VARCHAR(50),
+                    quantity INT NOT NULL,
+                    unit_price DECIMAL(10, 2) NOT NULL,
+                    subtotal DECIMAL(10, 2) NOT NULL,
+                    INDEX idx_transaction_items_archive_tid (transaction_id)
+                ) ROW_FORMAT=COMPRESSED
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS receipts_archive (
+                    id INT PRIMARY KEY,
+                    transaction_id INT NOT NULL,
+                    frozen BLOB NULL,
+                    created_at TIMESTAMP NULL,
+                    INDEX idx_receipts_archive_tid (transaction_id)
+                ) ROW_FORMAT=COMPRESSED
+            """)
+
+            # Track which schema version this database was created with
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            # Upgrade tables created by an older version; fresh tables already match
+            if current_version is not None:
+                for version in sorted(v for v in migrations if v > current_version):
+                    _run_migration(cursor, migrations[version])
+                    cursor.execute("INSERT IGNORE INTO schema_version (version) VALUES (%s)", (version,))
+                    print(f"✓ Migrated schema to version {version}.")
+            for statement in tier_views():
+                cursor.execute(statement)
+            cursor.execute("INSERT IGNORE INTO schema_version (version) VALUES (%s)", (target_version,))
+
+            conn.commit()
+            print("✓ All tables created successfully.")
+
+            # Create default admin user if it doesn't exist
+            cursor.execute("SELECT * FROM users WHERE username = 'admin'")
+            if not cursor.fetchone():
+                cursor.execute("""
+                    INSERT INTO users (username, password, role, full_name)
+                    VALUES (%s, %s, %s, %s)
+                """, DEFAULT_ADMIN)
+                conn.commit()
+                print("✓ Default admin user created (username: admin, password: admin123)")
+
+            cursor.close()
+        finally:
+            if conn:
+                conn.close()
+
+    # ===== Dialect =====
+    def today(self):
+        return "CURDATE()"
+
+    def since(self, amount, unit):
+        """Date `amount` units before today"""
+        return f"CURDATE() - INTERVAL {int(amount)} {_check_unit(unit).upper()}"
+
+    def bucket(self, column, unit):
+        """Group key for `column` per day (date), ISO week (YYYYWW), month ('YYYY-MM') or year"""
+        return {
+            "day": f"DATE({column})",
+            "week": f"YEARWEEK({column}, 3)",  # ISO 8601: Monday start, the year that owns the week
+            "month": f"DATE_FORMAT({column}, '%%Y-%%m')",
+            "year": f"YEAR({column})",
+        }[_check_unit(unit)]
+
+
+# ===== SQLite =====
+class SQLiteBackend:
+    name = "sqlite"
+    explain = "EXPLAIN QUERY PLAN "
+
+    def __init__(self, config):
+        self.config = config
+
+    @property
+    def path(self):
+        return self.config["sqlite_path"]
+
+    def connect(self):
+        return sqlite_standin.connect(self.path)
+
+    def streaming_cursor(self, conn):
+        # sqlite3 cursors already step through the result lazily
+        return conn.cursor()
+
+    def describe(self):
+        return f"sqlite:{os.path.abspath(self.path)}"
+
+    def schema_version(self):
+        if not os.path.exists(self.path):
+            return None
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            version = None
+            if self._has_table(cursor, "schema_version"):
+                cursor.execute("SELECT MAX(version) AS version FROM schema_version")
+                version = cursor.fetchone()["version"]
+            if version is None and self._has_table(cursor, "transactions"):
+                version = UNVERSIONED_SCHEMA
+            return version
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _has_table(cursor, name):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", (name,))
+        return cursor.fetchone() is not None
+
+    def initialize(self, current_version, target_version, migrations):
+        """Create the schema file (WAL mode) and apply migrations newer than current_version"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            for statement in sqlite_standin.SCHEMA:
+                cursor.execute(statement)
+            if current_version is not None:
+                for version in sorted(v for v in migrations if v > current_version):
+                    _run_migration(cursor, migrations[version])
+                    cursor.execute("INSERT OR IGNORE INTO schema_version (version) VALUES (%s)", (version,))
+                    print(f"✓ Migrated schema to version {version}.")
+            for statement in tier_views():
+                cursor.execute(statement)
+            cursor.execute("INSERT OR IGNORE INTO schema_version (version) VALUES (%s)", (target_version,))
+
+            cursor.execute("SELECT id FROM users WHERE username = 'admin'")
+            if not cursor.fetchone():
+                cursor.execute("INSERT INTO users (username, password, role, full_name) VALUES (%s, %s, %s, %s)",
+                               DEFAULT_ADMIN)
+                print("✓ Default admin user created (username: admin, password: admin123)")
+            conn.commit()
+            print(f"✓ SQLite database '{self.path}' is ready.")
+        finally:
+            conn.close()
+
+    # ===== Dialect =====
+    def today(self):
+        return "date('now', 'localtime')"
+
+    def since(self, amount, unit):
+        amount, unit = int(amount), _check_unit(unit)
+        if unit == "week":
+            amount, unit = amount * 7, "day"
+        return f"date('now', 'localtime', '-{amount} {unit}s')"
+
+    def bucket(self, column, unit):
+        # Native strftime instead of the stand-in's Python UDFs. ISO weeks like
+        # MySQL's YEARWEEK(col, 3): numbered within the year of their Thursday
+        thursday = f"date({column}, '-3 days', 'weekday 4')"
+        return {
+            "day": f"date({column})",
+            "week": f"(CAST(strftime('%%Y', {thursday}) AS INTEGER) * 100"
+                    f" + (CAST(strftime('%%j', {thursday}) AS INTEGER) + 6) / 7)",
+            "month": f"strftime('%%Y-%%m', {column})",
+            "year": f"CAST(strftime('%%Y', {column}) AS INTEGER)",
+        }[_check_unit(unit)]
+
+
+BACKENDS = {
+    MySQLBackend.name: MySQLBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
@@ -0,0 +1,225 @@
+# bench_db.py
+"""
+Database benchmark suite.
+
+Times every query in db.py and the queries the panels run, against a seeded
+dataset (see seed_data.py) at one or more scales, on a local MySQL server or
+the SQLite stand-in. Results are compared with stored baselines and
+regressions beyond the tolerance are flagged.
+
+Usage (from the project folder):
+    python bench_db.py --backend sqlite --scales 10k
+    python bench_db.py --backend mysql --scales 10k 1m --save-baseline
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections.abc import Iterator
+
+import db
+import receipt
+from seed_data import SCALES, connection_factory, seed
+
+BASELINE_FILE = "bench_baselines.json"
+
+# Panel queries, as written in the panels (params=None means the panel passes no args).
+# Report queries live in db.py (get_sales_by_period...) and are timed in build_cases.
+PANEL_QUERIES = [
+    ("catalog.load", "SELECT id, barcode, name, category, price, stock, updated_at FROM products ORDER BY id",
+     None, "all"),
+    ("catalog.refresh", "SELECT id, barcode, name, category, price, stock, updated_at FROM products "
+     "WHERE updated_at >= %s ORDER BY id", "watermark", "all"),
+    ("catalog.fingerprint", "SELECT COUNT(*) AS n, COALESCE(SUM(id), 0) AS id_sum FROM products", None, "one"),
+    ("admins.load_users", "SELECT id, username, role FROM users", None, "all"),
+]
+
+
+def _resolve_params(params):
+    if params == "watermark":
+        return (datetime.datetime.now() - datetime.timedelta(minutes=5),)
+    return params
+
+
+def run_raw(query, params, fetch):
+    """Run a statement on a pooled connection, letting errors propagate"""
+    with db.pooled_connection() as (conn, _):
+        cursor = conn.cursor()
+        if params is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query, params)
+        result = cursor.fetchall() if fetch == "all" else cursor.fetchone()
+        conn.commit()
+        cursor.close()
+    return result
+
+
+def build_cases(transaction_count, product_count, rng):
+    """Return [(name, callable)] covering db.py and the panel queries"""
+    today = datetime.date.today()
+    middle_day = (today - datetime.timedelta(days=30)).isoformat()
+
+    def save_transaction():
+        items = []
+        for pid in rng.sample(range(1, product_count + 1), 3):
+            items.append({"id": pid, "name": f"Bench {pid}", "barcode": "", "qty": 1,
+                          "price": 100.0, "subtotal": 100.0})
+        try:
+            return db.save_transaction_with_items(2, "cashier1", items, 336.0, 400.0, 64.0)
+        except db.OutOfStockError:
+            return None  # sold out at this scale; still a full locked round trip
+
+    cases = [
+        ("db.get_transaction_details",
+         lambda: db.get_transaction_details(rng.randint(1, transaction_count))),
+        ("receipt.render[reprint]",
+         lambda: receipt.render(receipt.from_transaction(
+             db.get_transaction_details(rng.randint(1, transaction_count), with_receipt=True)))),
+        ("db.get_transactions_details[50]",
+         lambda: db.get_transactions_details(rng.sample(range(1, transaction_count + 1), 50))),
+        ("db.get_daily_sales_report", lambda: db.get_daily_sales_report(middle_day)),
+        ("db.get_all_transactions_detailed", db.get_all_transactions_detailed),
+        ("db.get_all_transactions_detailed[stream]",
+         lambda: db.get_all_transactions_detailed(stream=True)),
+        ("db.get_transactions_page[first]", lambda: db.get_transactions_page()),
+        ("db.get_transactions_page[deep]",
+         lambda: db.get_transactions_page((datetime.datetime.combine(today - datetime.timedelta(days=365),
+                                                                     datetime.time()), transaction_count))),
+        ("db.save_transaction_with_items", save_transaction),
+        ("db.get_sales_total[today]", lambda: db.get_sales_total(today)),
+        ("db.get_sales_total[month]", lambda: db.get_sales_total(today.replace(day=1))),
+        ("db.get_transaction_count", db.get_transaction_count),
+        ("db.get_recent_sales", lambda: db.get_recent_sales(10)),
+        ("db.get_transactions_between[month]",
+         lambda: db.get_transactions_between(today.replace(day=1), today + datetime.timedelta(days=1))),
+        ("db.get_product_sales", db.get_product_sales),
+    ]
+    # Dashboard charts and admin sales reports
+    for unit, periods in (("day", 7), ("week", 8), ("month", 12), ("year", 5)):
+        cases.append((f"db.get_sales_by_period[{unit},{periods}]",
+                      lambda u=unit, p=periods: db.get_sales_by_period(u, p)))
+    cases.append(("db.get_sales_by_period[month,all]",
+                  lambda: db.get_sales_by_period("month", descending=True, limit=12)))
+    for name, query, params, fetch in PANEL_QUERIES:
+        cases.append((name, lambda q=query, p=_resolve_params(params), f=fetch: run_raw(q, p, f)))
+    return cases
+
+
+def time_case(func, repeat):
+    samples, rows, error = [], None, None
+    for i in range(repeat + 1):  # first run warms caches and is discarded
+        start = time.perf_counter()
+        try:
+            result = func()
+            if isinstance(result, Iterator):
+                result = list(result)  # streamed: draining is part of the cost
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            break
+        elapsed = (time.perf_counter() - start) * 1000
+        if i:
+            samples.append(elapsed)
+        if isinstance(result, dict) and "transactions" in result:
+            rows = len(result["transactions"])
+        elif isinstance(result, (list, tuple)):
+            rows = len(result)
+        elif result is not None:
+            rows = 1
+    if error or not samples:
+        return {"error": error or "no samples"}
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_ms": samples[0],
+        "rows": rows,
+    }
+
+
+def prepare(backend, scale, reseed):
+    """Point db at a seeded dataset for this scale, seeding it when needed"""
+    preset = SCALES[scale]
+    target = f"bench_{scale}.sqlite3" if backend == "sqlite" else f"techstore_pos_bench_{scale}"
+    factory = connection_factory(backend, target)
+
+    conn = factory()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) AS n FROM transactions")
+    count = cursor.fetchone()["n"]
+    cursor.close()
+    if reseed or count < preset["transactions"]:
+        print(f"Seeding {target} ({preset['transactions']:,} transactions)...")
+        seed(conn, backend, preset["products"], preset["transactions"])
+    conn.close()
+    return preset
+
+
+def load_baselines(path):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark db.py and panel queries")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--scales", nargs="+", choices=sorted(SCALES), default=["10k"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="allowed slowdown vs baseline before flagging (0.20 = 20%%)")
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    args = parser.parse_args()
+
+    baselines = load_baselines(args.baseline)
+    regressions = 0
+    rng = random.Random(7)
+
+    for scale in args.scales:
+        preset = prepare(args.backend, scale, args.reseed)
+        print(f"\n=== {args.backend} / {scale} ===")
+        print(f"{'case':<44} {'median':>10} {'p95':>10} {'rows':>9}  vs baseline")
+
+        for name, func in build_cases(preset["transactions"], preset["products"], rng):
+            if args.only and args.only not in name:
+                continue
+            result = time_case(func, args.repeat)
+            key = f"{args.backend}/{scale}/{name}"
+            if "error" in result:
+                print(f"{name:<44} {'error':>10}  {result['error'][:80]}")
+                continue
+
+            note = ""
+            base = baselines.get(key)
+            if base:
+                ratio = result["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+                note = f"{ratio:5.2f}x"
+                if ratio > 1 + args.tolerance:
+                    note += "  ⚠️ REGRESSION"
+                    regressions += 1
+            print(f"{name:<44} {result['median_ms']:8.2f}ms {result['p95_ms']:8.2f}ms "
+                  f"{result['rows'] if result['rows'] is not None else '-':>9}  {note}")
+
+            if args.save_baseline:
+                baselines[key] = result
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\n✓ Baselines saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n❌ {regressions} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# bench_memory.py
+"""
+Memory benchmark for large result sets.
+
+Loads the same seeded data (see seed_data.py) as dict rows, as compact
+records (safe_query(fetch="compact"), see records.py) and, for the catalog,
+as catalog.Product objects, and reports with tracemalloc how much each
+representation keeps alive and its peak while loading.
+
+Usage (from the project folder):
+    python bench_memory.py --backend sqlite --scales 10k
+    python bench_memory.py --backend mysql --scales 1m
+"""
+import argparse
+import datetime
+import gc
+import tracemalloc
+
+import db
+from bench_db import prepare
+from seed_data import SCALES
+
+
+def measure(func):
+    """(result, retained bytes, peak bytes) for one call"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, retained, peak
+
+
+def catalog_products():
+    from catalog import PRODUCT_COLUMNS, Product  # needs PyQt6
+    rows = db.safe_query(f"SELECT {PRODUCT_COLUMNS} FROM products ORDER BY id", fetch="iter")
+    return {p.id: p for p in map(Product, rows)}
+
+
+def build_cases():
+    """[(dataset, [(format, callable)])]; the first format is the baseline"""
+    year_ago = datetime.date.today() - datetime.timedelta(days=365)
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    catalog_query = "SELECT id, barcode, name, category, price, stock, updated_at FROM products ORDER BY id"
+    return [
+        ("history (get_all_transactions_detailed)", [
+            ("dict", db.get_all_transactions_detailed),
+            ("compact", lambda: db.get_all_transactions_detailed(compact=True)),
+        ]),
+        ("last 12 months (get_transactions_between)", [
+            ("dict", lambda: db.get_transactions_between(year_ago, tomorrow)),
+            ("compact", lambda: db.get_transactions_between(year_ago, tomorrow, compact=True)),
+        ]),
+        ("catalog (products)", [
+            ("dict", lambda: db.safe_query(catalog_query, fetch="all")),
+            ("compact", lambda: db.safe_query(catalog_query, fetch="compact")),
+            ("Product", catalog_products),
+        ]),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory of dict vs compact result rows")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--scales", nargs="+", choices=sorted(SCALES), default=["10k"])
+    parser.add_argument("--reseed", action="store_true")
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        prepare(args.backend, scale, args.reseed)
+        db.SLOW_QUERY_MS = None  # EXPLAIN output would be counted too
+        db.safe_query("SELECT 1")  # open the pooled connection outside the measurements
+        print(f"\n=== {args.backend} / {scale} ===")
+        print(f"{'dataset':<44} {'format':<8} {'rows':>9} {'retained':>11} {'peak':>11} {'vs dict':>8}")
+
+        for dataset, formats in build_cases():
+            baseline = None
+            for name, func in formats:
+                try:
+                    result, retained, peak = measure(func)
+                except ImportError as e:
+                    print(f"{dataset:<44} {name:<8} ⚠️ skipped: {e}")
+                    continue
+                baseline = baseline or retained
+                ratio = f"{retained / baseline:7.2f}x" if baseline else "-"
+                print(f"{dataset:<44} {name:<8} {len(result):>9,} {retained / 1024:>9,.0f}KB "
+                      f"{peak / 1024:>9,.0f}KB {ratio:>8}")
+                del result
+
+
+if __name__ == "__main__":
+    main()
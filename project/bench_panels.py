@@ -0,0 +1,279 @@
+# bench_panels.py
+"""
+Headless rendering benchmarks for the panel hot paths.
+
+Runs under QT_QPA_PLATFORM=offscreen with a fake in-memory data source in
+place of MySQL, and measures wall time, Python allocations and live widget
+counts for:
+  TransactionsPanel.load_products / refresh_cart
+  ProductsPanel.load_products
+  DashboardPanel.load_dashboard
+  AdminsPanel.display_report
+at several catalog, cart and report sizes. Results are compared with a stored
+baseline and regressions beyond the tolerance are flagged.
+
+Usage (from the project folder):
+    python bench_panels.py
+    python bench_panels.py --save-baseline
+"""
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import tempfile
+
+# Keep the benchmark's journal and catalog snapshot away from the terminal's real ones
+_bench_dir = tempfile.mkdtemp()
+os.environ.setdefault("POS_JOURNAL_PATH", os.path.join(_bench_dir, "bench_journal.sqlite3"))
+os.environ.setdefault("POS_CATALOG_SNAPSHOT", os.path.join(_bench_dir, "bench_catalog.snapshot"))
+
+import argparse
+import datetime
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from PyQt6.QtWidgets import QApplication, QWidget
+from PyQt6.QtCore import QCoreApplication, QEvent
+
+BASELINE_FILE = "bench_panels_baseline.json"
+
+CATALOG_SIZES = [50, 500, 2000]
+CART_SIZES = [5, 25, 100]
+REPORT_SIZES = [100, 1000, 10000]
+
+CATEGORIES = ["Processor", "GPU", "Motherboard", "Memory", "Storage", "Keyboard",
+              "Mouse", "Monitor", "PSU", "Case", "Accessories"]
+
+
+class FakeDataSource:
+    """Answers the panels' queries from generated rows instead of MySQL"""
+
+    def __init__(self, catalog_size=500, seed=1):
+        self.rng = random.Random(seed)
+        self.set_catalog_size(catalog_size)
+
+    def set_catalog_size(self, size):
+        self.products = [
+            {"id": i, "barcode": f"BC{i:012d}", "name": f"Bench {CATEGORIES[i % 11]} {i:05d}",
+             "category": CATEGORIES[i % 11], "price": round(self.rng.uniform(100, 50000), 2),
+             "stock": self.rng.randint(1, 200)}
+            for i in range(1, size + 1)
+        ]
+
+    def rows_for(self, query):
+        q = " ".join(query.split()).upper()
+        now = datetime.datetime.now()
+        if "DISTINCT CATEGORY" in q and "COUNT" not in q:
+            return [{"category": c} for c in CATEGORIES]
+        if " AS PERIOD" in q:  # before COUNT(: get_sales_by_period counts per period too
+            return [{"period": (now - datetime.timedelta(days=d)).date(), "transactions": 10, "total": 1000.0 + d}
+                    for d in range(7, 0, -1)]
+        if "COUNT(" in q or "SUM(STOCK)" in q or "IFNULL(SUM" in q:
+            total = len(self.products)
+            return [{"total": total, "cnt": total, "n": total, "low": total // 10, "cats": len(CATEGORIES)}]
+        if "FROM PRODUCTS" in q:
+            return self.products
+        if "JOIN USERS" in q:
+            return [{"id": i, "transaction_date": now, "total_amount": 1234.0, "username": "cashier1"}
+                    for i in range(10)]
+        if "FROM USERS" in q:
+            return [{"id": i, "username": f"user{i}", "role": "cashier"} for i in range(1, 11)]
+        return []
+
+    # safe_query replacement
+    def safe_query(self, query, params=None, fetch="one"):
+        rows = self.rows_for(query)
+        if fetch == "all":
+            return rows
+        return rows[0] if rows else None
+
+    # query_rows replacement (the catalog store)
+    def query_rows(self, query, params=None):
+        return self.rows_for(query)
+
+    # get_connection replacement
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeCursor:
+    def __init__(self, source):
+        self.source = source
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.rows = self.source.rows_for(query)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, source):
+        self.source = source
+
+    def cursor(self):
+        return FakeCursor(self.source)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def install(source):
+    """Point every panel module's data access at the fake source"""
+    import catalog
+    import dashboard_panel
+    import transactions_panel
+    import products_panel
+    import admins_panel
+    import db
+    db.safe_query = source.safe_query  # report functions (get_sales_by_period...)
+    catalog.query_rows = source.query_rows
+    dashboard_panel.safe_query = source.safe_query
+    transactions_panel.safe_query = source.safe_query
+    products_panel.get_connection = source.connect
+    admins_panel.get_connection = source.connect
+
+
+def flush_deletes():
+    """Process deleteLater() so widget counts reflect what is really alive"""
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+    QCoreApplication.processEvents()
+
+
+def measure(func, repeat):
+    """Return wall-time samples (ms) and the peak traced allocation of one extra run"""
+    samples = []
+    for i in range(repeat + 1):
+        start = time.perf_counter()
+        func()
+        flush_deletes()
+        if i:  # first run is warm-up
+            samples.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    func()
+    flush_deletes()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return samples, peak
+
+
+def run_cases(source, repeat):
+    from transactions_panel import TransactionsPanel
+    from products_panel import ProductsPanel
+    from dashboard_panel import DashboardPanel
+    from admins_panel import AdminsPanel
+    import catalog
+
+    results = {}
+
+    def record(name, panel, func):
+        samples, peak = measure(func, repeat)
+        results[name] = {
+            "median_ms": statistics.median(samples),
+            "max_ms": max(samples),
+            "peak_kib": peak / 1024,
+            "widgets": len(panel.findChildren(QWidget)),
+        }
+        print(f"{name:<44} {results[name]['median_ms']:9.2f}ms {results[name]['peak_kib']:10.0f}KiB "
+              f"{results[name]['widgets']:8d}")
+
+    transactions = TransactionsPanel(1)
+    products = ProductsPanel()
+    for size in CATALOG_SIZES:
+        source.set_catalog_size(size)
+        catalog.get_store().load()
+        flush_deletes()
+        record(f"TransactionsPanel.load_products[{size}]", transactions, transactions.load_products)
+        record(f"ProductsPanel.load_products[{size}]", products, products.load_products)
+
+    source.set_catalog_size(max(CART_SIZES))
+    catalog.get_store().load()
+    for size in CART_SIZES:
+        transactions.cart = [{"id": p["id"], "name": p["name"], "price": p["price"], "qty": 1}
+                             for p in source.products[:size]]
+        record(f"TransactionsPanel.refresh_cart[{size}]", transactions, transactions.refresh_cart)
+
+    dashboard = DashboardPanel("bench", "admin")
+    dashboard.refresh_timer.stop()
+    record("DashboardPanel.load_dashboard", dashboard, dashboard.load_dashboard)
+
+    admins = AdminsPanel()
+    for size in REPORT_SIZES:
+        rows = [{"id": i, "name": f"Bench {i}", "stock": i % 50, "price": float(i), "value": float(i * 3)}
+                for i in range(size)]
+        record(f"AdminsPanel.display_report[{size}]", admins,
+               lambda r=rows: admins.display_report(["Product ID", "Name", "Stock", "Price", "Total Value"], r))
+
+    for panel in (transactions, products, dashboard, admins):
+        panel.close()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base["median_ms"] and result["median_ms"] > base["median_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: {base['median_ms']:.2f}ms -> {result['median_ms']:.2f}ms")
+        if result["widgets"] > base["widgets"]:
+            regressions.append(f"{name}: widgets {base['widgets']} -> {result['widgets']}")
+        if base["peak_kib"] and result["peak_kib"] > base["peak_kib"] * (1 + tolerance):
+            regressions.append(f"{name}: peak {base['peak_kib']:.0f}KiB -> {result['peak_kib']:.0f}KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless panel rendering benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.20)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    import theme
+    theme.apply(app)  # cards and cart rows are styled as in the app
+    source = FakeDataSource()
+    install(source)
+
+    print(f"{'case':<44} {'median':>11} {'peak alloc':>13} {'widgets':>8}")
+    results = run_cases(source, args.repeat)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"\n✓ Baseline saved to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\n✓ No regressions against baseline")
+
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# bench_startup.py
+"""
+Startup benchmark for the POS.
+
+Reports, for each run in a fresh interpreter (so import costs are counted):
+  - time-to-first-paint: process start -> login window painted
+  - time-to-login: Sign In pressed -> landing panel of MainWindow painted
+  - time-to-switch: logout + Sign In again -> landing panel painted (session
+    switch on the already-built MainWindow)
+
+The login form compares the typed password with users.password as stored,
+and the default admin's is the sha256 hex digest of "admin123" (see
+backends.DEFAULT_ADMIN), so that digest is what the benchmark types by
+default. A run whose sign-in fails aborts the benchmark instead of
+reporting n/a.
+
+Usage (from the project folder, with MySQL running):
+    python bench_startup.py --runs 5
+    python bench_startup.py --user ana --password <users.password as stored>
+    python bench_startup.py --typing-ms 3000   # sign in after a typing pause (login warm-up)
+    QT_QPA_PLATFORM=offscreen python bench_startup.py ...   # headless
+"""
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# users.password of the default admin: sha256("admin123"), as typed into the form
+DEFAULT_PASSWORD = "240be518fabd2724ddb6f04eeb1da5967448d7e831c08c8fa822809f74c720a9"
+
+
+def run_child(username, password, typing_ms=0):
+    """Run one startup inside this process and print the timings as JSON"""
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QObject, QEvent, QTimer
+    import main
+
+    timings = {}
+
+    class PaintProbe(QObject):
+        """Record the first paint of a widget, then run a callback"""
+        def __init__(self, key, on_paint):
+            super().__init__()
+            self.key = key
+            self.on_paint = on_paint
+
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and self.key not in timings:
+                timings[self.key] = time.perf_counter()
+                QTimer.singleShot(0, self.on_paint)
+            return False
+
+    app = QApplication(sys.argv[:1])
+    probes = []
+
+    def finish(error=None):
+        result = {
+            "error": error,
+            "first_paint_ms": (timings["first_paint"] - _T0) * 1000,
+            "login_ms": (timings["main_paint"] - timings["login_start"]) * 1000
+            if "main_paint" in timings else None,
+            "switch_ms": (timings["switch_paint"] - timings["switch_start"]) * 1000
+            if "switch_paint" in timings else None,
+        }
+        print(json.dumps(result))
+        app.quit()
+
+    def do_login():
+        window.username.setText(username)
+        window.password.setText(password)
+        timings["login_start"] = time.perf_counter()
+        window.handle_login()
+
+        main_window = getattr(window, "main_window", None)
+        if main_window is None:
+            finish(f"sign-in failed: {window.error_label.text() or 'no main window'}")
+            return
+        panel = main_window.stack.currentWidget()
+        probe = PaintProbe("main_paint", do_switch)
+        probes.append(probe)
+        panel.installEventFilter(probe)
+        panel.update()
+
+    def do_switch():
+        main_window = window.main_window
+        timings["switch_start"] = time.perf_counter()
+        main_window.logout()
+        window.username.setText(username)
+        window.password.setText(password)
+        window.handle_login()
+        if window.isVisible():
+            finish(f"sign-in after logout failed: {window.error_label.text()}")
+            return
+
+        panel = main_window.stack.currentWidget()
+        probe = PaintProbe("switch_paint", finish)
+        probes.append(probe)
+        panel.installEventFilter(probe)
+        panel.update()
+
+    window = main.start(app)
+    probe = PaintProbe("first_paint", lambda: QTimer.singleShot(typing_ms, do_login))
+    probes.append(probe)
+    window.installEventFilter(probe)
+    window.update()
+
+    # Safety net so a missing paint never hangs the benchmark
+    QTimer.singleShot(30000, lambda: finish("timed out waiting for a paint"))
+    app.exec()
+
+
+def summarize(label, values):
+    values = [v for v in values if v is not None]
+    if not values:
+        print(f"{label:<22} n/a")
+        return
+    print(f"{label:<22} median {statistics.median(values):8.1f} ms   "
+          f"min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure POS startup times")
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD,
+                        help="users.password exactly as stored (default: the default admin's)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--typing-ms", type=int, default=0,
+                        help="pause between first paint and Sign In, as if a password were typed")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.user, args.password, args.typing_ms)
+        return
+
+    results = []
+    for i in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", "--user", args.user, "--password", args.password,
+             "--typing-ms", str(args.typing_ms)],
+            capture_output=True, text=True
+        )
+        lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+        if not lines:
+            print(f"❌ Run {i + 1} failed:\n{out.stderr}")
+            continue
+        result = json.loads(lines[-1])
+        if result.get("error"):
+            sys.exit(f"❌ Run {i + 1}: {result['error']} (user {args.user!r}; see --password)")
+        results.append(result)
+
+    print(f"Startup benchmark ({len(results)} runs)")
+    summarize("time-to-first-paint", [r["first_paint_ms"] for r in results])
+    summarize("time-to-login", [r["login_ms"] for r in results])
+    summarize("time-to-switch", [r.get("switch_ms") for r in results])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+# catalog.py
+"""
+Process-wide product catalog.
+
+One CatalogStore holds every product in memory and keeps it current with a
+single incremental query (`updated_at >= watermark`, with a few seconds of
+overlap) on a timer, instead of each panel re-reading the products table.
+Panels read from the store and listen to its signals:
+
+    rowChanged(id)        a product's fields changed
+    rowsInserted([ids])   products appeared (including the first load)
+    rowsRemoved([ids])    products were deleted
+
+After a change the catalog is written to a compact binary snapshot
+(data/catalog.snapshot); changes within CATALOG_CONFIG["snapshot_delay_ms"]
+share one write, so a busy till doesn't rewrite the file after every sale. At startup the store loads that file instead of
+the products table, so the POS grid can be drawn before the first database
+round trip. The first refresh then fetches only the rows changed since the
+snapshot's watermark. The snapshot also serves the catalog while the
+database is unreachable.
+
+Snapshot format (little-endian):
+    header   b"POSCAT", format version (u16), row count (u32)
+             source (str): database the rows came from (host/db, or sqlite:path)
+             watermark (str): max(updated_at), "" if unknown
+    rows     id (u32), stock (i32), price (f64), barcode, name, category (str)
+    str      byte length (u16) + UTF-8 bytes
+"""
+import datetime
+import os
+import struct
+import sys
+import threading
+
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer, pyqtSignal
+
+from db import get_backend, query_rows, is_online
+import metrics
+
+CATALOG_CONFIG = {
+    "refresh_ms": 5000,      # incremental refresh period
+    "low_stock": 10,         # stock below this counts as low
+    "snapshot_path": os.environ.get("POS_CATALOG_SNAPSHOT", os.path.join("data", "catalog.snapshot")),
+    "prefetch_wait": 5.0,    # seconds get_store() waits for a running prefetch
+    "snapshot_delay_ms": 2000,  # longest a change waits to reach the snapshot file
+    # updated_at is set when a statement runs, not when it commits: a row stamped
+    # just before the watermark can become visible after it, so each delta
+    # re-reads this many seconds back (_apply skips the rows it already has)
+    "watermark_overlap_s": 5,
+}
+
+SNAPSHOT_MAGIC = b"POSCAT"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<6sHI")
+_ROW = struct.Struct("<Iid")
+_STR_LEN = struct.Struct("<H")
+
+PRODUCT_COLUMNS = "id, barcode, name, category, price, stock, updated_at"
+
+
+class Product:
+    """Compact catalog row; supports row["name"] / row.get() like the old dict rows"""
+    __slots__ = ("id", "barcode", "name", "category", "price", "stock", "updated_at")
+
+    def __init__(self, row):
+        self.id = row["id"]
+        self.barcode = row.get("barcode")
+        self.name = row["name"]
+        category = row.get("category")
+        self.category = sys.intern(category) if category else category  # a few dozen shared strings
+        self.price = float(row["price"])
+        self.stock = int(row["stock"])
+        self.updated_at = row.get("updated_at")
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def values(self):
+        return (self.barcode, self.name, self.category, self.price, self.stock)
+
+    def as_dict(self, fields=("id", "barcode", "name", "category", "price", "stock")):
+        return {field: getattr(self, field) for field in fields}
+
+
+class CatalogStore(QObject):
+    rowChanged = pyqtSignal(int)
+    rowsInserted = pyqtSignal(list)
+    rowsRemoved = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = {}  # id -> Product, kept in id order
+        self.watermark = None
+        self.loaded = False
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(CATALOG_CONFIG["refresh_ms"])
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        self.snapshot_pending = False
+        self.snapshot_timer = QTimer(self)
+        self.snapshot_timer.setSingleShot(True)
+        self.snapshot_timer.setInterval(CATALOG_CONFIG["snapshot_delay_ms"])
+        self.snapshot_timer.timeout.connect(self.flush_snapshot)
+
+    # ===== Loading =====
+    def ensure_loaded(self):
+        metrics.record_cache("catalog", self.loaded)
+        if not self.loaded:
+            self.load()
+
+    def load(self):
+        """Full read of the products table; offline or on errors, keep whatever is loaded"""
+        self.loaded = True
+        if not is_online():
+            return
+        try:
+            rows = query_rows(f"SELECT {PRODUCT_COLUMNS} FROM products ORDER BY id")
+        except Exception as e:
+            print(f"⚠️ Catalog load failed, keeping the current rows: {e}")
+            return
+        self._apply(rows, full=True)
+
+    def load_snapshot(self, path=None):
+        """Fill the store from the on-disk snapshot; False if missing, stale format or another DB"""
+        try:
+            rows, watermark = read_snapshot(path or CATALOG_CONFIG["snapshot_path"])
+        except (OSError, ValueError, struct.error) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"⚠️ Ignoring catalog snapshot: {e}")
+            return False
+        self._apply(rows, save=False)
+        self.watermark = watermark
+        self.loaded = True
+        return True
+
+    @metrics.timed("catalog")
+    def refresh(self):
+        """Fetch rows changed since the watermark, and drop deleted ones"""
+        if not is_online():
+            return  # don't probe an unreachable server every tick
+        if not self.loaded or self.watermark is None:
+            self.load()
+            return
+
+        try:
+            changed = changed_since(self.watermark)
+            ids = query_rows("SELECT COUNT(*) AS n, COALESCE(SUM(id), 0) AS id_sum FROM products")[0]
+        except Exception as e:
+            print(f"⚠️ Catalog refresh failed, keeping the current rows: {e}")
+            return
+        self._apply(changed)
+
+        # updated_at can't show deletions. Diff ids only when the count or the id
+        # sum differs: products deleted and as many added still change the sum.
+        # Rows the delta missed (updated_at older than the watermark) are read too
+        if (ids["n"], ids["id_sum"]) != (len(self.rows), sum(self.rows)):
+            try:
+                ids = {row["id"] for row in query_rows("SELECT id FROM products")}
+                missing = sorted(ids.difference(self.rows))
+                added = query_rows(
+                    f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id IN ({', '.join(['%s'] * len(missing))})",
+                    tuple(missing)) if missing else []
+            except Exception as e:
+                print(f"⚠️ Catalog refresh failed, keeping the current rows: {e}")
+                return
+            self._apply(added)
+            self._remove([pid for pid in self.rows if pid not in ids])
+
+    def _apply(self, rows, full=False, save=True):
+        inserted, changed = [], []
+        seen = set()
+        watermark = self.watermark
+        for row in rows:
+            product = Product(row)
+            seen.add(product.id)
+            # Unchanged rows move the watermark too (e.g. a sale already applied
+            # locally by apply_sale), or every refresh would fetch them again
+            if product.updated_at is not None and (self.watermark is None or product.updated_at > self.watermark):
+                self.watermark = product.updated_at
+            current = self.rows.get(product.id)
+            if current is None:
+                inserted.append(product.id)
+            elif current.values() != product.values():
+                changed.append(product.id)
+            else:
+                current.updated_at = product.updated_at
+                continue
+            self.rows[product.id] = product
+
+        if inserted and list(self.rows) != sorted(self.rows):
+            self.rows = dict(sorted(self.rows.items()))
+        if inserted:
+            self.rowsInserted.emit(inserted)
+        for pid in changed:
+            self.rowChanged.emit(pid)
+        if full:
+            self._remove([pid for pid in self.rows if pid not in seen])
+        if (inserted or changed or self.watermark != watermark) and save:
+            self._schedule_snapshot()
+
+    def apply_sale(self, items):
+        """
+        Decrement stock for a completed cart ({id, qty} lines) without a
+        database round trip. The next refresh overwrites these rows with the
+        database values once the sale has been synced.
+        """
+        changed = []
+        for item in items:
+            product = self.rows.get(item["id"])
+            if product is not None:
+                product.stock = max(product.stock - item["qty"], 0)
+                changed.append(product.id)
+        for pid in changed:
+            self.rowChanged.emit(pid)
+        if changed:
+            self._schedule_snapshot()
+
+    def _remove(self, ids):
+        if not ids:
+            return
+        for pid in ids:
+            del self.rows[pid]
+        self.rowsRemoved.emit(ids)
+        self._schedule_snapshot()
+
+    def _schedule_snapshot(self):
+        """Mark the snapshot stale; the timer writes it once for the whole burst of changes"""
+        self.snapshot_pending = True
+        if not self.snapshot_timer.isActive():
+            self.snapshot_timer.start()
+
+    def flush_snapshot(self):
+        """Write the snapshot now if a change is waiting for it (timer, or the app quitting)"""
+        self.snapshot_timer.stop()
+        if not self.snapshot_pending:
+            return
+        self.snapshot_pending = False
+        try:
+            write_snapshot(CATALOG_CONFIG["snapshot_path"], self.rows.values(), self.watermark)
+        except OSError as e:
+            print(f"⚠️ Could not write catalog snapshot: {e}")
+
+    # ===== Reads =====
+    def get(self, pid):
+        return self.rows.get(pid)
+
+    def products(self):
+        self.ensure_loaded()
+        return list(self.rows.values())
+
+    def search(self, text=None, category=None, in_stock=False, fields=("id", "name", "category")):
+        """Case-insensitive substring match on `fields`, like the panels' LIKE queries"""
+        self.ensure_loaded()
+        text = (text or "").lower()
+        if category == "All Categories":
+            category = None
+        result = []
+        for product in self.rows.values():
+            if in_stock and product.stock <= 0:
+                continue
+            if category and product.category != category:
+                continue
+            if text and not any(text in str(getattr(product, f) or "").lower() for f in fields):
+                continue
+            result.append(product)
+        return result
+
+    def categories(self):
+        self.ensure_loaded()
+        return sorted({p.category for p in self.rows.values() if p.category})
+
+    def low_stock(self, threshold=None):
+        threshold = CATALOG_CONFIG["low_stock"] if threshold is None else threshold
+        self.ensure_loaded()
+        return sorted((p for p in self.rows.values() if p.stock < threshold), key=lambda p: p.stock)
+
+    def stats(self):
+        """Totals for the Products panel stat cards"""
+        self.ensure_loaded()
+        rows = self.rows.values()
+        return {
+            "total_products": len(self.rows),
+            "total_stock": sum(p.stock for p in rows),
+            "low_stock": sum(1 for p in rows if p.stock < CATALOG_CONFIG["low_stock"]),
+            "categories": len({p.category for p in rows if p.category}),
+        }
+
+
+# ===== Snapshot file =====
+def _snapshot_source():
+    return get_backend().describe()
+
+
+def _pack_str(value):
+    data = ("" if value is None else str(value)).encode("utf-8")[:0xFFFF]
+    return _STR_LEN.pack(len(data)) + data
+
+
+def write_snapshot(path, products, watermark):
+    """Write products atomically (temp file + rename)"""
+    products = list(products)
+    parts = [_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(products)),
+             _pack_str(_snapshot_source()), _pack_str(watermark)]
+    for p in products:
+        parts.append(_ROW.pack(p.id, p.stock, p.price))
+        parts.append(_pack_str(p.barcode) + _pack_str(p.name) + _pack_str(p.category))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(parts))
+    os.replace(tmp, path)
+
+
+def read_snapshot(path):
+    """Return (rows, watermark) from a snapshot file; raises ValueError if unusable"""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    magic, version, count = _HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot format {magic!r} v{version}")
+    offset = _HEADER.size
+
+    def read_str():
+        nonlocal offset
+        (length,) = _STR_LEN.unpack_from(data, offset)
+        offset += _STR_LEN.size + length
+        return data[offset - length:offset].decode("utf-8")
+
+    source = read_str()
+    if source != _snapshot_source():
+        raise ValueError(f"snapshot is for {source}, not {_snapshot_source()}")
+    watermark = read_str() or None
+    if watermark:
+        try:
+            watermark = datetime.datetime.fromisoformat(watermark)
+        except ValueError:
+            pass
+
+    rows = []
+    for _ in range(count):
+        pid, stock, price = _ROW.unpack_from(data, offset)
+        offset += _ROW.size
+        barcode, name, category = read_str(), read_str(), read_str()
+        rows.append({"id": pid, "barcode": barcode or None, "name": name, "category": category or None,
+                     "price": price, "stock": stock})
+    return rows, watermark
+
+
+# ===== Background prefetch =====
+_prefetched = None
+_prefetch_started = False
+_prefetch_done = threading.Event()
+
+
+def changed_since(watermark):
+    """Products updated at or after the watermark, less CATALOG_CONFIG["watermark_overlap_s"]"""
+    if isinstance(watermark, datetime.datetime):
+        watermark -= datetime.timedelta(seconds=CATALOG_CONFIG["watermark_overlap_s"])
+    return query_rows(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE updated_at >= %s ORDER BY id",
+                      (watermark,))
+
+
+def prefetch():
+    """
+    Read the catalog off the GUI thread (see warmup.py): the snapshot plus the
+    rows changed since it, or the whole table when there is no snapshot.
+    get_store() adopts the result instead of querying on the GUI thread.
+    """
+    global _prefetched, _prefetch_started
+    if _store is not None:
+        return  # signed in before the warm-up got here; the store loaded itself
+    _prefetch_started = True
+    try:
+        try:
+            rows, watermark = read_snapshot(CATALOG_CONFIG["snapshot_path"])
+            from_snapshot = True
+        except (OSError, ValueError, struct.error):
+            rows, watermark, from_snapshot = [], None, False
+
+        try:
+            if from_snapshot and watermark is not None:
+                delta = changed_since(watermark)
+                if delta:
+                    merged = {row["id"]: row for row in rows}
+                    merged.update((row["id"], row) for row in delta)
+                    rows = [merged[pid] for pid in sorted(merged)]
+            elif not from_snapshot:
+                rows = query_rows(f"SELECT {PRODUCT_COLUMNS} FROM products ORDER BY id")
+        except Exception as e:
+            if not from_snapshot:
+                print(f"⚠️ Catalog prefetch failed: {e}")
+                return
+            # The snapshot alone still lets the lane sell; the store's refresh fetches the delta
+        _prefetched = (rows, watermark, from_snapshot)
+    finally:
+        _prefetch_done.set()
+
+
+def _adopt_prefetch(store):
+    """Fill the store from prefetch(); returns (adopted, from_snapshot)"""
+    global _prefetched
+    if _prefetch_started:
+        _prefetch_done.wait(CATALOG_CONFIG["prefetch_wait"])
+    result, _prefetched = _prefetched, None
+    if result is None:
+        return False, False
+    rows, watermark, from_snapshot = result
+    store.watermark = watermark
+    store._apply(rows, save=not from_snapshot)
+    store.loaded = True
+    return True, from_snapshot
+
+
+_store = None
+
+
+def get_store():
+    """
+    The process-wide CatalogStore (GUI thread only). Rows prefetched during
+    login or a snapshot on disk make this instant, and the delta is fetched
+    once the event loop is running; otherwise the first call loads the whole table.
+    """
+    global _store
+    if _store is None:
+        _store = CatalogStore()
+        adopted, from_snapshot = _adopt_prefetch(_store)
+        metrics.record_cache("catalog_prefetch", adopted)
+        if adopted:
+            if from_snapshot:
+                QTimer.singleShot(0, _store.refresh)
+        elif _store.load_snapshot():
+            metrics.record_cache("catalog_snapshot", True)
+            QTimer.singleShot(0, _store.refresh)
+        else:
+            metrics.record_cache("catalog_snapshot", False)
+            _store.ensure_loaded()
+        _store.refresh_timer.start()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(_store.flush_snapshot)
+    return _store
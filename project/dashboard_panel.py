@@ -6,13 +6,24 @@ from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtWidgets import QHeaderView
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.pyplot as plt
-from db import safe_query
+from db import safe_query, get_sales_total, get_sales_by_period, get_recent_sales, get_transaction_count
+import metrics
 import datetime
 
 
+# Chart views: (date unit, how many units back from today)
+CHART_VIEWS = {
+    "Daily": ("day", 7),
+    "Weekly": ("week", 8),
+    "Monthly": ("month", 12),
+    "Yearly": ("year", 5),
+}
+
+
 class DashboardPanel(QWidget):
     def __init__(self, username, role):
         super().__init__()
+        self.setObjectName("dashboardPanel")  # scope of qss/dashboard.qss
 
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setSpacing(15)
@@ -23,17 +34,12 @@ class DashboardPanel(QWidget):
         # Initialize the dashboard
         self.load_dashboard()
 
-        # Set up auto-refresh timer (refreshes every 5 seconds)
+        # Set up auto-refresh timer (refreshes every 5 seconds while visible)
         self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(5000)  # 5000 ms = 5 seconds
         self.refresh_timer.timeout.connect(self.refresh_dashboard)
-        self.refresh_timer.start(5000)  # 5000 ms = 5 seconds
-
-        # ✅ Apply QSS
-        try:
-            self.setStyleSheet(open("qss/dashboard.qss").read())
-        except Exception as e:
-            print(f"⚠️ Could not load dashboard.qss: {e}")
 
+    @metrics.timed("dashboard")
     def load_dashboard(self):
         """Load all dashboard content"""
         # Clear existing layout
@@ -58,22 +64,14 @@ class DashboardPanel(QWidget):
         today = datetime.date.today()
         first_day = today.replace(day=1)
 
-        today_sales = (safe_query(
-            "SELECT IFNULL(SUM(total), 0) AS total FROM transactions WHERE DATE(created_at) = CURDATE();"
-        ) or {"total": 0})["total"]
-
-        monthly_sales = (safe_query(
-            "SELECT IFNULL(SUM(total), 0) AS total FROM transactions WHERE created_at >= %s;",
-            (first_day,)
-        ) or {"total": 0})["total"]
+        today_sales = get_sales_total(today)
+        monthly_sales = get_sales_total(first_day)
 
         total_products = (safe_query(
             "SELECT COUNT(*) AS cnt FROM products;"
         ) or {"cnt": 0})["cnt"]
 
-        transactions_count = (safe_query(
-            "SELECT COUNT(*) AS cnt FROM transactions;"
-        ) or {"cnt": 0})["cnt"]
+        transactions_count = get_transaction_count()
 
         # ===== Top Stats Row =====
         stats_row = QHBoxLayout()
@@ -166,19 +164,7 @@ class DashboardPanel(QWidget):
         activity_title.setObjectName("sectionTitle")
         activity_layout.addWidget(activity_title)
 
-        recent_sales = safe_query(
-            """
-            SELECT 'Sale completed' as activity,
-                   CONCAT('₱', t.total) as amount,
-                   t.created_at,
-                   u.username as user
-            FROM transactions t
-            JOIN users u ON t.user_id = u.id
-            ORDER BY t.created_at DESC
-            LIMIT 10;
-            """,
-            fetch="all"
-        ) or []
+        recent_sales = get_recent_sales(10)
 
         table = QTableWidget(len(recent_sales), 4)
         table.setHorizontalHeaderLabels(["Activity", "Amount", "Time", "User"])
@@ -215,10 +201,10 @@ class DashboardPanel(QWidget):
 
         for row, sale in enumerate(recent_sales):
             table.setRowHeight(row, 35)
-            table.setItem(row, 0, QTableWidgetItem(sale["activity"]))
-            table.setItem(row, 1, QTableWidgetItem(sale["amount"]))
-            table.setItem(row, 2, QTableWidgetItem(str(sale["created_at"])))
-            table.setItem(row, 3, QTableWidgetItem(sale["user"]))
+            table.setItem(row, 0, QTableWidgetItem("Sale completed"))
+            table.setItem(row, 1, QTableWidgetItem(f"₱{sale['total_amount']:,.2f}"))
+            table.setItem(row, 2, QTableWidgetItem(str(sale["transaction_date"])))
+            table.setItem(row, 3, QTableWidgetItem(sale["username"]))
 
         activity_layout.addWidget(table)
         self.main_layout.addWidget(activity_frame)
@@ -232,65 +218,13 @@ class DashboardPanel(QWidget):
 
     def get_sales_data(self, view):
         """Get sales data based on view type"""
-        if view == "Daily":
-            # Last 7 days
-            data = safe_query(
-                """
-                SELECT DATE(created_at) as period, SUM(total) as total
-                FROM transactions
-                WHERE created_at >= CURDATE() - INTERVAL 7 DAY
-                GROUP BY period
-                ORDER BY period;
-                """,
-                fetch="all"
-            ) or []
-            labels = [str(row["period"]) for row in data]
-            values = [float(row["total"]) for row in data]
-
-        elif view == "Weekly":
-            # Last 8 weeks
-            data = safe_query(
-                """
-                SELECT YEARWEEK(created_at) as period, SUM(total) as total
-                FROM transactions
-                WHERE created_at >= CURDATE() - INTERVAL 8 WEEK
-                GROUP BY period
-                ORDER BY period;
-                """,
-                fetch="all"
-            ) or []
+        unit, periods = CHART_VIEWS.get(view, CHART_VIEWS["Yearly"])
+        data = get_sales_by_period(unit, periods)
+        if unit == "week":
             labels = [f"W{str(row['period'])[-2:]}" for row in data]
-            values = [float(row["total"]) for row in data]
-
-        elif view == "Monthly":
-            # Last 12 months
-            data = safe_query(
-                """
-                SELECT DATE_FORMAT(created_at, '%%Y-%%m') as period, SUM(total) as total
-                FROM transactions
-                WHERE created_at >= DATE_SUB(CURDATE(), INTERVAL 12 MONTH)
-                GROUP BY DATE_FORMAT(created_at, '%%Y-%%m')
-                ORDER BY period;
-                """,
-                fetch="all"
-            ) or []
-            labels = [row["period"] for row in data]
-            values = [float(row["total"]) for row in data]
-
-        else:  # Yearly
-            # Last 5 years
-            data = safe_query(
-                """
-                SELECT YEAR(created_at) as period, SUM(total) as total
-                FROM transactions
-                WHERE created_at >= CURDATE() - INTERVAL 5 YEAR
-                GROUP BY period
-                ORDER BY period;
-                """,
-                fetch="all"
-            ) or []
+        else:
             labels = [str(row["period"]) for row in data]
-            values = [float(row["total"]) for row in data]
+        values = [float(row["total"]) for row in data]
 
         return {"labels": labels, "values": values}
 
@@ -355,6 +289,17 @@ class DashboardPanel(QWidget):
         plt.close(fig)
         return frame
 
+    def showEvent(self, event):
+        """Resume auto-refresh when the panel becomes visible"""
+        if not self.refresh_timer.isActive():
+            self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        """Stop polling the database while another panel is shown"""
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
     def closeEvent(self, event):
         """Stop timer when widget is closed"""
         self.refresh_timer.stop()
@@ -1,148 +1,753 @@
 # db.py
-import pymysql
-import hashlib
+import datetime
+import heapq
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+import backends
+import receipt
+import records
 
 DB_CONFIG = {
+    "backend": os.environ.get("POS_DB_BACKEND", "mysql"),  # "mysql" or "sqlite" (see backends.py)
     "host": "localhost",
     "user": "root",
     "password": "",
-    "database": "techstore_pos"
+    "database": "techstore_pos",
+    "connect_timeout": 3,
+    "sqlite_path": os.environ.get("POS_SQLITE_PATH", os.path.join("data", "techstore_pos.sqlite3")),
 }
 
-def initialize_database():
+# Max connections kept open by safe_query's pool
+POOL_SIZE = 5
+# Idle connections are pinged (and reconnected if the server dropped them)
+# only when checked out after this many seconds unused
+POOL_PING_AFTER_S = 30
+
+# Queries slower than this are logged with their EXPLAIN plan (None disables)
+SLOW_QUERY_MS = 200
+
+# Rows pulled from the server per round trip by safe_query(fetch="iter"/"batches")
+STREAM_BATCH_SIZE = 500
+
+# Transactions per get_transactions_page() call unless the caller asks otherwise
+HISTORY_PAGE_SIZE = 50
+
+# Hot/archive tiers (see roll_archive): sales from the last `hot_months` full
+# months plus the current one always stay in the hot tables
+ARCHIVE_CONFIG = {
+    "hot_months": int(os.environ.get("POS_HOT_MONTHS", "13")),
+    "batch_size": 1000,  # transactions moved per DB transaction
+}
+
+# MySQL client errors meaning the server cannot be reached. After one of
+# these is_online() reports False until a query succeeds again; the sale
+# journal's worker thread probes every OFFLINE_RETRY_SECONDS (see probe()).
+CONNECTION_ERRORS = (2003, 2006, 2013, 2055)
+OFFLINE_RETRY_SECONDS = 15
+
+# Checkout retries on deadlock / lock wait timeout, with jittered exponential backoff
+CHECKOUT_RETRIES = 3
+CHECKOUT_BACKOFF = 0.05  # seconds before the first retry
+TRANSIENT_ERRORS = (1213, 1205)  # ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT
+
+# Bump when the CREATE TABLE statements in backends.py change, and add the matching
+# ALTER statements to MIGRATIONS so existing databases are upgraded in place
+SCHEMA_VERSION = 8
+
+def compact_receipts(cursor, batch_size=1000):
     """
-    Automatically create database and tables if they don't exist.
-    This runs once when the application starts.
+    Migration 6: replace each receipt's JSON copy of the sale with its frozen
+    fields (receipt.freeze); everything else is rendered from the sale rows.
+    Journaled sales keep the sale id prefix these receipts printed as their number.
     """
-    conn = None
-    try:
-        # Connect without specifying database to create it if needed
-        conn = pymysql.connect(
-            host=DB_CONFIG["host"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"]
-        )
-        cursor = conn.cursor()
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT id, receipt_data FROM receipts
+            WHERE id > %s AND receipt_data IS NOT NULL
+            ORDER BY id LIMIT %s
+        """, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            try:
+                data = json.loads(row["receipt_data"])
+                subtotal = float(data.get("subtotal") or 0)
+                tax_rate = round(float(data["tax"]) / subtotal, 4) if subtotal else receipt.TAX_RATE
+                sale_uuid = data.get("sale_uuid")
+                # JSON receipts predate full sale ids on receipts: they printed the first block
+                number = sale_uuid.split("-")[0].upper() if sale_uuid else receipt.receipt_number(
+                    data.get("transaction_id"))
+                frozen = receipt.freeze(number, tax_rate)
+            except (ValueError, TypeError, KeyError, AttributeError):
+                frozen = None  # unreadable: render with the derived number and current rate
+            updates.append((frozen, row["id"]))
+        cursor.executemany("UPDATE receipts SET frozen = %s, receipt_data = NULL WHERE id = %s", updates)
+        last_id = rows[-1]["id"]
 
-        # Create database if it doesn't exist
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_CONFIG['database']}")
-        print(f"✓ Database '{DB_CONFIG['database']}' is ready.")
 
-        # Switch to the database
-        cursor.execute(f"USE {DB_CONFIG['database']}")
+def index_archive_sale_uuid(cursor):
+    """
+    Migration 8: index transactions_archive.sale_uuid, so replayed sales are
+    found after a roll; archive tables created by this version already have it.
+    """
+    cursor.execute("SHOW INDEX FROM transactions_archive WHERE Key_name = 'idx_transactions_archive_sale_uuid'")
+    if not cursor.fetchall():
+        cursor.execute("ALTER TABLE transactions_archive ADD INDEX idx_transactions_archive_sale_uuid (sale_uuid)")
 
-        # Create users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                role ENUM('admin', 'cashier') NOT NULL,
-                full_name VARCHAR(100),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Create products table with CHECK constraint
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                barcode VARCHAR(50) UNIQUE NOT NULL,
-                name VARCHAR(100) NOT NULL,
-                category VARCHAR(50),
-                price DECIMAL(10, 2) NOT NULL,
-                stock INT NOT NULL DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Create transactions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                transaction_date DATETIME NOT NULL,
-                cashier_id INT NOT NULL,
-                cashier_name VARCHAR(100),
-                total_amount DECIMAL(10, 2) NOT NULL,
-                amount_paid DECIMAL(10, 2) NOT NULL,
-                change_amount DECIMAL(10, 2) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (cashier_id) REFERENCES users(id)
-            )
-        """)
-
-        # Create transaction_items table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS transaction_items (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                transaction_id INT NOT NULL,
-                product_id INT NOT NULL,
-                product_name VARCHAR(100) NOT NULL,
-                product_barcode VARCHAR(50),
-                quantity INT NOT NULL,
-                unit_price DECIMAL(10, 2) NOT NULL,
-                subtotal DECIMAL(10, 2) NOT NULL,
-                FOREIGN KEY (transaction_id) REFERENCES transactions(id) ON DELETE CASCADE,
-                FOREIGN KEY (product_id) REFERENCES products(id)
-            )
-        """)
-
-        # Create receipts table for storing receipt data
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS receipts (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                transaction_id INT NOT NULL,
-                receipt_data JSON,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (transaction_id) REFERENCES transactions(id) ON DELETE CASCADE
-            )
-        """)
 
-        conn.commit()
-        print("✓ All tables created successfully.")
-
-        # Create default admin user if it doesn't exist
-        cursor.execute("SELECT * FROM users WHERE username = 'admin'")
-        if not cursor.fetchone():
-            hashed_password = hashlib.sha256("admin123".encode()).hexdigest()
-            cursor.execute("""
-                INSERT INTO users (username, password, role, full_name) 
-                VALUES (%s, %s, %s, %s)
-            """, ("admin", hashed_password, "admin", "System Administrator"))
-            conn.commit()
-            print("✓ Default admin user created (username: admin, password: admin123)")
+MIGRATIONS = {
+    # 2: client-generated sale ids make journaled checkouts idempotent
+    2: [
+        "ALTER TABLE transactions ADD COLUMN sale_uuid CHAR(36) NULL",
+        "ALTER TABLE transactions ADD UNIQUE KEY uq_transactions_sale_uuid (sale_uuid)",
+    ],
+    # 3: the catalog store refreshes with `updated_at >= watermark`
+    3: [
+        "ALTER TABLE products ADD INDEX idx_products_updated_at (updated_at)",
+    ],
+    # 4: history pages and date-range reports seek on transaction_date
+    4: [
+        "ALTER TABLE transactions ADD INDEX idx_transactions_date (transaction_date)",
+    ],
+    # 5: item summary and counts are written at checkout; backfill older sales once
+    5: [
+        "ALTER TABLE transactions ADD COLUMN items_summary TEXT NULL, "
+        "ADD COLUMN item_count INT NOT NULL DEFAULT 0, ADD COLUMN unit_count INT NOT NULL DEFAULT 0",
+        "SET SESSION group_concat_max_len = 1048576",
+        """
+        UPDATE transactions t
+        JOIN (SELECT transaction_id,
+                     GROUP_CONCAT(CONCAT(product_name, ' (', quantity, 'x @ ₱', unit_price, ')')
+                                  ORDER BY id SEPARATOR ', ') AS summary,
+                     COUNT(*) AS lines, SUM(quantity) AS units
+              FROM transaction_items GROUP BY transaction_id) ti ON ti.transaction_id = t.id
+        SET t.items_summary = ti.summary, t.item_count = ti.lines, t.unit_count = ti.units
+        """,
+    ],
+    # 6: receipts keep only their frozen fields and are rendered from the sale rows
+    6: [
+        "ALTER TABLE receipts ADD COLUMN frozen BLOB NULL",
+        compact_receipts,
+        "OPTIMIZE TABLE receipts",  # give the space of the JSON copies back
+    ],
+    # 7: the *_archive tables and *_all views are created by initialize() itself
+    # 8: journal replays look sale_uuid up in the archive too
+    8: [
+        index_archive_sale_uuid,
+    ],
+}
+
+# The same versions for SQLite files (sqlite_standin.SCHEMA is always current;
+# its CREATE INDEX IF NOT EXISTS statements cover versions 3, 4 and 8)
+SQLITE_MIGRATIONS = {
+    2: [
+        "ALTER TABLE transactions ADD COLUMN sale_uuid TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_transactions_sale_uuid ON transactions (sale_uuid)",
+    ],
+    5: [
+        "ALTER TABLE transactions ADD COLUMN items_summary TEXT",
+        "ALTER TABLE transactions ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE transactions ADD COLUMN unit_count INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE transactions
+        SET items_summary = ti.summary, item_count = ti.lines, unit_count = ti.units
+        FROM (SELECT transaction_id, GROUP_CONCAT(line, ', ') AS summary,
+                     COUNT(*) AS lines, SUM(quantity) AS units
+              FROM (SELECT transaction_id, quantity,
+                           product_name || ' (' || quantity || 'x @ ₱' || printf('%.2f', unit_price) || ')' AS line
+                    FROM transaction_items ORDER BY transaction_id, id)
+              GROUP BY transaction_id) AS ti
+        WHERE ti.transaction_id = transactions.id
+        """,
+    ],
+    6: [
+        "ALTER TABLE receipts ADD COLUMN frozen BLOB",
+        compact_receipts,
+    ],
+}
+
+_MIGRATIONS = {"mysql": MIGRATIONS, "sqlite": SQLITE_MIGRATIONS}
+
+_backend = None
+_schema_ready = False
+_schema_lock = threading.Lock()
+_offline_since = None
+
+
+def get_backend():
+    """The storage backend selected by DB_CONFIG["backend"]"""
+    global _backend
+    if _backend is None or _backend.name != DB_CONFIG["backend"]:
+        try:
+            _backend = backends.BACKENDS[DB_CONFIG["backend"]](DB_CONFIG)
+        except KeyError:
+            raise ValueError(f"Unknown database backend {DB_CONFIG['backend']!r}") from None
+    return _backend
+
+
+def configure(**options):
+    """
+    Point db at another database (seeding, benchmarks, load tests): update
+    DB_CONFIG, and forget the schema check and the pooled connections.
+    """
+    global _backend, _schema_ready, pool
+    DB_CONFIG.update(options)
+    _backend = None
+    _schema_ready = False
+    old, pool = pool, ConnectionPool(pool.size)
+    old.close()
+
+
+def get_connection():
+    """Open a DictCursor connection to the POS database"""
+    return get_backend().connect()
 
-        cursor.close()
 
+# ===== Connection pool =====
+class ConnectionPool:
+    """
+    Small thread-safe pool of DictCursor connections.
+    Connections are opened on demand up to `size`; callers beyond that wait
+    for one to be released. Connections go back to the pool they came from,
+    even after configure() has replaced it (a closed pool closes them).
+    """
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self._idle = queue.LifoQueue()  # (connection, idle since)
+        self._lock = threading.Lock()
+        self._open = 0
+        self._in_use = 0
+        self.closed = False
+
+    def acquire(self, timeout=10):
+        """Return (connection, wait_ms)"""
+        start = time.perf_counter()
+        conn, idle_since = None, None
+        try:
+            conn, idle_since = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._open < self.size
+                if can_open:
+                    self._open += 1
+            if can_open:
+                try:
+                    conn = get_connection()
+                except Exception:
+                    with self._lock:
+                        self._open -= 1
+                    raise
+            else:
+                conn, idle_since = self._idle.get(timeout=timeout)
+
+        # Connections left idle a while may have been dropped by the server
+        # (wait_timeout); a ping on every checkout would cost a round trip per query
+        if idle_since is not None and time.monotonic() - idle_since > POOL_PING_AFTER_S:
+            try:
+                conn.ping(reconnect=True)
+            except Exception:
+                self._discard(conn)
+                raise
+
+        with self._lock:
+            self._in_use += 1
+        return conn, (time.perf_counter() - start) * 1000
+
+    def prefill(self, count):
+        """Open up to `count` connections ahead of demand and leave them idle"""
+        opened = []
+        try:
+            for _ in range(min(count, self.size)):
+                opened.append(self.acquire()[0])
+        finally:
+            for conn in opened:
+                self.release(conn)
+        return len(opened)
+
+    def release(self, conn, discard=False):
+        with self._lock:
+            self._in_use -= 1
+        if discard or self.closed:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+
+    def close(self):
+        """Close the idle connections; ones still checked out are closed on release"""
+        self.closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+    def _discard(self, conn):
+        with self._lock:
+            self._open -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "open": self._open, "in_use": self._in_use}
+
+
+pool = ConnectionPool()
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Check out a pooled connection for the duration of a with-block.
+    Yields (connection, wait_ms). The connection is rolled back and dropped
+    if the block raises, so a broken connection is never reused.
+    """
+    owner = pool
+    try:
+        conn, wait_ms = owner.acquire()
     except Exception as e:
-        print(f"❌ Error initializing database: {e}")
+        _track_connectivity(e)
         raise
-    finally:
-        if conn:
-            conn.close()
+    try:
+        yield conn, wait_ms
+    except Exception as e:
+        _track_connectivity(e)
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        owner.release(conn, discard=True)
+        raise
+    else:
+        _track_connectivity(None)
+        owner.release(conn)
 
-def safe_query(query, params=None, fetch="one"):
-    conn = None
+
+def _track_connectivity(error):
+    global _offline_since
+    if error is None:
+        _offline_since = None
+    elif error.args and error.args[0] in CONNECTION_ERRORS:
+        _offline_since = time.monotonic()
+
+
+def is_retryable(error):
+    """True for errors a later attempt can get past: server unreachable, pool exhausted, lock conflicts"""
+    if isinstance(error, queue.Empty):
+        return True
+    code = error.args[0] if error.args else None
+    return code in CONNECTION_ERRORS or code in TRANSIENT_ERRORS
+
+
+def is_online():
+    """
+    False from the moment a pooled connection failed to reach the server
+    until one succeeds again. Only reads a flag, so the GUI thread can call
+    it every tick; probe() does the reconnecting, off the GUI thread.
+    """
+    return _offline_since is None
+
+
+def probe():
+    """
+    Open (or ping) a pooled connection to find out whether the server is
+    reachable again; updates is_online(). Blocks for up to connect_timeout,
+    so call it from a worker thread (sale_journal.SyncWorker does).
+    """
     try:
-        conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
-        cursor = conn.cursor()
-        print(f"DEBUG: Executing query: {query} | params={params}")
-        cursor.execute(query, params or ())
+        with pooled_connection():
+            return True
+    except Exception:
+        return False
+
+
+# ===== Query instrumentation =====
+# Instruments are objects with an on_query(event) method. Every statement run
+# through safe_query or _execute produces one QueryEvent.
+class QueryEvent:
+    __slots__ = ("fingerprint", "query", "params", "elapsed_ms", "wait_ms",
+                 "rows", "error", "explain")
+
+    def __init__(self, fingerprint, query, params, elapsed_ms, wait_ms=0.0,
+                 rows=0, error=None, explain=None):
+        self.fingerprint = fingerprint
+        self.query = query
+        self.params = params
+        self.elapsed_ms = elapsed_ms
+        self.wait_ms = wait_ms
+        self.rows = rows
+        self.error = error
+        self.explain = explain
+
+
+@lru_cache(maxsize=512)
+def fingerprint(query):
+    """Normalize a statement so calls that differ only in literals group together"""
+    fp = re.sub(r"'(?:[^'\\]|\\.)*'", "?", query)
+    fp = re.sub(r"\b\d+(?:\.\d+)?\b", "?", fp)
+    fp = re.sub(r"%s", "?", fp)
+    fp = re.sub(r"\bIN\s*\([?,\s]+\)", "IN (...)", fp, flags=re.IGNORECASE)
+    fp = re.sub(r"\s+", " ", fp).strip().rstrip(";")
+    return fp
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds) with approximate percentiles"""
+
+    BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)  # last slot = overflow
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms):
+        i = 0
+        while i < len(self.BUCKETS_MS) and value_ms > self.BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, pct):
+        """Linear interpolation inside the bucket that holds the percentile"""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= target:
+                lower = self.BUCKETS_MS[i - 1] if i > 0 else 0.0
+                upper = self.BUCKETS_MS[i] if i < len(self.BUCKETS_MS) else self.max_ms
+                return min(lower + (upper - lower) * (target - seen) / c, self.max_ms)
+            seen += c
+        return self.max_ms
+
+
+class QueryMetrics:
+    """Default instrument: per-fingerprint counts, latency, rows and connection wait"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def on_query(self, event):
+        with self._lock:
+            stats = self._stats.get(event.fingerprint)
+            if stats is None:
+                stats = self._stats[event.fingerprint] = {
+                    "count": 0, "errors": 0, "rows": 0, "wait_ms": 0.0,
+                    "latency": LatencyHistogram(),
+                }
+            stats["count"] += 1
+            stats["rows"] += event.rows
+            stats["wait_ms"] += event.wait_ms
+            stats["latency"].observe(event.elapsed_ms)
+            if event.error is not None:
+                stats["errors"] += 1
+
+    def snapshot(self):
+        """Return {fingerprint: summary dict}; safe to read from any thread"""
+        with self._lock:
+            result = {}
+            for fp, stats in self._stats.items():
+                hist = stats["latency"]
+                result[fp] = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "rows": stats["rows"],
+                    "wait_ms": stats["wait_ms"],
+                    "total_ms": hist.total_ms,
+                    "max_ms": hist.max_ms,
+                    "p50_ms": hist.percentile(50),
+                    "p95_ms": hist.percentile(95),
+                    "p99_ms": hist.percentile(99),
+                    "buckets": list(zip(hist.BUCKETS_MS + (float("inf"),), hist.counts)),
+                }
+            return result
+
+
+class SlowQueryLog:
+    """Keeps the most recent slow queries (with EXPLAIN output) and logs them"""
+
+    def __init__(self, maxlen=100):
+        self.entries = deque(maxlen=maxlen)
+        self.logger = logging.getLogger("techstore_pos.slow_query")
+
+    def on_query(self, event):
+        if SLOW_QUERY_MS is None or event.elapsed_ms < SLOW_QUERY_MS:
+            return
+        self.entries.append({
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "fingerprint": event.fingerprint,
+            "params": event.params,
+            "elapsed_ms": event.elapsed_ms,
+            "rows": event.rows,
+            "explain": event.explain,
+        })
+        self.logger.warning("Slow query (%.1f ms): %s | params=%s | explain=%s",
+                            event.elapsed_ms, event.fingerprint, event.params, event.explain)
+
+
+query_metrics = QueryMetrics()
+slow_query_log = SlowQueryLog()
+_instruments = [query_metrics, slow_query_log]
+
+
+def add_query_instrument(instrument):
+    """Register an object whose on_query(event) is called after every statement"""
+    if instrument not in _instruments:
+        _instruments.append(instrument)
+
+
+def remove_query_instrument(instrument):
+    if instrument in _instruments:
+        _instruments.remove(instrument)
+
 
+stock_logger = logging.getLogger("techstore_pos.stock")
+
+_checkout_lock = threading.Lock()
+checkout_stats = {"retries": 0, "gave_up": 0, "out_of_stock": 0, "reconciled": 0}
+
+
+def _count_checkout(key):
+    with _checkout_lock:
+        checkout_stats[key] += 1
+
+
+def get_query_metrics():
+    """Snapshot of query statistics, slow queries and pool usage for other components"""
+    with _checkout_lock:
+        checkout = dict(checkout_stats)
+    return {
+        "queries": query_metrics.snapshot(),
+        "slow_queries": list(slow_query_log.entries),
+        "pool": pool.stats(),
+        "checkout": checkout,
+    }
+
+
+def _explain(cursor, query, params):
+    """EXPLAIN a slow SELECT on the same connection; other statements are skipped"""
+    if not query.lstrip().upper().startswith("SELECT"):
+        return None
+    try:
+        cursor.execute(get_backend().explain + query, params or ())
+        return cursor.fetchall()
+    except Exception:
+        return None
+
+
+def _notify(event):
+    for instrument in list(_instruments):
+        try:
+            instrument.on_query(event)
+        except Exception as e:
+            print(f"⚠️ Query instrument {instrument!r} failed: {e}")
+
+
+def _execute(cursor, query, params=None, fetch=None, wait_ms=0.0):
+    """
+    Execute one statement on an open cursor and report it to the instruments.
+    fetch: "all", "one" or None (no fetch). Returns the fetched result or None.
+    """
+    start = time.perf_counter()
+    try:
+        cursor.execute(query, params or ())
         if fetch == "all":
             result = cursor.fetchall()
-        else:
+            rows = len(result)
+        elif fetch == "one":
             result = cursor.fetchone()
+            rows = 1 if result else 0
+        else:
+            result = None
+            rows = max(cursor.rowcount, 0)
+    except Exception as e:
+        _notify(QueryEvent(fingerprint(query), query, params,
+                           (time.perf_counter() - start) * 1000, wait_ms, error=e))
+        raise
 
-        conn.commit()
-        return result
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    explain = None
+    if SLOW_QUERY_MS is not None and elapsed_ms >= SLOW_QUERY_MS:
+        explain = _explain(cursor, query, params)
+    _notify(QueryEvent(fingerprint(query), query, params, elapsed_ms, wait_ms, rows, explain=explain))
+    return result
+
+
+def get_schema_version():
+    """
+    Return the schema version recorded in the database: backends.UNVERSIONED_SCHEMA
+    for tables created before versions were recorded, None when there are no
+    tables yet.
+    """
+    return get_backend().schema_version()
+
+
+def ensure_database():
+    """
+    Make sure the database is ready, at most once per process.
+    An up-to-date database only costs one version lookup; the full
+    initialize_database() sequence runs only when the schema is missing or old.
+    Safe to call from the warm-up thread and the GUI thread at the same time.
+    Returns True when the database can be used.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return True
+
+    with _schema_lock:
+        if _schema_ready:
+            return True
+        try:
+            version = get_schema_version()
+            if version != SCHEMA_VERSION:
+                initialize_database(version)
+            _schema_ready = True
+        except Exception as e:
+            print(f"❌ Failed to initialize database: {e}")
+            if get_backend().name == "mysql":
+                print("Please make sure MySQL/XAMPP is running and try again.")
+
+    return _schema_ready
+
+
+def initialize_database(current_version=None):
+    """
+    Create the schema if it doesn't exist, then apply the backend's migrations
+    newer than current_version (None for a new database).
+    Called by ensure_database() when the recorded schema version is missing or old.
+    """
+    backend = get_backend()
+    try:
+        backend.initialize(current_version, SCHEMA_VERSION, _MIGRATIONS[backend.name])
+    except Exception as e:
+        print(f"❌ Error initializing database: {e}")
+        raise
+
+def safe_query(query, params=None, fetch="one"):
+    """
+    Run one statement on a pooled connection; errors are printed, not raised.
+    fetch: "one" (row or None), "all" (list, [] on error), None (no result),
+    "compact" (list of records.Record, [] on error), or "iter" / "batches"
+    for a generator of rows / lists of up to STREAM_BATCH_SIZE rows read
+    through an unbuffered cursor (see _stream).
+    """
+    if fetch in ("iter", "batches"):
+        return _stream(query, params, batches=fetch == "batches")
+    if fetch == "compact":
+        # Built from the stream, so at most one batch of dict rows is alive at a time
+        try:
+            return records.compact(_stream(query, params, raise_errors=True))
+        except Exception as e:
+            print("❌ Exception during DB query:", e)
+            return []
+    try:
+        with pooled_connection() as (conn, wait_ms):
+            cursor = conn.cursor()
+            result = _execute(cursor, query, params, fetch if fetch in ("all", None) else "one", wait_ms)
+            cursor.close()
+            conn.commit()
+            return result
     except Exception as e:
         print("❌ Exception during DB query:", e)
         return [] if fetch == "all" else None
+
+
+def query_rows(query, params=None):
+    """
+    All rows as a list, like safe_query(fetch="all"), but errors are raised:
+    for callers that must not mistake a failed query for an empty result.
+    """
+    return list(_stream(query, params, raise_errors=True))
+
+
+def _stream(query, params, batches=False, raise_errors=False):
+    """
+    Generator behind safe_query(fetch="iter"/"batches"). Memory stays bounded
+    by STREAM_BATCH_SIZE however large the result is. The pooled connection
+    stays checked out until the generator is exhausted or closed; a stream
+    abandoned early (break, close()) drops its connection instead of draining
+    the unread rows. Errors end the stream after printing, like safe_query
+    (raise_errors=True raises them instead).
+    """
+    owner = pool
+    try:
+        conn, wait_ms = owner.acquire()
+    except Exception as e:
+        _track_connectivity(e)
+        if raise_errors:
+            raise
+        print("❌ Exception during DB query:", e)
+        return
+
+    finished, error, rows = False, None, 0
+    busy = 0.0  # time spent in the driver, not in the caller's loop body
+    cursor = None
+    try:
+        start = time.perf_counter()
+        cursor = get_backend().streaming_cursor(conn)
+        cursor.execute(query, params or ())
+        busy += time.perf_counter() - start
+        while True:
+            start = time.perf_counter()
+            batch = cursor.fetchmany(STREAM_BATCH_SIZE)
+            busy += time.perf_counter() - start
+            if not batch:
+                break
+            rows += len(batch)
+            if batches:
+                yield batch
+            else:
+                yield from batch
+        finished = True
+    except Exception as e:
+        error = e
+        if raise_errors:
+            raise
+        print("❌ Exception during DB query:", e)
     finally:
-        if conn:
-            conn.close()
+        _notify(QueryEvent(fingerprint(query), query, params, busy * 1000, wait_ms, rows, error=error))
+        _track_connectivity(error)
+        if finished:
+            try:
+                cursor.close()
+                conn.commit()
+            except Exception:
+                finished = False
+        if finished:
+            owner.release(conn)
+        else:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            owner.release(conn, discard=True)
 
 def validate_product_price(price):
     """Validate that product price is greater than zero"""
@@ -152,43 +757,112 @@ def validate_product_price(price):
     except (ValueError, TypeError):
         return False
 
-def get_transaction_details(transaction_id):
-    """Get complete transaction details including all purchased items"""
-    transaction = safe_query(
-        "SELECT * FROM transactions WHERE id = %s",
-        (transaction_id,),
-        fetch="one"
-    )
-
-    if transaction:
-        items = safe_query(
-            "SELECT * FROM transaction_items WHERE transaction_id = %s",
-            (transaction_id,),
-            fetch="all"
-        )
-        transaction['items'] = items
+# transaction_items columns, aliased with a prefix when joined to transactions
+ITEM_COLUMNS = backends.TIERED_TABLES["transaction_items"]
+_ITEM_PREFIX = "item__"
 
+# Ids per IN (...) list in get_transactions_details
+DETAILS_CHUNK_SIZE = 1000
+
+
+def get_transaction_details(transaction_id, with_receipt=False):
+    """
+    Get complete transaction details including all purchased items.
+    One round trip: the items are joined to the header and split apart here
+    (a second one for archived sales). with_receipt=True also adds the
+    receipt's frozen fields as 'frozen', ready for receipt.from_transaction().
+    """
+    for suffix in ("", "_archive"):
+        transaction = _transaction_details(transaction_id, with_receipt, suffix)
+        if transaction is not None:
+            return transaction
+    return None
+
+
+def _transaction_details(transaction_id, with_receipt, suffix):
+    item_columns = ", ".join(f"ti.{c} AS {_ITEM_PREFIX}{c}" for c in ITEM_COLUMNS)
+    receipt_column, receipt_join = "", ""
+    if with_receipt:
+        receipt_column = ", r.frozen AS receipt__frozen"
+        receipt_join = f"LEFT JOIN receipts{suffix} r ON r.transaction_id = t.id"
+    rows = safe_query(f"""
+        SELECT t.*, {item_columns}{receipt_column}
+        FROM transactions{suffix} t
+        {receipt_join}
+        LEFT JOIN transaction_items{suffix} ti ON ti.transaction_id = t.id
+        WHERE t.id = %s
+        ORDER BY ti.id
+    """, (transaction_id,), fetch="all")
+    if not rows:
+        return None
+
+    transaction = {k: v for k, v in rows[0].items() if not k.startswith((_ITEM_PREFIX, "receipt__"))}
+    transaction['items'] = [{c: row[_ITEM_PREFIX + c] for c in ITEM_COLUMNS}
+                            for row in rows if row[_ITEM_PREFIX + "id"] is not None]
+    if with_receipt:
+        transaction['frozen'] = receipt.thaw(rows[0]["receipt__frozen"])
     return transaction
 
-def get_daily_sales_report(date):
+
+def get_transactions_details(transaction_ids):
+    """
+    {id: transaction with 'items'} for many transactions (receipt reprints,
+    audits, exports) in two queries per DETAILS_CHUNK_SIZE ids, on one
+    pooled connection; ids not in the hot tables are then looked up in the
+    archive. Unknown ids are left out; {} on error.
+    """
+    ids = list(dict.fromkeys(transaction_ids))
+    transactions = {}
+    try:
+        with pooled_connection() as (conn, wait_ms):
+            cursor = conn.cursor()
+            for suffix in ("", "_archive"):
+                missing = [tid for tid in ids if tid not in transactions]
+                for start in range(0, len(missing), DETAILS_CHUNK_SIZE):
+                    chunk = tuple(missing[start:start + DETAILS_CHUNK_SIZE])
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    for row in _execute(cursor, f"SELECT * FROM transactions{suffix} WHERE id IN ({placeholders})",
+                                        chunk, "all", wait_ms):
+                        row['items'] = []
+                        transactions[row['id']] = row
+                    for item in _execute(cursor, f"""
+                        SELECT * FROM transaction_items{suffix}
+                        WHERE transaction_id IN ({placeholders})
+                        ORDER BY transaction_id, id
+                    """, chunk, "all"):
+                        transactions[item['transaction_id']]['items'].append(item)
+            cursor.close()
+            conn.commit()
+    except Exception as e:
+        print("❌ Exception during DB query:", e)
+        return {}
+    return {tid: transactions[tid] for tid in ids if tid in transactions}
+
+# History rows; items_summary/item_count/unit_count are written once at checkout
+HISTORY_COLUMNS = ("id, transaction_date, cashier_name, total_amount, amount_paid, change_amount, "
+                   "items_summary, item_count, unit_count")
+
+
+def _list_fetch(stream, compact):
+    """safe_query fetch mode for the list-returning helpers' stream/compact flags"""
+    return "iter" if stream else "compact" if compact else "all"
+
+
+def get_daily_sales_report(date, compact=False):
     """
     Get detailed daily sales report with all transaction details.
     Returns: dict with transactions list, total_sales, and transaction_count
+    compact=True lists records.Record rows instead of dicts.
     """
-    transactions = safe_query("""
-        SELECT t.id, t.transaction_date, t.cashier_name, 
-               t.total_amount, t.amount_paid, t.change_amount,
-               GROUP_CONCAT(
-                   CONCAT(ti.product_name, ' (', ti.quantity, 'x @ ₱', ti.unit_price, ')') 
-                   SEPARATOR ', '
-               ) as items_summary
-        FROM transactions t
-        LEFT JOIN transaction_items ti ON t.id = ti.transaction_id
-        WHERE DATE(t.transaction_date) = %s
-        GROUP BY t.id, t.transaction_date, t.cashier_name, 
-                 t.total_amount, t.amount_paid, t.change_amount
-        ORDER BY t.transaction_date
-    """, (date,), fetch="all")
+    day = _as_date(date)
+    # A date range instead of DATE(column) = %s keeps the transaction_date index usable
+    transactions = _query_tiers(f"""
+        SELECT {HISTORY_COLUMNS}
+        FROM {{table}}
+        WHERE transaction_date >= %s AND transaction_date < %s
+        ORDER BY transaction_date
+    """, (day, day + datetime.timedelta(days=1)), _tiers(day, oldest_first=True),
+        _list_fetch(False, compact), newest_first=False)
 
     total_sales = sum(float(t['total_amount']) for t in transactions) if transactions else 0
 
@@ -199,96 +873,430 @@ def get_daily_sales_report(date):
         'date': date
     }
 
-def get_all_transactions_detailed():
-    """Get all transactions with summary for history view"""
+def get_all_transactions_detailed(stream=False, compact=False, raise_errors=False):
+    """
+    Get all transactions with summary for history view.
+    stream=True returns a generator of rows instead of a list (see _stream);
+    compact=True a list of records.Record rows instead of dicts.
+    raise_errors=True makes a stream raise query errors instead of ending early.
+    """
+    return _query_tiers(f"""
+        SELECT {HISTORY_COLUMNS}
+        FROM {{table}}
+        ORDER BY transaction_date DESC
+    """, (), _tiers(), _list_fetch(stream, compact), raise_errors)
+
+
+def get_transactions_page(cursor=None, page_size=HISTORY_PAGE_SIZE):
+    """
+    One page of the history view, newest first.
+    cursor: None for the first page, else the previous page's next_cursor.
+    Returns {"transactions": [...], "next_cursor": ... or None on the last page}.
+    Keyset pagination: the page seeks on (transaction_date, id) through the
+    date index, so page 1000 costs the same as page 1. Each tier's next rows
+    are merged, since stragglers put old sales in the hot table; the archive
+    is skipped while the hot rows alone fill the page from inside the window.
+    """
+    if cursor is None:
+        where, params = "", ()
+    else:
+        last_date, last_id = cursor
+        where = "WHERE transaction_date < %s OR (transaction_date = %s AND id < %s)"
+        params = (last_date, last_date, last_id)
+    rows = []
+    for table in _tiers():
+        if len(rows) > page_size and _as_date(rows[page_size]["transaction_date"]) >= hot_since():
+            break  # archived sales are all older than the hot window
+        rows += safe_query(f"""
+            SELECT {HISTORY_COLUMNS}
+            FROM {table}
+            {where}
+            ORDER BY transaction_date DESC, id DESC
+            LIMIT %s
+        """, params + (page_size + 1,), fetch="all")
+        rows.sort(key=lambda row: (row["transaction_date"], row["id"]), reverse=True)
+    rows = rows[:page_size + 1]
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1]["transaction_date"], rows[-1]["id"])
+    return {"transactions": rows, "next_cursor": next_cursor}
+
+
+# ===== Reports =====
+def get_sales_total(since=None):
+    """Sum of sales from `since` (a date) onwards; all time when None"""
+    if since is None:
+        row = safe_query("SELECT IFNULL(SUM(total_amount), 0) AS total FROM transactions_all")
+    else:
+        row = safe_query(f"SELECT IFNULL(SUM(total_amount), 0) AS total FROM {_tier_table(since)} "
+                         "WHERE transaction_date >= %s", (since,))
+    return float(row["total"]) if row else 0.0
+
+
+def get_transaction_count():
+    """Number of sales of all time, hot and archived"""
+    row = safe_query("SELECT COUNT(*) AS cnt FROM transactions_all")
+    return row["cnt"] if row else 0
+
+
+def get_sales_by_period(unit, periods=None, descending=False, limit=None):
+    """
+    Transactions and sales per day/week/month/year as [{period, transactions, total}].
+    periods: only the last N units counted back from today (0 = just the
+    current day); None for the whole history.
+    """
+    d = get_backend()
+    bucket = d.bucket("transaction_date", unit)
+    where = f"WHERE transaction_date >= {d.since(periods, unit)}" if periods is not None else ""
+    order = "DESC" if descending else "ASC"
+    limit_clause = f"LIMIT {int(limit)}" if limit else ""
+    # Route on a date no later than the SQL cutoff (months and years vary in length)
+    since = None
+    if periods is not None:
+        days = {"day": 1, "week": 7, "month": 31, "year": 366}[unit]
+        since = datetime.date.today() - datetime.timedelta(days=days * int(periods))
+    return safe_query(f"""
+        SELECT {bucket} AS period, COUNT(*) AS transactions, SUM(total_amount) AS total
+        FROM {_tier_table(since)}
+        {where}
+        GROUP BY {bucket}
+        ORDER BY period {order}
+        {limit_clause}
+    """, fetch="all")
+
+
+def get_transactions_between(start, end, stream=False, compact=False, raise_errors=False):
+    """Transactions with start <= transaction_date < end, newest first (stream/compact/raise_errors as above)"""
+    return _query_tiers(f"""
+        SELECT {HISTORY_COLUMNS}
+        FROM {{table}}
+        WHERE transaction_date >= %s AND transaction_date < %s
+        ORDER BY transaction_date DESC
+    """, (start, end), _tiers(start), _list_fetch(stream, compact), raise_errors)
+
+
+def get_recent_sales(limit=10):
+    """Latest sales with the cashier's username"""
     return safe_query("""
-        SELECT t.id, t.transaction_date, t.cashier_name, 
-               t.total_amount, t.amount_paid, t.change_amount,
-               GROUP_CONCAT(
-                   CONCAT(ti.product_name, ' (', ti.quantity, 'x @ ₱', ti.unit_price, ')') 
-                   SEPARATOR ', '
-               ) as items_summary
+        SELECT t.id, t.transaction_date, t.total_amount, u.username
         FROM transactions t
-        LEFT JOIN transaction_items ti ON t.id = ti.transaction_id
-        GROUP BY t.id, t.transaction_date, t.cashier_name, 
-                 t.total_amount, t.amount_paid, t.change_amount
+        JOIN users u ON t.cashier_id = u.id
         ORDER BY t.transaction_date DESC
+        LIMIT %s
+    """, (limit,), fetch="all")
+
+
+def get_product_sales():
+    """Units sold and revenue per product, best sellers first"""
+    return safe_query("""
+        SELECT p.name AS name,
+               SUM(ti.quantity) AS total_sold,
+               SUM(ti.subtotal) AS revenue
+        FROM transaction_items_all ti
+        JOIN products p ON ti.product_id = p.id
+        GROUP BY p.id, p.name
+        ORDER BY revenue DESC
     """, fetch="all")
 
-def save_transaction_with_items(cashier_id, cashier_name, items, total_amount, amount_paid, change_amount):
+
+# ===== Archive tier =====
+# Sales older than the hot window live in <table>_archive (compressed on
+# MySQL, no foreign keys). Queries that can reach back that far read both
+# tiers, through the <table>_all views or one query per tier; everything
+# within the hot window (checkout, dashboard, recent activity) reads only
+# the hot tables.
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def hot_since():
+    """First day guaranteed to be in the hot tables: roll_archive never moves it"""
+    today = datetime.date.today()
+    month = today.year * 12 + today.month - 1 - ARCHIVE_CONFIG["hot_months"]
+    return datetime.date(month // 12, month % 12 + 1, 1)
+
+
+def _tier_table(since):
+    """transactions when every sale from `since` on is hot, else the transactions_all view"""
+    return "transactions" if since is not None and _as_date(since) >= hot_since() else "transactions_all"
+
+
+def _tiers(since=None, oldest_first=False):
+    """
+    Tables holding sales dated from `since` on, newest tier first. Stragglers
+    (older sales saved after a roll) stay hot until the next one, so the hot
+    table is always searched.
+    """
+    tables = ["transactions"]
+    if since is None or _as_date(since) < hot_since():
+        tables.append("transactions_archive")
+    return tables[::-1] if oldest_first else tables
+
+
+def _query_tiers(query, params, tables, fetch, raise_errors=False, newest_first=True):
+    """
+    Run query (FROM {table}, ORDER BY transaction_date) once per tier and merge
+    the results by transaction_date, newest first unless newest_first=False;
+    stragglers put old sales in the hot table, so the tiers can interleave.
+    raise_errors=True with fetch="iter" streams through _stream(raise_errors=True).
+    """
+    if raise_errors and fetch == "iter":
+        results = [_stream(query.format(table=table), params, raise_errors=True) for table in tables]
+    else:
+        results = [safe_query(query.format(table=table), params, fetch=fetch) for table in tables]
+    if len(results) == 1:
+        return results[0]
+    # Lazy for streams: each tier's stream holds its own pooled connection meanwhile
+    merged = heapq.merge(*results, key=lambda row: row["transaction_date"], reverse=newest_first)
+    return merged if fetch == "iter" else list(merged)
+
+
+def roll_archive(before=None, batch_size=None):
+    """
+    Move sales dated before `before` (default hot_since(), never later) with
+    their items and receipts into the archive tables, ARCHIVE_CONFIG
+    ["batch_size"] sales per DB transaction. Returns the number moved.
+    Safe to run while the tills are selling: new sales are always hot.
+    """
+    before = _as_date(before or hot_since())
+    if before > hot_since():
+        raise ValueError(f"can't archive sales after {hot_since()} (ARCHIVE_CONFIG['hot_months'])")
+    batch_size = batch_size or ARCHIVE_CONFIG["batch_size"]
+
+    moved = 0
+    while True:
+        with pooled_connection() as (conn, wait_ms):
+            cursor = conn.cursor()
+            rows = _execute(cursor, """
+                SELECT id FROM transactions WHERE transaction_date < %s
+                ORDER BY transaction_date LIMIT %s
+            """, (before, batch_size), "all", wait_ms)
+            ids = tuple(row["id"] for row in rows)
+            if ids:
+                placeholders = ", ".join(["%s"] * len(ids))
+                keys = {"transactions": "id", "transaction_items": "transaction_id", "receipts": "transaction_id"}
+                for table, columns in backends.TIERED_TABLES.items():
+                    columns = ", ".join(columns)
+                    _execute(cursor, f"""
+                        INSERT INTO {table}_archive ({columns})
+                        SELECT {columns} FROM {table} WHERE {keys[table]} IN ({placeholders})
+                    """, ids)
+                for table in reversed(list(backends.TIERED_TABLES)):
+                    _execute(cursor, f"DELETE FROM {table} WHERE {keys[table]} IN ({placeholders})", ids)
+            conn.commit()
+            cursor.close()
+        if not ids:
+            return moved
+        moved += len(ids)
+        print(f"✓ Archived {moved:,} sales")
+
+
+def get_archive_stats():
+    """{tier: {"transactions", "oldest", "newest"}} for the hot and archive tables"""
+    stats = {}
+    for tier, table in (("hot", "transactions"), ("archive", "transactions_archive")):
+        row = safe_query(f"SELECT COUNT(*) AS transactions, MIN(transaction_date) AS oldest, "
+                         f"MAX(transaction_date) AS newest FROM {table}")
+        stats[tier] = row or {}
+    return stats
+
+
+class OutOfStockError(Exception):
+    """
+    Raised by save_transaction_with_items when cart lines ask for more than is
+    in stock. `shortages` is a list of {"id", "name", "requested", "available"}.
+    Nothing is saved.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__("Insufficient stock: " + ", ".join(
+            f"{s['name']} ({s['requested']} requested, {s['available']} available)" for s in shortages))
+
+
+def _cart_needs(items):
+    """({product id: units}, {product id: name}) for cart lines; a product on several lines is summed"""
+    needed, names = {}, {}
+    for item in items:
+        needed[item['id']] = needed.get(item['id'], 0) + item['qty']
+        names[item['id']] = item['name']
+    return needed, names
+
+
+def find_shortages(items, available):
+    """Cart lines asking for more than `available` ({product id: stock}) holds, as OutOfStockError.shortages"""
+    needed, names = _cart_needs(items)
+    return [{"id": pid, "name": names[pid], "requested": needed[pid], "available": available.get(pid, 0)}
+            for pid in sorted(needed) if needed[pid] > available.get(pid, 0)]
+
+
+def get_stock_shortages(items):
+    """
+    find_shortages() against the products table, for the till to refuse a
+    cart before the sale is journaled. Only a read: the stock is reserved
+    when the sale is saved. Raises on database errors.
+    """
+    ids = sorted({item['id'] for item in items})
+    with pooled_connection() as (conn, wait_ms):
+        cursor = conn.cursor()
+        rows = _execute(cursor, f"SELECT id, stock FROM products WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                        tuple(ids), "all", wait_ms)
+        cursor.close()
+        conn.commit()
+    return find_shortages(items, {row['id']: row['stock'] for row in rows})
+
+
+def _reserve_stock(cursor, items, wait_ms=0.0, reconcile=False):
+    """
+    Lock the cart's product rows in ascending id order, then decrement each
+    one only if enough stock is left. Returns the short lines (empty if all
+    were reserved); the caller must roll back when it is not empty, unless
+    reconcile is set, in which case short products are zeroed instead.
+    """
+    needed, names = _cart_needs(items)
+    ids = sorted(needed)
+
+    # Every lane locks in the same order, so two baskets can't deadlock each other
+    rows = _execute(cursor, f"""
+        SELECT id, stock FROM products
+        WHERE id IN ({", ".join(["%s"] * len(ids))})
+        ORDER BY id
+        FOR UPDATE
+    """, tuple(ids), fetch="all", wait_ms=wait_ms)
+    available = {row['id']: row['stock'] for row in rows}
+
+    shortages = []
+    for pid in ids:
+        _execute(cursor, """
+            UPDATE products 
+            SET stock = stock - %s 
+            WHERE id = %s AND stock >= %s
+        """, (needed[pid], pid, needed[pid]))
+        if cursor.rowcount != 1:
+            shortages.append({"id": pid, "name": names[pid], "requested": needed[pid],
+                              "available": available.get(pid, 0)})
+            if reconcile:
+                # The goods already left the store; the row is locked, so 0 is exact
+                _execute(cursor, "UPDATE products SET stock = 0 WHERE id = %s", (pid,))
+    return shortages
+
+
+def save_transaction_with_items(cashier_id, cashier_name, items, total_amount, amount_paid, change_amount,
+                                sale_uuid=None, sold_at=None, reconcile=False, raise_errors=False):
     """
     Save complete transaction with all items.
+    Stock is decremented only where enough is left, and deadlocks / lock wait
+    timeouts are retried up to CHECKOUT_RETRIES times.
+    With a sale_uuid the call is idempotent: saving the same sale again returns
+    the existing transaction_id without touching stock. sold_at (a datetime)
+    overrides NOW() for sales journaled earlier.
+    reconcile=True is for sales that already happened (journaled sales, see
+    sale_journal): short lines don't abort the save, the products are set to
+    zero stock and the shortfall is logged for a stock count instead.
+    raise_errors=True raises the last error instead of returning None, for
+    callers that tell retryable errors from permanent ones (is_retryable).
     Returns: transaction_id if successful, None otherwise
+    Raises: OutOfStockError if any line exceeds the available stock
     """
-    conn = None
-    try:
-        conn = pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
+    for attempt in range(CHECKOUT_RETRIES + 1):
+        try:
+            return _save_transaction(cashier_id, cashier_name, items, total_amount, amount_paid, change_amount,
+                                     sale_uuid, sold_at, reconcile)
+        except OutOfStockError:
+            _count_checkout("out_of_stock")
+            raise
+        except Exception as e:
+            # pooled_connection() has already rolled back and dropped the connection
+            code = e.args[0] if e.args else None
+            if sale_uuid and code == 1062 and attempt < CHECKOUT_RETRIES:
+                continue  # same sale committed concurrently; the next attempt finds it
+            transient = code in TRANSIENT_ERRORS
+            if transient and attempt < CHECKOUT_RETRIES:
+                _count_checkout("retries")
+                time.sleep(CHECKOUT_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+                continue
+            if transient:
+                _count_checkout("gave_up")
+            if raise_errors:
+                raise
+            print(f"❌ Error saving transaction: {e}")
+            return None
+
+
+def summarize_items(items):
+    """
+    (items_summary, item_count, unit_count) for cart items, stored on the
+    transaction row: 'Name (2x @ ₱10.00), ...', number of lines, units sold.
+    """
+    summary = ", ".join(f"{item['name']} ({item['qty']}x @ ₱{float(item['price']):.2f})" for item in items)
+    return summary, len(items), sum(int(item['qty']) for item in items)
+
+
+def _save_transaction(cashier_id, cashier_name, items, total_amount, amount_paid, change_amount,
+                      sale_uuid=None, sold_at=None, reconcile=False):
+    """One attempt at save_transaction_with_items, as a single DB transaction"""
+    with pooled_connection() as (conn, wait_ms):
         cursor = conn.cursor()
 
-        cursor.execute("""
-            INSERT INTO transactions 
-            (transaction_date, cashier_id, cashier_name, total_amount, amount_paid, change_amount) 
-            VALUES (NOW(), %s, %s, %s, %s, %s)
-        """, (cashier_id, cashier_name, total_amount, amount_paid, change_amount))
-
-        transaction_id = cursor.lastrowid
-
-        for item in items:
-            cursor.execute("""
-                INSERT INTO transaction_items 
-                (transaction_id, product_id, product_name, product_barcode, 
-                 quantity, unit_price, subtotal) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                transaction_id,
-                item['id'],
-                item['name'],
-                item.get('barcode', ''),
-                item['qty'],
-                item['price'],
-                item['subtotal']
-            ))
-
-            cursor.execute("""
-                UPDATE products 
-                SET stock = stock - %s 
-                WHERE id = %s
-            """, (item['qty'], item['id']))
-
-        # Save receipt data
-        receipt_data = {
-            'transaction_id': str(transaction_id).zfill(10),
-            'date': datetime.datetime.now().strftime("%Y-%m-%d"),
-            'time': datetime.datetime.now().strftime("%H:%M:%S"),
-            'cashier': cashier_name,
-            'items': items,
-            'subtotal': sum(item['subtotal'] for item in items),
-            'tax': sum(item['subtotal'] for item in items) * 0.12,
-            'total': total_amount,
-            'payment': amount_paid,
-            'change': change_amount
-        }
-        cursor.execute("""
-            INSERT INTO receipts (transaction_id, receipt_data, created_at)
-            VALUES (%s, %s, NOW())
-        """, (transaction_id, json.dumps(receipt_data)))
+        if sale_uuid:
+            # A replay can come after roll_archive moved the sale; both lookups are indexed
+            for table in ("transactions", "transactions_archive"):
+                existing = _execute(cursor, f"SELECT id FROM {table} WHERE sale_uuid = %s",
+                                    (sale_uuid,), fetch="one", wait_ms=wait_ms)
+                if existing:
+                    conn.rollback()
+                    cursor.close()
+                    return existing['id']
 
-        conn.commit()
-        print(f"✓ Transaction {transaction_id} saved successfully with {len(items)} items")
-        return transaction_id
+        shortages = _reserve_stock(cursor, items, wait_ms, reconcile)
+        if shortages and reconcile:
+            _count_checkout("reconciled")
+            stock_logger.warning("Sale %s sold more than in stock, set to 0: %s", sale_uuid,
+                                 ", ".join(f"{s['name']} ({s['requested']} sold, {s['available']} on record)"
+                                           for s in shortages))
+        if not shortages or reconcile:
+            _execute(cursor, """
+                INSERT INTO transactions 
+                (transaction_date, cashier_id, cashier_name, total_amount, amount_paid, change_amount, sale_uuid,
+                 items_summary, item_count, unit_count) 
+                VALUES (COALESCE(%s, NOW()), %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, (sold_at, cashier_id, cashier_name, total_amount, amount_paid, change_amount, sale_uuid)
+                + summarize_items(items))
 
-    except Exception as e:
-        if conn:
-            conn.rollback()
-        print(f"❌ Error saving transaction: {e}")
-        return None
-    finally:
-        if conn:
-            conn.close()
+            transaction_id = cursor.lastrowid
+
+            for item in items:
+                _execute(cursor, """
+                    INSERT INTO transaction_items 
+                    (transaction_id, product_id, product_name, product_barcode, 
+                     quantity, unit_price, subtotal) 
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (
+                    transaction_id,
+                    item['id'],
+                    item['name'],
+                    item.get('barcode', ''),
+                    item['qty'],
+                    item['price'],
+                    item['subtotal']
+                ))
 
-# Initialize database when module is imported
-try:
-    initialize_database()
-except Exception as e:
-    print(f"❌ Failed to initialize database: {e}")
-    print("Please make sure MySQL/XAMPP is running and try again.")
\ No newline at end of file
+            # Only the fields a reprint can't derive from the rows above (see receipt.py)
+            _execute(cursor, """
+                INSERT INTO receipts (transaction_id, frozen, created_at)
+                VALUES (%s, %s, NOW())
+            """, (transaction_id, receipt.freeze(receipt.receipt_number(transaction_id, sale_uuid))))
+
+            conn.commit()
+            cursor.close()
+            return transaction_id
+
+        conn.rollback()
+        cursor.close()
+    raise OutOfStockError(shortages)
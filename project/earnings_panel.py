@@ -5,7 +5,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-from db import safe_query
+from db import get_sales_total, get_sales_by_period
+import datetime
 
 
 class EarningsPanel(QWidget):
@@ -136,18 +137,11 @@ class EarningsPanel(QWidget):
             return card
 
         # ===== DB Queries =====
-        daily = safe_query("SELECT IFNULL(SUM(total),0) AS total FROM transactions WHERE DATE(created_at)=CURDATE();")
-        weekly = safe_query(
-            "SELECT IFNULL(SUM(total),0) AS total FROM transactions WHERE created_at>=CURDATE()-INTERVAL 7 DAY;")
-        monthly = safe_query(
-            "SELECT IFNULL(SUM(total),0) AS total FROM transactions WHERE created_at>=CURDATE()-INTERVAL 30 DAY;")
-        total = safe_query("SELECT IFNULL(SUM(total),0) AS total FROM transactions;")
-
-        # Handle None results safely
-        daily_val = float(daily['total']) if daily and daily.get('total') is not None else 0.0
-        weekly_val = float(weekly['total']) if weekly and weekly.get('total') is not None else 0.0
-        monthly_val = float(monthly['total']) if monthly and monthly.get('total') is not None else 0.0
-        total_val = float(total['total']) if total and total.get('total') is not None else 0.0
+        today = datetime.date.today()
+        daily_val = get_sales_total(today)
+        weekly_val = get_sales_total(today - datetime.timedelta(days=7))
+        monthly_val = get_sales_total(today - datetime.timedelta(days=30))
+        total_val = get_sales_total()
 
         cards = [
             ("Today", f"₱{daily_val:,.2f}", "today"),
@@ -162,18 +156,11 @@ class EarningsPanel(QWidget):
     def refresh(self):
         """Refresh all earnings data - called automatically every 5 seconds"""
         # Update card values
-        daily = safe_query("SELECT IFNULL(SUM(total),0) AS total FROM transactions WHERE DATE(created_at)=CURDATE();")
-        weekly = safe_query(
-            "SELECT IFNULL(SUM(total),0) AS total FROM transactions WHERE created_at>=CURDATE()-INTERVAL 7 DAY;")
-        monthly = safe_query(
-            "SELECT IFNULL(SUM(total),0) AS total FROM transactions WHERE created_at>=CURDATE()-INTERVAL 30 DAY;")
-        total = safe_query("SELECT IFNULL(SUM(total),0) AS total FROM transactions;")
-
-        # Handle None results safely
-        daily_val = float(daily['total']) if daily and daily.get('total') is not None else 0.0
-        weekly_val = float(weekly['total']) if weekly and weekly.get('total') is not None else 0.0
-        monthly_val = float(monthly['total']) if monthly and monthly.get('total') is not None else 0.0
-        total_val = float(total['total']) if total and total.get('total') is not None else 0.0
+        today = datetime.date.today()
+        daily_val = get_sales_total(today)
+        weekly_val = get_sales_total(today - datetime.timedelta(days=7))
+        monthly_val = get_sales_total(today - datetime.timedelta(days=30))
+        total_val = get_sales_total()
 
         # Update labels
         if "today" in self.card_labels:
@@ -192,15 +179,9 @@ class EarningsPanel(QWidget):
         self.figure.clear()
         ax = self.figure.add_subplot(111)
 
-        rows = safe_query("""
-            SELECT DATE(created_at) AS day, SUM(total) AS total
-            FROM transactions
-            WHERE created_at >= CURDATE() - INTERVAL 7 DAY
-            GROUP BY day
-            ORDER BY day;
-        """, fetch="all") or []
+        rows = get_sales_by_period("day", 7)
 
-        days = [str(r["day"]) for r in rows]
+        days = [str(r["period"]) for r in rows]
         totals = [float(r["total"]) for r in rows]
 
         # Modern chart styling
@@ -0,0 +1,71 @@
+# export_transactions.py
+"""
+Export transaction history to CSV for accountants and audits.
+
+Rows are streamed from the database (stream=True) and written as they
+arrive, so exporting years of sales uses the same memory as a single day. A
+query error mid-export deletes the partial file and exits with status 1, so
+a truncated CSV is never mistaken for a complete one.
+
+Usage (from the project folder):
+    python export_transactions.py --output sales.csv
+    python export_transactions.py --output may.csv --start 2024-05-01 --end 2024-06-01
+"""
+import argparse
+import csv
+import datetime
+import os
+import time
+
+import db
+
+COLUMNS = ["id", "transaction_date", "cashier_name", "total_amount", "amount_paid",
+           "change_amount", "item_count", "unit_count", "items_summary"]
+
+
+def export(path, start=None, end=None):
+    """
+    Write transactions (all, or start <= date < end) to path; returns the row
+    count. Query errors are raised, and the partial file is removed first.
+    """
+    if start or end:
+        rows = db.get_transactions_between(start or datetime.date.min, end or datetime.date.max,
+                                           stream=True, raise_errors=True)
+    else:
+        rows = db.get_all_transactions_detailed(stream=True, raise_errors=True)
+
+    count = 0
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export transactions to CSV")
+    parser.add_argument("--output", required=True, help="CSV file to write")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=datetime.date.fromisoformat, help="day after the last one")
+    args = parser.parse_args()
+
+    if not db.ensure_database():
+        raise SystemExit(1)
+    start = time.perf_counter()
+    try:
+        count = export(args.output, args.start, args.end)
+    except Exception as e:
+        print(f"❌ Export failed, {args.output} was not written: {e}")
+        raise SystemExit(1)
+    print(f"✓ Exported {count:,} transactions to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
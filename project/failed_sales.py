@@ -0,0 +1,54 @@
+# failed_sales.py
+"""
+Maintenance command for journaled sales the server refused.
+
+The sync worker sets a sale aside as "failed" after JOURNAL_CONFIG
+["max_attempts"] refusals (a deleted product or cashier, a schema mismatch)
+so the sales behind it still sync; the till shows how many are waiting.
+List them, fix the cause in the database, then put them back in the queue:
+the running POS pushes them on its next pass. Run it on the lane whose
+journal holds them.
+
+Usage (from the project folder):
+    python failed_sales.py --list
+    python failed_sales.py --retry
+    python failed_sales.py --retry 3f2b9c1e-...
+"""
+import argparse
+
+import sale_journal
+
+
+def print_failed(journal):
+    rows = journal.failed()
+    if not rows:
+        print("✓ No failed sales")
+        return
+    for row in rows:
+        print(f"  {row['sale_uuid']}  {row['sold_at']}  {row['attempts']} attempt(s)  {row['last_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or retry journaled sales the server refused")
+    parser.add_argument("--list", action="store_true", help="show the failed sales and their last error")
+    parser.add_argument("--retry", nargs="?", const="", metavar="SALE_UUID",
+                        help="queue every failed sale (or just this one) for another sync")
+    args = parser.parse_args()
+    if not args.list and args.retry is None:
+        parser.error("nothing to do; pass --list and/or --retry")
+
+    journal = sale_journal.SaleJournal(sale_journal.JOURNAL_CONFIG["path"])
+    try:
+        if args.retry is not None:
+            count = journal.requeue_failed(args.retry or None)
+            if args.retry and not count:
+                parser.error(f"no failed sale {args.retry}")
+            print(f"✓ Queued {count} sale(s) for another sync")
+        if args.list:
+            print_failed(journal)
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()
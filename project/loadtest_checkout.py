@@ -0,0 +1,231 @@
+# loadtest_checkout.py
+"""
+Multi-cashier checkout load test.
+
+Simulates K cashiers building carts and checking out concurrently through the
+real data layer (db.save_transaction_with_items) against a dedicated
+database seeded by seed_data.py. Popular products are picked far more often
+(Zipf-like), so lanes contend for the same products.stock rows.
+
+Reports throughput, checkout latency percentiles, deadlocks / lock wait
+timeouts and oversell incidents (negative stock, or stock that does not
+match what the cashiers actually sold).
+
+Usage (from the project folder, with MySQL running):
+    python loadtest_checkout.py --cashiers 8 --duration 60
+    python loadtest_checkout.py --cashiers 16 --mode process --stock 50
+"""
+import argparse
+import multiprocessing
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+
+import db
+from seed_data import CASHIERS, connection_factory, seed
+
+# MySQL error codes worth counting separately
+DEADLOCK = 1213
+LOCK_WAIT_TIMEOUT = 1205
+
+
+class ErrorCounter:
+    """db query instrument counting failed statements by MySQL error code"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.codes = Counter()
+
+    def on_query(self, event):
+        if event.error is None:
+            return
+        code = event.error.args[0] if event.error.args and isinstance(event.error.args[0], int) else None
+        with self.lock:
+            self.codes[code or type(event.error).__name__] += 1
+
+
+def setup_worker(backend, target, pool_size):
+    """Point db at the load-test database (called once per process)"""
+    connection_factory(backend, target)
+    db.pool = db.ConnectionPool(pool_size)
+    counter = ErrorCounter()
+    db.add_query_instrument(counter)
+    return counter
+
+
+def build_cart(rng, products, weights, max_lines):
+    """Pick a basket of distinct products, favouring the popular ones"""
+    lines = min(1 + int(rng.expovariate(0.6)), max_lines, len(products))
+    chosen = {}
+    while len(chosen) < lines:
+        product = rng.choices(products, weights=weights)[0]
+        chosen[product["id"]] = product
+    cart = []
+    for product in chosen.values():
+        qty = 1 if rng.random() < 0.8 else rng.randint(2, 4)
+        price = float(product["price"])
+        cart.append({"id": product["id"], "name": product["name"], "barcode": product["barcode"],
+                     "qty": qty, "price": price, "subtotal": round(price * qty, 2)})
+    return cart
+
+
+def cashier_loop(index, products, weights, duration, think_ms, max_lines, seed_value):
+    """Run one cashier until the deadline; return its stats"""
+    rng = random.Random(seed_value + index)
+    latencies, sold = [], Counter()
+    ok = failed = short = 0
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        cart = build_cart(rng, products, weights, max_lines)
+        if think_ms:
+            time.sleep(rng.uniform(0, think_ms) / 1000)
+
+        subtotal = sum(item["subtotal"] for item in cart)
+        total = round(subtotal * 1.12, 2)
+        paid = float(int(total // 100 + 1) * 100)
+
+        start = time.perf_counter()
+        # seed_data creates users 2..len(CASHIERS)+1 as cashiers
+        cashier = index % len(CASHIERS)
+        try:
+            transaction_id = db.save_transaction_with_items(
+                cashier + 2, CASHIERS[cashier], cart, total, paid, round(paid - total, 2))
+        except db.OutOfStockError:
+            latencies.append((time.perf_counter() - start) * 1000)
+            short += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        if transaction_id:
+            ok += 1
+            for item in cart:
+                sold[item["id"]] += item["qty"]
+        else:
+            failed += 1
+
+    return {"latencies": latencies, "ok": ok, "failed": failed, "short": short, "sold": sold}
+
+
+def _process_worker(job):
+    backend, target, index, products, weights, duration, think_ms, max_lines, seed_value = job
+    counter = setup_worker(backend, target, pool_size=2)
+    result = cashier_loop(index, products, weights, duration, think_ms, max_lines, seed_value)
+    result["errors"] = counter.codes
+    result["checkout"] = db.get_query_metrics()["checkout"]
+    return result
+
+
+def load_products(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, barcode, name, price, stock FROM products ORDER BY id")
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent checkout load test")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql")
+    parser.add_argument("--target", default="techstore_pos_loadtest",
+                        help="MySQL database (or SQLite file) used for the test; it is reseeded")
+    parser.add_argument("--cashiers", type=int, default=8)
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=None,
+                        help="reset every product to this stock to provoke sell-outs")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for product popularity")
+    parser.add_argument("--max-lines", type=int, default=8)
+    parser.add_argument("--think-ms", type=float, default=0, help="max random pause before each checkout")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.backend == "mysql" and args.target == db.DB_CONFIG["database"]:
+        parser.error("refusing to load-test the live database; pick another --target")
+
+    counter = setup_worker(args.backend, args.target, pool_size=args.cashiers + 1)
+    conn = db.get_connection()
+    seed(conn, args.backend, products=args.products, transactions=1000, seed_value=args.seed)
+    if args.stock is not None:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE products SET stock = %s", (args.stock,))
+        conn.commit()
+        cursor.close()
+    products = load_products(conn)
+    conn.close()
+
+    initial_stock = {p["id"]: p["stock"] for p in products}
+    weights = [1 / (rank + 1) ** args.skew for rank in range(len(products))]
+
+    print(f"Running {args.cashiers} cashiers ({args.mode}s) for {args.duration:.0f}s "
+          f"against {args.target}...")
+    started = time.perf_counter()
+    if args.mode == "thread":
+        results = [None] * args.cashiers
+
+        def run(i):
+            results[i] = cashier_loop(i, products, weights, args.duration, args.think_ms,
+                                      args.max_lines, args.seed)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(args.cashiers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        errors = counter.codes
+        checkout = db.get_query_metrics()["checkout"]
+    else:
+        jobs = [(args.backend, args.target, i, products, weights, args.duration, args.think_ms,
+                 args.max_lines, args.seed) for i in range(args.cashiers)]
+        with multiprocessing.Pool(args.cashiers) as workers:
+            results = workers.map(_process_worker, jobs)
+        errors, checkout = Counter(), Counter()
+        for r in results:
+            errors.update(r["errors"])
+            checkout.update(r["checkout"])
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(l for r in results for l in r["latencies"])
+    ok = sum(r["ok"] for r in results)
+    failed = sum(r["failed"] for r in results)
+    short = sum(r["short"] for r in results)
+    sold = Counter()
+    for r in results:
+        sold.update(r["sold"])
+
+    # Oversell check: stock must never go negative and must equal initial - sold
+    conn = db.get_connection()
+    final_stock = {p["id"]: p["stock"] for p in load_products(conn)}
+    conn.close()
+    negative = [pid for pid, stock in final_stock.items() if stock < 0]
+    mismatched = [pid for pid, stock in final_stock.items() if stock != initial_stock[pid] - sold[pid]]
+
+    print("\n=== Checkout load test ===")
+    print(f"Checkouts:        {ok:,} ok, {short:,} out of stock, {failed:,} failed in {elapsed:.1f}s")
+    print(f"Throughput:       {ok / elapsed:,.1f} checkouts/s")
+    if latencies:
+        print(f"Latency (ms):     p50 {statistics.median(latencies):.1f} | p95 {percentile(latencies, 95):.1f} | "
+              f"p99 {percentile(latencies, 99):.1f} | max {latencies[-1]:.1f}")
+    print(f"Deadlocks:        {errors.get(DEADLOCK, 0)}")
+    print(f"Lock wait t/o:    {errors.get(LOCK_WAIT_TIMEOUT, 0)}")
+    print(f"Retries:          {checkout.get('retries', 0)} ({checkout.get('gave_up', 0)} gave up)")
+    other = {k: v for k, v in errors.items() if k not in (DEADLOCK, LOCK_WAIT_TIMEOUT)}
+    if other:
+        print(f"Other errors:     {dict(other)}")
+    print(f"Oversold products: {len(negative)} with negative stock"
+          + (f" (ids {negative[:10]})" if negative else ""))
+    print(f"Stock mismatches:  {len(mismatched)}"
+          + (f" (ids {mismatched[:10]})" if mismatched else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,31 +6,18 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QColor, QFont
 from PyQt6.QtCore import Qt
 
-from db import safe_query
-from main_window import MainWindow
-
-
-def load_stylesheet(filename):
-    """Helper to load QSS file from qss directory"""
-    try:
-        with open(f"qss/{filename}", "r") as f:
-            return f.read()
-    except FileNotFoundError:
-        print(f"⚠️ Stylesheet {filename} not found in qss folder.")
-        return ""
+from db import safe_query, ensure_database
 
 
 class LoginWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("TechStore POS - Login")
+        self.setObjectName("loginWindow")  # scope of qss/login.qss
 
         # ✅ Fullscreen mode
         self.showMaximized()
 
-        # ✅ Apply login stylesheet
-        self.setStyleSheet(load_stylesheet("login.qss"))
-
         main_layout = QHBoxLayout()
         main_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
@@ -90,10 +77,27 @@ class LoginWindow(QWidget):
         main_layout.addWidget(card)
         self.setLayout(main_layout)
 
+        self.main_window = None  # kept after the first sign-in and reused
+
+    def reset(self, main_window=None):
+        """Clear the form for the next sign-in, remembering the window to reuse"""
+        if main_window is not None:
+            self.main_window = main_window
+        self.username.clear()
+        self.password.clear()
+        self.error_label.setText("")
+        self.username.setFocus()
+
     def handle_login(self):
         user = self.username.text().strip()
         pwd = self.password.text().strip()
 
+        # ✅ No-op once the login warm-up has prepared the database
+        # (waits for it if the warm-up is still running)
+        if not ensure_database():
+            self.error_label.setText("Cannot connect to the database.")
+            return
+
         query = "SELECT * FROM users WHERE username=%s AND password=%s"
         account = safe_query(query, (user, pwd))
 
@@ -101,9 +105,14 @@ class LoginWindow(QWidget):
             role = account["role"]
             user_id = account["id"]
 
-            # ✅ Go straight to main window
-            self.main_window = MainWindow(user_id, user, role)
-            self.main_window.show()
-            self.close()
+            # ✅ Reuse the main window after a logout: only the session changes
+            if self.main_window is not None:
+                self.main_window.start_session(user_id, user, role)
+            else:
+                # Imported here to keep login startup light
+                from main_window import MainWindow
+                self.main_window = MainWindow(user_id, user, role, login_window=self)
+                self.main_window.show()
+            self.hide()
         else:
             self.error_label.setText("Invalid username or password.")
\ No newline at end of file
@@ -1,18 +1,37 @@
 import sys
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
 from login_window import LoginWindow
+import metrics
+import sale_journal
+import theme
+import warmup
+import watchdog
 
-def load_stylesheet(filename):
-    """Load external QSS file"""
-    with open(filename, "r") as f:
-        return f.read()
+def start(app):
+    """
+    Startup sequence: show the login window first, then warm up the database,
+    catalog and panel modules in the background while the cashier signs in.
+    Returns the login window.
+    """
+    # ✅ Every qss/*.qss file is parsed once, here, for the whole app
+    theme.apply(app)
+    window = LoginWindow()
+    window.show()
 
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    # ✅ DB work waits until the event loop has painted the login window,
+    # then runs off the GUI thread (see warmup.py)
+    QTimer.singleShot(0, warmup.start)
+    QTimer.singleShot(0, metrics.start_exporters)
 
-    # Example: start login window
-    app.setStyleSheet(load_stylesheet("qss/login.qss"))
-    window = LoginWindow()
+    # ✅ Push sales journaled before the last shutdown
+    QTimer.singleShot(0, sale_journal.start)
 
-    window.show()
+    # ✅ Log GUI freezes with the panel/handler that caused them
+    watchdog.start()
+    return window
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    window = start(app)
     sys.exit(app.exec())
@@ -3,16 +3,66 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QFrame, QStackedWidget, QLabel, QMessageBox
 )
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer
 from PyQt6.QtGui import QPixmap
-from dashboard_panel import DashboardPanel
-from products_panel import ProductsPanel
-from transactions_panel import TransactionsPanel
-from admins_panel import AdminsPanel
+
+import theme
+
+
+# ===== Panel registry =====
+# Sidebar entries per role, in display order. The first entry is the landing panel.
+ROLE_PANELS = {
+    "admin": ["dashboard", "products", "transactions", "admins"],
+    "cashier": ["transactions"],
+}
+
+
+# Panels are only built the first time their nav button is used, so each
+# factory receives the MainWindow to read the session (user id, role...).
+# Panel modules are imported inside the factories, so nothing is imported at
+# sign-in that warmup.py has not already loaded (POS_WARMUP_MODULES decides
+# whether a cashier terminal ever loads matplotlib or the admin tools).
+def _build_dashboard(win):
+    from dashboard_panel import DashboardPanel
+    return DashboardPanel(win.username, win.role)
+
+
+def _build_products(win):
+    from products_panel import ProductsPanel
+    return ProductsPanel()
+
+
+def _build_transactions(win):
+    from transactions_panel import TransactionsPanel
+    return TransactionsPanel(win.user_id, win.username)
+
+
+def _build_admins(win):
+    from admins_panel import AdminsPanel
+    return AdminsPanel()
+
+
+PANEL_FACTORIES = {
+    "dashboard": _build_dashboard,
+    "products": _build_products,
+    "transactions": _build_transactions,
+    "admins": _build_admins,
+}
+
+
+# Panels holding per-user state are re-bound when the cashier changes
+# instead of being rebuilt; the others only read the shared catalog/DB.
+def _rebind_transactions(panel, win):
+    panel.set_session(win.user_id, win.username)
+
+
+PANEL_SESSION_HOOKS = {
+    "transactions": _rebind_transactions,
+}
 
 
 class MainWindow(QWidget):
-    def __init__(self, user_id, username, role):
+    def __init__(self, user_id, username, role, prewarm=False, login_window=None):
         super().__init__()
         self.setWindowTitle("TechStore POS")
         self.showMaximized()
@@ -20,7 +70,10 @@ class MainWindow(QWidget):
         self.user_id = user_id
         self.username = username
         self.role = role
+        self.login_window = login_window  # reused on logout
         self.active_button = None  # ✅ track active button
+        self.panels = {}  # key -> panel, filled lazily by get_panel()
+        self.panel_keys = ROLE_PANELS.get(role, ROLE_PANELS["cashier"])
 
         # ===== Main layout =====
         main_layout = QHBoxLayout(self)
@@ -54,13 +107,13 @@ class MainWindow(QWidget):
         app_name.setObjectName("appName")
         app_name.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
-        subtitle = QLabel(f"{role.capitalize()}'s Portal")
-        subtitle.setObjectName("appSubtitle")
-        subtitle.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.subtitle = QLabel(f"{role.capitalize()}'s Portal")
+        self.subtitle.setObjectName("appSubtitle")
+        self.subtitle.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         sidebar_layout.addWidget(logo)
         sidebar_layout.addWidget(app_name)
-        sidebar_layout.addWidget(subtitle)
+        sidebar_layout.addWidget(self.subtitle)
 
         # Separator line
         top_line = QFrame()
@@ -74,25 +127,26 @@ class MainWindow(QWidget):
         self.transactions_btn = QPushButton(" Transactions")
         self.admins_btn = QPushButton(" Admin Tools")
 
-        self.nav_buttons = [self.dashboard_btn, self.products_btn,
-                            self.transactions_btn, self.admins_btn]
+        self.nav_buttons = {
+            "dashboard": self.dashboard_btn,
+            "products": self.products_btn,
+            "transactions": self.transactions_btn,
+            "admins": self.admins_btn,
+        }
 
-        for btn in self.nav_buttons:
+        for key, btn in self.nav_buttons.items():
             btn.setObjectName("navButton")
             btn.setCursor(Qt.CursorShape.PointingHandCursor)
             btn.setIconSize(QSize(20, 20))
-            btn.clicked.connect(lambda checked, b=btn: self.set_active_button(b))
+            btn.clicked.connect(lambda checked, k=key: self.show_panel(k))
 
         # ===== Role-based button display =====
-        if role == "admin":
-            # Admin sees: Dashboard, Products, Transactions, Admin Tools
-            sidebar_layout.addWidget(self.dashboard_btn)
-            sidebar_layout.addWidget(self.products_btn)
-            sidebar_layout.addWidget(self.transactions_btn)
-            sidebar_layout.addWidget(self.admins_btn)
-        else:
-            # Cashier sees: Transactions only
-            sidebar_layout.addWidget(self.transactions_btn)
+        # Admin sees: Dashboard, Products, Transactions, Admin Tools
+        # Cashier sees: Transactions only
+        # All buttons live in the sidebar; start_session() shows the role's ones.
+        for key, btn in self.nav_buttons.items():
+            sidebar_layout.addWidget(btn)
+            btn.setVisible(key in self.panel_keys)
 
         sidebar_layout.addStretch()
 
@@ -111,55 +165,73 @@ class MainWindow(QWidget):
         # ===== Content Area =====
         self.stack = QStackedWidget()
 
-        # Panels
-        self.dashboard_panel = DashboardPanel(username, role)
-        self.products_panel = ProductsPanel()
-        self.transactions_panel = TransactionsPanel(self.user_id)
-        self.admins_panel = AdminsPanel()
-
-        # Add panels to stack
-        self.stack.addWidget(self.dashboard_panel)
-        self.stack.addWidget(self.products_panel)
-        self.stack.addWidget(self.transactions_panel)
-        self.stack.addWidget(self.admins_panel)
-
         # Add to layout
         main_layout.addWidget(sidebar)
         main_layout.addWidget(self.stack)
 
-        # Connect buttons to panels
-        self.dashboard_btn.clicked.connect(lambda: self.stack.setCurrentWidget(self.dashboard_panel))
-        self.products_btn.clicked.connect(lambda: self.stack.setCurrentWidget(self.products_panel))
-        self.transactions_btn.clicked.connect(lambda: self.stack.setCurrentWidget(self.transactions_panel))
-        self.admins_btn.clicked.connect(lambda: self.stack.setCurrentWidget(self.admins_panel))
         self.logout_btn.clicked.connect(self.handle_logout)
 
-        # ✅ Set default active button and panel based on role
-        if role == "admin":
-            self.set_active_button(self.dashboard_btn)
-            self.stack.setCurrentWidget(self.dashboard_panel)
-        else:
-            # Cashier starts with transactions panel
-            self.set_active_button(self.transactions_btn)
-            self.stack.setCurrentWidget(self.transactions_panel)
+        # ✅ Only the landing panel is built now (Dashboard for admins,
+        # Transactions for cashiers); the rest are built on first click.
+        self.show_panel(self.panel_keys[0])
+
+        # Optionally build the remaining panels once the window has painted
+        if prewarm:
+            QTimer.singleShot(0, self.prewarm_panels)
+
+        # Sidebar styles come from the application theme (qss/sidebar.qss)
+
+    def start_session(self, user_id, username, role):
+        """
+        Switch to another signed-in user without rebuilding the window.
+        Built panels, the catalog store and DB connections stay alive; panels
+        with per-user state are re-bound and the sidebar follows the new role.
+        """
+        self.user_id = user_id
+        self.username = username
+        self.role = role
+        self.panel_keys = ROLE_PANELS.get(role, ROLE_PANELS["cashier"])
+        self.subtitle.setText(f"{role.capitalize()}'s Portal")
+
+        for key, btn in self.nav_buttons.items():
+            btn.setVisible(key in self.panel_keys)
+        for key, panel in self.panels.items():
+            hook = PANEL_SESSION_HOOKS.get(key)
+            if hook:
+                hook(panel, self)
 
-        # Apply styles safely
-        try:
-            with open("qss/sidebar.qss", "r") as f:
-                self.setStyleSheet(f.read())
-        except Exception as e:
-            print(f"⚠️ Could not load sidebar.qss: {e}")
+        self.show_panel(self.panel_keys[0])
+        self.showMaximized()
+
+    def get_panel(self, key):
+        """Return the panel for a nav key, building it on first use"""
+        panel = self.panels.get(key)
+        if panel is None:
+            panel = PANEL_FACTORIES[key](self)
+            self.panels[key] = panel
+            self.stack.addWidget(panel)
+        return panel
+
+    def show_panel(self, key):
+        """Switch the content area to a panel and highlight its nav button"""
+        if key not in self.panel_keys:
+            return
+        self.stack.setCurrentWidget(self.get_panel(key))
+        self.set_active_button(self.nav_buttons[key])
+
+    def prewarm_panels(self):
+        """Build one not-yet-opened panel per event loop pass so the UI stays responsive"""
+        for key in self.panel_keys:
+            if key not in self.panels:
+                self.get_panel(key)
+                QTimer.singleShot(0, self.prewarm_panels)
+                return
 
     def set_active_button(self, button):
         """Highlight the selected nav button"""
         if self.active_button:
-            self.active_button.setProperty("active", False)
-            self.active_button.style().unpolish(self.active_button)
-            self.active_button.style().polish(self.active_button)
-
-        button.setProperty("active", True)
-        button.style().unpolish(button)
-        button.style().polish(button)
+            theme.set_state(self.active_button, "active", False)
+        theme.set_state(button, "active", True)
 
         self.active_button = button
 
@@ -174,7 +246,13 @@ class MainWindow(QWidget):
         )
 
         if confirm == QMessageBox.StandardButton.Yes:
+            self.logout()
+
+    def logout(self):
+        """Back to the sign-in screen, keeping this window and its panels for the next session"""
+        if self.login_window is None:
             from login_window import LoginWindow
             self.login_window = LoginWindow()
-            self.login_window.showMaximized()
-            self.close()
\ No newline at end of file
+        self.login_window.reset(main_window=self)
+        self.login_window.showMaximized()
+        self.hide()
\ No newline at end of file
@@ -0,0 +1,286 @@
+# metrics.py
+"""
+Prometheus-style metrics for a POS terminal.
+
+Metrics are kept in-process and exposed in the Prometheus text format, either
+as a textfile for node_exporter's textfile collector or on a small local HTTP
+endpoint (GET /metrics). Both are off unless configured in METRICS_CONFIG or
+through the POS_METRICS_PORT / POS_METRICS_TEXTFILE environment variables.
+"""
+import functools
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import db
+
+METRICS_CONFIG = {
+    "terminal": os.environ.get("POS_TERMINAL_ID") or socket.gethostname(),
+    "http_host": "127.0.0.1",
+    "http_port": int(os.environ["POS_METRICS_PORT"]) if os.environ.get("POS_METRICS_PORT") else None,
+    "textfile": os.environ.get("POS_METRICS_TEXTFILE"),
+    "textfile_interval": 15,  # seconds between textfile rewrites
+}
+
+# Query statement labels are truncated fingerprints to keep label values readable
+STATEMENT_LABEL_MAX = 120
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [("terminal", METRICS_CONFIG["terminal"])]
+    pairs += list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.extend(self._render_series(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), callback=None):
+        super().__init__(name, help_text, labels)
+        # callback() -> {label tuple: value}, evaluated at render time
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+    def render(self):
+        if self.callback:
+            try:
+                values = self.callback()
+            except Exception:
+                values = {}
+            with self._lock:
+                self._series = dict(values)
+        return super().render()
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def _render_series(self, key, series):
+        lines = []
+        cumulative = 0
+        for upper, count in zip(self.buckets, series["counts"]):
+            cumulative += count
+            labels = _format_labels(self.label_names, key, ("le", _format_value(upper)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+        lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+# ===== Registry =====
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def _pool_series():
+    stats = db.pool.stats()
+    return {("open",): stats["open"], ("in_use",): stats["in_use"], ("size",): stats["size"]}
+
+
+checkout_duration = register(Histogram(
+    "pos_checkout_duration_seconds", "Time to commit a sale after payment is confirmed"))
+cart_size = register(Histogram(
+    "pos_cart_units", "Units per completed sale", buckets=(1, 2, 3, 5, 8, 13, 21, 50, 100)))
+checkouts = register(Counter(
+    "pos_checkouts_total", "Completed checkouts by outcome", ("outcome",)))
+query_duration = register(Histogram(
+    "pos_query_duration_seconds", "Database statement latency", ("statement",)))
+query_errors = register(Counter(
+    "pos_query_errors_total", "Database statements that raised", ("statement",)))
+query_wait = register(Counter(
+    "pos_query_connection_wait_seconds_total", "Time spent waiting for a pooled connection", ("statement",)))
+panel_refresh = register(Histogram(
+    "pos_panel_refresh_duration_seconds", "Panel load/refresh handler duration", ("panel", "handler")))
+cache_requests = register(Counter(
+    "pos_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result")))
+pool_connections = register(Gauge(
+    "pos_db_pool_connections", "Database pool connections by state", ("state",), callback=_pool_series))
+
+
+def render():
+    """Return all metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ===== Feeds =====
+class QueryInstrument:
+    """db query instrument that feeds query latency, errors and pool wait"""
+
+    def on_query(self, event):
+        statement = event.fingerprint[:STATEMENT_LABEL_MAX]
+        query_duration.observe(event.elapsed_ms / 1000, statement=statement)
+        if event.wait_ms:
+            query_wait.inc(event.wait_ms / 1000, statement=statement)
+        if event.error is not None:
+            query_errors.inc(statement=statement)
+
+
+query_instrument = QueryInstrument()
+db.add_query_instrument(query_instrument)
+
+
+def record_cache(cache, hit):
+    """Count one lookup against a named cache"""
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_checkout(seconds, units, outcome="ok"):
+    checkout_duration.observe(seconds)
+    cart_size.observe(units)
+    checkouts.inc(outcome=outcome)
+
+
+def timed(panel):
+    """Decorator for panel load/refresh handlers: records their duration"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                panel_refresh.observe(time.perf_counter() - start, panel=panel, handler=func.__name__)
+        return wrapper
+    return decorator
+
+
+# ===== Exporters =====
+def write_textfile(path):
+    """Atomically write the metrics for node_exporter's textfile collector"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the POS console
+
+
+_exporters_started = False
+
+
+def start_exporters():
+    """
+    Start the configured exporters in daemon threads (once per process).
+    Returns the HTTP server, if one was started.
+    """
+    global _exporters_started
+    if _exporters_started:
+        return None
+    _exporters_started = True
+
+    server = None
+    if METRICS_CONFIG["http_port"]:
+        try:
+            server = ThreadingHTTPServer((METRICS_CONFIG["http_host"], METRICS_CONFIG["http_port"]),
+                                         _MetricsHandler)
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        except OSError as e:
+            print(f"⚠️ Could not start metrics endpoint: {e}")
+            server = None
+
+    if METRICS_CONFIG["textfile"]:
+        def write_loop():
+            while True:
+                try:
+                    write_textfile(METRICS_CONFIG["textfile"])
+                except OSError as e:
+                    print(f"⚠️ Could not write metrics textfile: {e}")
+                time.sleep(METRICS_CONFIG["textfile_interval"])
+
+        threading.Thread(target=write_loop, name="metrics-textfile", daemon=True).start()
+
+    return server
@@ -4,8 +4,10 @@ from PyQt6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView, QComboBox, QFrame,
     QMessageBox, QDialog, QFormLayout, QSizePolicy, QSpacerItem
 )
-from PyQt6.QtCore import Qt, QTimer
-import pymysql
+from PyQt6.QtCore import Qt
+from db import get_connection
+import catalog
+import metrics
 
 
 class ProductDialog(QDialog):
@@ -100,6 +102,8 @@ class ProductsPanel(QWidget):
         super().__init__()
         self.setWindowTitle("Products")
         self.selected_row = None
+        self.store = catalog.get_store()
+        self.table_rows = {}  # product id -> table row currently showing it
 
         # Store references to stat card labels
         self.stat_labels = {}
@@ -271,10 +275,10 @@ class ProductsPanel(QWidget):
         self.search_input.textChanged.connect(self.search_products)
         self.category_filter.currentTextChanged.connect(self.search_products)
 
-        # Set up auto-refresh timer (refreshes every 5 seconds)
-        self.refresh_timer = QTimer(self)
-        self.refresh_timer.timeout.connect(self.refresh_stats)
-        self.refresh_timer.start(5000)  # 5000 ms = 5 seconds
+        # ✅ The shared catalog store polls the database; update from its signals
+        self.store.rowChanged.connect(self.on_product_changed)
+        self.store.rowsInserted.connect(self.on_products_added_or_removed)
+        self.store.rowsRemoved.connect(self.on_products_added_or_removed)
 
     def create_stat_cards(self):
         """Create stat cards and store label references"""
@@ -285,30 +289,14 @@ class ProductsPanel(QWidget):
                 widget.setParent(None)
 
         # Get product stats
-        conn = self.db_connect()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT COUNT(*) as total FROM products")
-        total_products = cursor.fetchone()["total"]
-
-        cursor.execute("SELECT SUM(stock) as total FROM products")
-        total_stock = cursor.fetchone()["total"] or 0
-
-        cursor.execute("SELECT COUNT(*) as low FROM products WHERE stock < 10")
-        low_stock = cursor.fetchone()["low"]
-
-        cursor.execute("SELECT COUNT(DISTINCT category) as cats FROM products")
-        total_categories = cursor.fetchone()["cats"]
-
-        cursor.close()
-        conn.close()
+        values = self.store.stats()
 
         # Create cards
         stats = [
-            ("Total Products", str(total_products), "total_products"),
-            ("Total Stock", str(total_stock), "total_stock"),
-            ("Low Stock Items", str(low_stock), "low_stock"),
-            ("Categories", str(total_categories), "categories")
+            ("Total Products", str(values["total_products"]), "total_products"),
+            ("Total Stock", str(values["total_stock"]), "total_stock"),
+            ("Low Stock Items", str(values["low_stock"]), "low_stock"),
+            ("Categories", str(values["categories"]), "categories")
         ]
 
         for title, value, key in stats:
@@ -350,63 +338,49 @@ class ProductsPanel(QWidget):
 
         return card, lbl_value
 
+    @metrics.timed("products")
     def refresh_stats(self):
         """Refresh stat card values without rebuilding UI"""
-        conn = self.db_connect()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT COUNT(*) as total FROM products")
-        total_products = cursor.fetchone()["total"]
-
-        cursor.execute("SELECT SUM(stock) as total FROM products")
-        total_stock = cursor.fetchone()["total"] or 0
-
-        cursor.execute("SELECT COUNT(*) as low FROM products WHERE stock < 10")
-        low_stock = cursor.fetchone()["low"]
-
-        cursor.execute("SELECT COUNT(DISTINCT category) as cats FROM products")
-        total_categories = cursor.fetchone()["cats"]
-
-        cursor.close()
-        conn.close()
-
-        # Update labels
-        if "total_products" in self.stat_labels:
-            self.stat_labels["total_products"].setText(str(total_products))
-        if "total_stock" in self.stat_labels:
-            self.stat_labels["total_stock"].setText(str(total_stock))
-        if "low_stock" in self.stat_labels:
-            self.stat_labels["low_stock"].setText(str(low_stock))
-        if "categories" in self.stat_labels:
-            self.stat_labels["categories"].setText(str(total_categories))
+        for key, value in self.store.stats().items():
+            if key in self.stat_labels:
+                self.stat_labels[key].setText(str(value))
 
     def db_connect(self):
-        return pymysql.connect(
-            host="localhost",
-            user="root",
-            password="",
-            database="techstore_pos",
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        return get_connection()
 
-    def load_products(self, query="SELECT * FROM products", params=None):
-        conn = self.db_connect()
-        cursor = conn.cursor()
-        cursor.execute(query, params or ())
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
+    @metrics.timed("products")
+    def load_products(self, text=None, category=None):
+        rows = self.store.search(text, category)
 
         self.table.setRowCount(0)
+        self.table_rows = {}
         for row in rows:
             r = self.table.rowCount()
             self.table.insertRow(r)
             self.table.setRowHeight(r, 35)
             self.table.setItem(r, 0, QTableWidgetItem(str(row["id"]).zfill(10)))
-            self.table.setItem(r, 1, QTableWidgetItem(row["name"]))
-            self.table.setItem(r, 2, QTableWidgetItem(row["category"]))
-            self.table.setItem(r, 3, QTableWidgetItem(f"₱{row['price']:.2f}"))
-            self.table.setItem(r, 4, QTableWidgetItem(str(row["stock"])))
+            self.fill_row(r, row)
+            self.table_rows[row["id"]] = r
+
+    def fill_row(self, r, row):
+        self.table.setItem(r, 1, QTableWidgetItem(row["name"]))
+        self.table.setItem(r, 2, QTableWidgetItem(row["category"]))
+        self.table.setItem(r, 3, QTableWidgetItem(f"₱{row['price']:.2f}"))
+        self.table.setItem(r, 4, QTableWidgetItem(str(row["stock"])))
+
+    def on_product_changed(self, pid):
+        """Update one table row in place; re-filter only if it may no longer match"""
+        r = self.table_rows.get(pid)
+        if r is not None and not self.search_input.text().strip() \
+                and self.category_filter.currentText() == "All Categories":
+            self.fill_row(r, self.store.get(pid))
+        else:
+            self.search_products()
+        self.refresh_stats()
+
+    def on_products_added_or_removed(self, ids):
+        self.search_products()
+        self.refresh_stats()
 
     def on_row_click(self, row, col):
         self.selected_row = row
@@ -432,8 +406,7 @@ class ProductsPanel(QWidget):
                 f"Product '{data['name']}' added successfully!"
             )
 
-            self.load_products()
-            self.refresh_stats()  # Immediately refresh stats after adding
+            self.store.refresh()  # table and stats update from the store's signals
 
     def edit_product(self):
         if self.selected_row is None:
@@ -467,8 +440,7 @@ class ProductsPanel(QWidget):
                 f"Product '{data['name']}' updated successfully!"
             )
 
-            self.load_products()
-            self.refresh_stats()  # Immediately refresh stats after editing
+            self.store.refresh()
 
     def delete_product(self):
         if self.selected_row is None:
@@ -498,28 +470,9 @@ class ProductsPanel(QWidget):
                 f"Product '{product_name}' deleted successfully!"
             )
 
-            self.load_products()
-            self.refresh_stats()  # Immediately refresh stats after deleting
+            self.store.refresh()
 
     def search_products(self):
         text = self.search_input.text().strip()
         category = self.category_filter.currentText()
-
-        query = "SELECT * FROM products WHERE 1=1"
-        params = []
-
-        if text:
-            query += " AND (id LIKE %s OR name LIKE %s OR category LIKE %s)"
-            like = f"%{text}%"
-            params.extend([like, like, like])
-
-        if category != "All Categories":
-            query += " AND category=%s"
-            params.append(category)
-
-        self.load_products(query, params)
-
-    def closeEvent(self, event):
-        """Stop timer when widget is closed"""
-        self.refresh_timer.stop()
-        event.accept()
\ No newline at end of file
+        self.load_products(text, category)
\ No newline at end of file
@@ -0,0 +1,115 @@
+# receipt.py
+"""
+Receipt rendering and the frozen receipt fields.
+
+Receipts are rendered on demand from the normalized rows (transactions +
+transaction_items); the receipts table keeps only what cannot be derived from
+them later, compressed (see freeze()):
+
+    receipt_no   the number printed for the customer (the full sale_uuid for
+                 journaled sales, the zero-padded DB id otherwise)
+    tax_rate     the rate in force at the time of sale
+
+render() is the one formatter for the checkout dialog and for reprints:
+
+    sale = db.get_transaction_details(tid, with_receipt=True)
+    text = receipt.render(receipt.from_transaction(sale))
+"""
+import json
+import zlib
+
+TAX_RATE = 0.12
+WIDTH = 48
+
+# Preset dictionary: the frozen fields compress to ~15 bytes instead of ~45
+_ZDICT = b'{"receipt_no":"0000000000","tax_rate":0.12}'
+_FROZEN_KEYS = ("receipt_no", "tax_rate")
+
+
+def _compressor():
+    return zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, _ZDICT)
+
+
+def freeze(receipt_no, tax_rate=TAX_RATE):
+    """Compressed frozen fields for receipts.frozen"""
+    data = json.dumps({"receipt_no": receipt_no, "tax_rate": tax_rate}, separators=(",", ":")).encode()
+    compressor = _compressor()
+    return compressor.compress(data) + compressor.flush()
+
+
+def thaw(blob):
+    """Frozen fields from receipts.frozen; {} for None"""
+    if not blob:
+        return {}
+    decompressor = zlib.decompressobj(-15, _ZDICT)
+    fields = json.loads(decompressor.decompress(bytes(blob)) + decompressor.flush())
+    return {key: fields[key] for key in _FROZEN_KEYS if key in fields}
+
+
+def receipt_number(transaction_id, sale_uuid=None):
+    """
+    The number printed at checkout: the whole sale_uuid when journaled (a
+    prefix of it repeats across lanes), else the DB id
+    """
+    return sale_uuid if sale_uuid else str(transaction_id).zfill(10)
+
+
+def from_transaction(transaction):
+    """
+    render() data from get_transaction_details(tid, with_receipt=True): a
+    transaction row with 'items' (transaction_items rows) and 'frozen'.
+    """
+    frozen = transaction.get("frozen") or {}
+    sold = transaction["transaction_date"]
+    items = [{"name": item["product_name"], "qty": int(item["quantity"]), "price": float(item["unit_price"])}
+             for item in transaction["items"]]
+    subtotal = sum(float(item["subtotal"]) for item in transaction["items"])
+    total = float(transaction["total_amount"])
+    return {
+        "date": sold.strftime("%Y-%m-%d"),
+        "time": sold.strftime("%H:%M:%S"),
+        "transaction_id": frozen.get("receipt_no") or receipt_number(transaction["id"], transaction.get("sale_uuid")),
+        "cashier": transaction["cashier_name"],
+        "items": items,
+        "subtotal": subtotal,
+        "tax": total - subtotal,
+        "tax_rate": frozen.get("tax_rate", TAX_RATE),
+        "total": total,
+        "payment": float(transaction["amount_paid"]),
+        "change": float(transaction["change_amount"]),
+    }
+
+
+def render(data):
+    """Receipt text for data with date, time, transaction_id, cashier, items and the totals"""
+    rule, double = "-" * WIDTH, "=" * WIDTH
+    lines = [
+        double, "          TECHSTORE POS RECEIPT", double, "",
+        f"Date: {data['date']}",
+        f"Time: {data['time']}",
+    ]
+    number = f"Transaction ID: {data['transaction_id']}"
+    lines += [number] if len(number) <= WIDTH else ["Transaction ID:", f"  {data['transaction_id']}"]
+    lines += [
+        f"Cashier: {data['cashier']}",
+        "", rule, f"{'ITEM':<25} {'QTY':<6} {'PRICE':>10}", rule,
+    ]
+    for item in data['items']:
+        lines.append(f"{item['name'][:25]:<25} {item['qty']:<6} ₱{item['price']:>9.2f}")
+        lines.append(f"{'':>33} ₱{item['qty'] * item['price']:>9.2f}")
+
+    tax_label = f"Tax ({data.get('tax_rate', TAX_RATE) * 100:g}%):"
+    lines += [
+        rule,
+        f"{'Subtotal:':<35} ₱{data['subtotal']:>9.2f}",
+        f"{tax_label:<35} ₱{data['tax']:>9.2f}",
+        double,
+        f"{'TOTAL:':<35} ₱{data['total']:>9.2f}",
+        f"{'Payment:':<35} ₱{data['payment']:>9.2f}",
+        f"{'Change:':<35} ₱{data['change']:>9.2f}",
+        double, "",
+        "     Thank you for shopping with us!",
+        "          Please come again!",
+        double,
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,92 @@
+# records.py
+"""
+Compact rows for large result sets.
+
+safe_query(fetch="all") returns one dict per row: every row carries its own
+hash table of column names, and DECIMAL columns arrive as Decimal objects.
+For a year of transactions that is several times the size of the data.
+safe_query(fetch="compact") returns Records instead:
+
+    Record   tuple subclass; the column -> position index lives on the class,
+             shared by every row of the result (one class per column list)
+    values   Decimal -> float (what the panels convert to anyway); short
+             strings are interned so repeated cashier names share one object
+
+Records keep the read API callers use on dict rows - row["total_amount"],
+row.get(...), row.keys(), row.items(), "key" in row - plus attribute access
+(row.total_amount) and positional indexing. Unlike dicts they are immutable,
+and iterating a Record yields values; use as_dict() for a plain dict.
+
+bench_memory.py measures the difference.
+"""
+import sys
+from decimal import Decimal
+from functools import lru_cache
+
+# Longer strings (item summaries, receipts) are rarely repeated
+INTERN_MAX_LEN = 40
+
+
+class Record(tuple):
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def __getattr__(self, name):
+        try:
+            return tuple.__getitem__(self, self._index[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def get(self, key, default=None):
+        position = self._index.get(key)
+        return default if position is None else tuple.__getitem__(self, position)
+
+    def keys(self):
+        return self._fields
+
+    def items(self):
+        return zip(self._fields, self)
+
+    def as_dict(self):
+        return dict(zip(self._fields, self))
+
+    def __repr__(self):
+        return f"Record({', '.join(f'{k}={v!r}' for k, v in zip(self._fields, self))})"
+
+
+@lru_cache(maxsize=256)
+def record_type(fields):
+    """Record subclass for a tuple of column names"""
+    return type("Record", (Record,), {
+        "__slots__": (),
+        "_fields": fields,
+        "_index": {name: position for position, name in enumerate(fields)},
+    })
+
+
+def _compact_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, str) and len(value) <= INTERN_MAX_LEN:
+        return sys.intern(value)
+    return value
+
+
+def compact(rows):
+    """List of Records from an iterable of dict rows (all with the same columns)"""
+    result = []
+    cls = None
+    for row in rows:
+        if cls is None:
+            cls = record_type(tuple(row))
+        result.append(cls(map(_compact_value, row.values())))
+    return result
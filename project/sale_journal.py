@@ -0,0 +1,259 @@
+# sale_journal.py
+"""
+Local durable journal for checkouts.
+
+complete_transaction() appends each sale to a local SQLite journal
+(WAL, synchronous=FULL, so it survives a crash or power loss once append()
+returns) and shows the receipt straight away. A background SyncWorker pushes
+pending sales to MySQL through db.save_transaction_with_items, retrying with
+backoff. Every sale carries a client-generated UUID that is also stored in
+transactions.sale_uuid, so replaying a sale after a crash never saves it twice.
+
+While MySQL is unreachable the lane keeps selling from the catalog snapshot
+(see catalog.py) and sales queue up here. They are replayed oldest first
+once the server is back. Every journaled sale is already paid for and
+receipted, whether it was checked against the snapshot (payload "offline":
+true) or against the database at the till (another lane can still sell the
+last units before it syncs), so all of them are saved with reconcile=True:
+lines the server has no stock for are recorded, and the shortfall is logged
+for a stock count instead of rejecting the sale.
+
+A sale the server keeps refusing for another reason than being unreachable
+or busy (a deleted product or cashier, a schema mismatch, an unreadable
+payload) is set aside as "failed" after JOURNAL_CONFIG["max_attempts"]
+tries and logged, so the sales queued behind it still sync. The POS shows
+how many are waiting for a manager, who fixes the cause and puts them back
+in the queue with failed_sales.py.
+"""
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+
+import db
+import metrics
+
+JOURNAL_CONFIG = {
+    "path": os.environ.get("POS_JOURNAL_PATH", os.path.join("data", "sale_journal.sqlite3")),
+    "batch_size": 50,        # sales pushed per worker pass
+    "retry_initial": 1.0,    # seconds before retrying after a failed push
+    "retry_max": 60.0,
+    "max_attempts": 5,       # tries before a sale the server refuses is set aside
+}
+
+PENDING, SYNCED, FAILED = "pending", "synced", "failed"
+
+logger = logging.getLogger("techstore_pos.journal")
+
+journal_sales = metrics.register(metrics.Counter(
+    "pos_journal_sales_total", "Journaled sales by sync result", ("result",)))
+
+
+class SaleJournal:
+    """Append-only sale store keyed by sale_uuid"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sales (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                sale_uuid TEXT UNIQUE NOT NULL,
+                sold_at TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                transaction_id INTEGER
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_status ON sales (status, seq)")
+
+    def append(self, sale, sale_uuid=None):
+        """
+        Durably record a sale dict (the save_transaction_with_items arguments,
+        with sold_at as a datetime) and return its sale_uuid.
+        """
+        sale_uuid = sale_uuid or str(uuid.uuid4())
+        sold_at = sale["sold_at"].strftime("%Y-%m-%d %H:%M:%S")
+        payload = json.dumps(dict(sale, sold_at=sold_at))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO sales (sale_uuid, sold_at, payload) VALUES (?, ?, ?)",
+                (sale_uuid, sold_at, payload))
+        return sale_uuid
+
+    def pending(self, limit):
+        """Oldest pending sales as (sale_uuid, sale dict) pairs; the dict is None if unreadable"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT sale_uuid, payload FROM sales WHERE status = ? ORDER BY seq LIMIT ?",
+                (PENDING, limit)).fetchall()
+        sales = []
+        for row in rows:
+            try:
+                sale = json.loads(row["payload"])
+                sale["sold_at"] = datetime.datetime.strptime(sale["sold_at"], "%Y-%m-%d %H:%M:%S")
+            except (ValueError, TypeError, KeyError):
+                sale = None
+            sales.append((row["sale_uuid"], sale))
+        return sales
+
+    def mark_synced(self, sale_uuid, transaction_id):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE sales SET status = ?, transaction_id = ?, attempts = attempts + 1, last_error = NULL "
+                "WHERE sale_uuid = ?", (SYNCED, transaction_id, sale_uuid))
+
+    def mark_error(self, sale_uuid, error, attempt=True):
+        """
+        Record why a push failed; attempt=False when the sale itself wasn't
+        tried (server unreachable). Returns the attempts so far.
+        """
+        with self.lock:
+            self.conn.execute(
+                "UPDATE sales SET attempts = attempts + ?, last_error = ? WHERE sale_uuid = ?",
+                (int(attempt), str(error), sale_uuid))
+            row = self.conn.execute("SELECT attempts FROM sales WHERE sale_uuid = ?", (sale_uuid,)).fetchone()
+        return row["attempts"]
+
+    def mark_failed(self, sale_uuid):
+        """Set a sale aside: it no longer blocks the queue and waits for a manager"""
+        with self.lock:
+            self.conn.execute("UPDATE sales SET status = ? WHERE sale_uuid = ?", (FAILED, sale_uuid))
+
+    def failed(self):
+        """Sales set aside, oldest first, as sqlite3.Row (sale_uuid, sold_at, attempts, last_error)"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT sale_uuid, sold_at, attempts, last_error FROM sales WHERE status = ? ORDER BY seq",
+                (FAILED,)).fetchall()
+
+    def requeue_failed(self, sale_uuid=None):
+        """Put failed sales (all, or one) back in the queue with fresh attempts; returns how many"""
+        query = "UPDATE sales SET status = ?, attempts = 0 WHERE status = ?"
+        params = (PENDING, FAILED)
+        if sale_uuid:
+            query += " AND sale_uuid = ?"
+            params += (sale_uuid,)
+        with self.lock:
+            return self.conn.execute(query, params).rowcount
+
+    def counts(self):
+        """{status: number of sales}"""
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM sales GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class SyncWorker(threading.Thread):
+    """
+    Pushes pending journal entries to MySQL until stopped. While the lane is
+    offline it also probes the server (db.probe) every OFFLINE_RETRY_SECONDS,
+    so the GUI only ever reads db.is_online() and never waits on a connect.
+    """
+
+    def __init__(self, journal):
+        super().__init__(name="sale-journal-sync", daemon=True)
+        self.journal = journal
+        self.wakeup = threading.Event()
+        self.stopping = False
+
+    def run(self):
+        delay = JOURNAL_CONFIG["retry_initial"]
+        while not self.stopping:
+            if not db.is_online() and not db.probe():
+                self.wakeup.wait(db.OFFLINE_RETRY_SECONDS)
+            elif self.push_pending():
+                delay = JOURNAL_CONFIG["retry_initial"]
+                # Idle until the next sale; the timeout notices a lane that went offline meanwhile
+                self.wakeup.wait(db.OFFLINE_RETRY_SECONDS)
+            else:
+                # Database unreachable or erroring: back off, but wake early on new sales
+                self.wakeup.wait(delay)
+                delay = min(delay * 2, JOURNAL_CONFIG["retry_max"])
+            self.wakeup.clear()
+
+    def push_pending(self):
+        """Push everything pending; False when a push failed and should be retried later"""
+        while True:
+            batch = self.journal.pending(JOURNAL_CONFIG["batch_size"])
+            if not batch:
+                return True
+            for sale_uuid, sale in batch:
+                try:
+                    if sale is None:
+                        raise ValueError("unreadable journal payload")
+                    # Paid and receipted either way; "offline" only records how stock was checked
+                    sale.pop("offline", None)
+                    transaction_id = db.save_transaction_with_items(
+                        sale_uuid=sale_uuid, reconcile=True, raise_errors=True, **sale)
+                except Exception as e:
+                    if db.is_retryable(e):
+                        # Server unreachable or busy: the queue waits, in order
+                        self.journal.mark_error(sale_uuid, e, attempt=False)
+                        journal_sales.inc(result="retry")
+                        return False
+                    attempts = self.journal.mark_error(sale_uuid, e)
+                    if attempts < JOURNAL_CONFIG["max_attempts"]:
+                        journal_sales.inc(result="retry")
+                        return False
+                    self.journal.mark_failed(sale_uuid)
+                    journal_sales.inc(result=FAILED)
+                    logger.error("Sale %s set aside after %d failed attempts: %s", sale_uuid, attempts, e)
+                    continue
+                self.journal.mark_synced(sale_uuid, transaction_id)
+                journal_sales.inc(result=SYNCED)
+
+    def stop(self):
+        self.stopping = True
+        self.wakeup.set()
+
+
+_journal = None
+_worker = None
+
+
+def start():
+    """Open the journal and start the sync worker once per process"""
+    global _journal, _worker
+    if _journal is None:
+        _journal = SaleJournal(JOURNAL_CONFIG["path"])
+        _worker = SyncWorker(_journal)
+        _worker.start()
+    return _journal
+
+
+def submit(sale):
+    """Journal a sale and wake the sync worker; returns the sale_uuid"""
+    journal = start()
+    sale_uuid = journal.append(sale)
+    _worker.wakeup.set()
+    return sale_uuid
+
+
+def wake():
+    """Retry pending sales now instead of waiting out the backoff"""
+    if _worker:
+        _worker.wakeup.set()
+
+
+def pending_count():
+    return _journal.counts().get(PENDING, 0) if _journal else 0
+
+
+def failed_count():
+    """Sales set aside because the server refused them (see SyncWorker.push_pending)"""
+    return _journal.counts().get(FAILED, 0) if _journal else 0
+
@@ -0,0 +1,216 @@
+# seed_data.py
+"""
+Seeded, reproducible synthetic data for benchmarks.
+
+Generates N products across the store's categories and M transactions spread
+evenly over Y years (ending now) with realistic basket sizes, and bulk-loads
+them with batched multi-row inserts. The same --seed always yields the same data.
+
+Usage (from the project folder):
+    python seed_data.py --backend sqlite --target bench.sqlite3 --transactions 10000
+    python seed_data.py --backend mysql --target techstore_pos_bench --transactions 1000000
+
+Never point --target at the live techstore_pos database: existing rows are deleted.
+"""
+import argparse
+import datetime
+import hashlib
+import random
+import time
+
+import db
+
+CATEGORIES = [
+    "Processor", "GPU", "Motherboard", "Memory",
+    "Storage", "Keyboard", "Mouse", "Monitor",
+    "PSU", "Case", "Accessories"
+]
+
+# (low, high) price range per category, in pesos
+PRICE_RANGES = {
+    "Processor": (4000, 35000), "GPU": (8000, 90000), "Motherboard": (4000, 25000),
+    "Memory": (1200, 12000), "Storage": (1500, 15000), "Keyboard": (500, 8000),
+    "Mouse": (300, 5000), "Monitor": (5000, 40000), "PSU": (2000, 12000),
+    "Case": (1500, 10000), "Accessories": (100, 3000),
+}
+
+BRANDS = ["Apex", "Nova", "Vertex", "Zenith", "Orion", "Pulse", "Titan", "Quantum"]
+
+CASHIERS = ["cashier1", "cashier2", "cashier3", "cashier4", "cashier5"]
+
+BATCH_SIZE = 5000
+
+# Preset sizes: transactions per scale, products scale along with them
+SCALES = {
+    "10k": {"transactions": 10_000, "products": 500},
+    "1m": {"transactions": 1_000_000, "products": 5_000},
+    "10m": {"transactions": 10_000_000, "products": 20_000},
+}
+
+
+def connection_factory(backend, target):
+    """
+    Point db at target (a MySQL database name or a SQLite file), create its
+    schema, and return a zero-argument function opening connections to it
+    """
+    if backend == "sqlite":
+        db.configure(backend="sqlite", sqlite_path=target)
+    else:
+        db.configure(backend="mysql", database=target)
+    if not db.ensure_database():
+        raise RuntimeError(f"Could not prepare {backend} database {target!r}")
+    return db.get_connection
+
+
+def generate_products(count, rng):
+    """Yield (id, barcode, name, category, price, stock) rows"""
+    for pid in range(1, count + 1):
+        category = CATEGORIES[(pid - 1) % len(CATEGORIES)]
+        low, high = PRICE_RANGES[category]
+        name = f"{rng.choice(BRANDS)} {category} {pid:05d}"
+        price = round(rng.uniform(low, high), 2)
+        stock = rng.randint(0, 500)
+        yield pid, f"BC{pid:012d}", name, category, price, stock
+
+
+def basket_size(rng):
+    """Mostly 1-3 lines, occasionally large baskets (geometric tail, capped at 15)"""
+    size = 1
+    while size < 15 and rng.random() < 0.45:
+        size += 1
+    return size
+
+
+def line_quantity(rng):
+    roll = rng.random()
+    if roll < 0.8:
+        return 1
+    if roll < 0.95:
+        return 2
+    return rng.randint(3, 5)
+
+
+def generate_transactions(count, years, products, rng, now=None):
+    """
+    Yield (transaction row, [item rows]) for `count` transactions spread evenly
+    over the last `years` years. products is a list of (id, barcode, name, price).
+    """
+    now = now or datetime.datetime.now().replace(microsecond=0)
+    start = now - datetime.timedelta(days=365 * years)
+    span = (now - start).total_seconds()
+    item_id = 1
+
+    for tid in range(1, count + 1):
+        # Evenly spaced with jitter keeps ids increasing with time, as in production
+        when = start + datetime.timedelta(seconds=span * (tid - 1 + rng.random()) / count)
+        cashier_index = rng.randrange(len(CASHIERS))
+
+        items = []
+        subtotal = 0.0
+        for product in rng.sample(products, min(basket_size(rng), len(products))):
+            pid, barcode, name, price = product
+            qty = line_quantity(rng)
+            line_total = round(price * qty, 2)
+            subtotal += line_total
+            items.append((item_id, tid, pid, name, barcode, qty, price, line_total))
+            item_id += 1
+
+        total = round(subtotal * 1.12, 2)
+        paid = float(int(total // 100 + 1) * 100)
+        summary = db.summarize_items([{"name": i[3], "qty": i[5], "price": i[6]} for i in items])
+        transaction = (tid, when.strftime("%Y-%m-%d %H:%M:%S"), cashier_index + 2,
+                       CASHIERS[cashier_index], total, paid, round(paid - total, 2),
+                       when.strftime("%Y-%m-%d %H:%M:%S")) + summary
+        yield transaction, items
+
+
+def _reset(cursor, backend):
+    tables = ["receipts_archive", "transaction_items_archive", "transactions_archive",
+              "receipts", "transaction_items", "transactions", "products", "users"]
+    if backend == "mysql":
+        cursor.execute("SET FOREIGN_KEY_CHECKS=0")
+        for table in tables:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+    else:
+        for table in tables:
+            cursor.execute(f"DELETE FROM {table}")
+
+
+def seed(conn, backend, products=500, transactions=10_000, years=3, seed_value=42, batch_size=BATCH_SIZE):
+    """Replace all data reachable through conn with a generated dataset"""
+    rng = random.Random(seed_value)
+    cursor = conn.cursor()
+    _reset(cursor, backend)
+    if backend == "mysql":
+        cursor.execute("SET UNIQUE_CHECKS=0")
+
+    password = hashlib.sha256("admin123".encode()).hexdigest()
+    users = [(1, "admin", password, "admin", "System Administrator")]
+    users += [(i + 2, name, password, "cashier", name.title()) for i, name in enumerate(CASHIERS)]
+    cursor.executemany(
+        "INSERT INTO users (id, username, password, role, full_name) VALUES (%s, %s, %s, %s, %s)", users)
+
+    product_rows = list(generate_products(products, rng))
+    for i in range(0, len(product_rows), batch_size):
+        cursor.executemany(
+            "INSERT INTO products (id, barcode, name, category, price, stock) VALUES (%s, %s, %s, %s, %s, %s)",
+            product_rows[i:i + batch_size])
+    catalog = [(p[0], p[1], p[2], p[4]) for p in product_rows]
+
+    tx_batch, item_batch = [], []
+
+    def flush():
+        cursor.executemany(
+            "INSERT INTO transactions (id, transaction_date, cashier_id, cashier_name, total_amount, "
+            "amount_paid, change_amount, created_at, items_summary, item_count, unit_count) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", tx_batch)
+        cursor.executemany(
+            "INSERT INTO transaction_items (id, transaction_id, product_id, product_name, product_barcode, "
+            "quantity, unit_price, subtotal) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", item_batch)
+        conn.commit()
+        tx_batch.clear()
+        item_batch.clear()
+
+    for transaction, items in generate_transactions(transactions, years, catalog, rng):
+        tx_batch.append(transaction)
+        item_batch.extend(items)
+        if len(tx_batch) >= batch_size:
+            flush()
+    if tx_batch:
+        flush()
+
+    if backend == "mysql":
+        cursor.execute("SET UNIQUE_CHECKS=1")
+        cursor.execute("SET FOREIGN_KEY_CHECKS=1")
+    conn.commit()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a reproducible POS dataset")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--target", default="bench.sqlite3",
+                        help="SQLite file path, or MySQL database name")
+    parser.add_argument("--scale", choices=sorted(SCALES), help="preset product/transaction counts")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--transactions", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.scale:
+        args.products = SCALES[args.scale]["products"]
+        args.transactions = SCALES[args.scale]["transactions"]
+    if args.backend == "mysql" and args.target == db.DB_CONFIG["database"]:
+        parser.error("refusing to overwrite the live database; pick another --target")
+
+    conn = connection_factory(args.backend, args.target)()
+    start = time.perf_counter()
+    seed(conn, args.backend, args.products, args.transactions, args.years, args.seed)
+    conn.close()
+    print(f"✓ Loaded {args.products:,} products and {args.transactions:,} transactions "
+          f"into {args.target} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
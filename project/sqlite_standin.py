@@ -0,0 +1,327 @@
+# sqlite_standin.py
+"""
+SQLite engine behind backends.SQLiteBackend (embedded POS database, test rigs
+and benchmarks with no MySQL server).
+
+connect() returns an object that behaves like a pymysql DictCursor connection
+for the statements this app uses: %s placeholders, CURDATE()/NOW(),
+`CURDATE() - INTERVAL n UNIT`, DATE_SUB, YEAR/MONTH/YEARWEEK/DATE_FORMAT,
+CONCAT and GROUP_CONCAT(... SEPARATOR ...) are translated or provided as
+SQL functions. New code should use the backend's dialect builders instead:
+the Python functions are called once per row.
+
+DATETIME/TIMESTAMP columns come back as datetime objects, and sqlite3 errors
+are re-raised as StandInError carrying the MySQL error code db.py checks
+(1062 duplicate key, 1205 lock wait timeout, ...).
+"""
+import datetime
+import re
+import sqlite3
+from functools import lru_cache
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL CHECK (role IN ('admin', 'cashier')),
+        full_name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        barcode TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        category TEXT,
+        price NUMERIC NOT NULL,
+        stock INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_date DATETIME NOT NULL,
+        cashier_id INTEGER NOT NULL REFERENCES users(id),
+        cashier_name TEXT,
+        total_amount NUMERIC NOT NULL,
+        amount_paid NUMERIC NOT NULL,
+        change_amount NUMERIC NOT NULL,
+        sale_uuid TEXT UNIQUE,
+        items_summary TEXT,
+        item_count INTEGER NOT NULL DEFAULT 0,
+        unit_count INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transaction_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+        product_id INTEGER NOT NULL REFERENCES products(id),
+        product_name TEXT NOT NULL,
+        product_barcode TEXT,
+        quantity INTEGER NOT NULL,
+        unit_price NUMERIC NOT NULL,
+        subtotal NUMERIC NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS receipts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+        receipt_data TEXT,
+        frozen BLOB,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Archive tier (no foreign keys; see db.roll_archive)
+    """
+    CREATE TABLE IF NOT EXISTS transactions_archive (
+        id INTEGER PRIMARY KEY,
+        transaction_date DATETIME NOT NULL,
+        cashier_id INTEGER NOT NULL,
+        cashier_name TEXT,
+        total_amount NUMERIC NOT NULL,
+        amount_paid NUMERIC NOT NULL,
+        change_amount NUMERIC NOT NULL,
+        sale_uuid TEXT,
+        items_summary TEXT,
+        item_count INTEGER NOT NULL DEFAULT 0,
+        unit_count INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transaction_items_archive (
+        id INTEGER PRIMARY KEY,
+        transaction_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        product_name TEXT NOT NULL,
+        product_barcode TEXT,
+        quantity INTEGER NOT NULL,
+        unit_price NUMERIC NOT NULL,
+        subtotal NUMERIC NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS receipts_archive (
+        id INTEGER PRIMARY KEY,
+        transaction_id INTEGER NOT NULL,
+        frozen BLOB,
+        created_at TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_transaction_items_tid ON transaction_items (transaction_id)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (transaction_date)",
+    "CREATE INDEX IF NOT EXISTS idx_receipts_tid ON receipts (transaction_id)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_archive_date ON transactions_archive (transaction_date)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_archive_sale_uuid ON transactions_archive (sale_uuid)",
+    "CREATE INDEX IF NOT EXISTS idx_transaction_items_archive_tid ON transaction_items_archive (transaction_id)",
+    "CREATE INDEX IF NOT EXISTS idx_receipts_archive_tid ON receipts_archive (transaction_id)",
+    "CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products (updated_at)",
+    # MySQL's ON UPDATE CURRENT_TIMESTAMP
+    """
+    CREATE TRIGGER IF NOT EXISTS products_updated_at AFTER UPDATE ON products
+    WHEN NEW.updated_at IS OLD.updated_at
+    BEGIN
+        UPDATE products SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+    END
+    """,
+]
+
+_UNIT_DAYS = {"DAY": 1, "WEEK": 7}
+
+# sqlite3 error message fragment -> MySQL error code
+_ERROR_CODES = [
+    ("UNIQUE constraint", 1062),         # ER_DUP_ENTRY
+    ("FOREIGN KEY constraint", 1452),    # ER_NO_REFERENCED_ROW_2
+    ("database is locked", 1205),        # ER_LOCK_WAIT_TIMEOUT
+    ("no such table", 1146),             # ER_NO_SUCH_TABLE
+    ("unable to open database", 2003),   # CR_CONN_HOST_ERROR
+]
+
+
+class StandInError(Exception):
+    """A sqlite3 error with args (mysql_error_code, message), like pymysql errors"""
+
+
+def _error(e):
+    message = str(e)
+    code = next((code for fragment, code in _ERROR_CODES if fragment in message), 1105)  # ER_UNKNOWN_ERROR
+    return StandInError(code, message)
+
+
+def _interval_modifier(amount, unit):
+    unit = unit.upper()
+    if unit in _UNIT_DAYS:
+        return f"'-{int(amount) * _UNIT_DAYS[unit]} days'"
+    return f"'-{int(amount)} {unit.lower()}s'"
+
+
+_REWRITES = [
+    (re.compile(r"DATE_SUB\(\s*CURDATE\(\)\s*,\s*INTERVAL\s+(\d+)\s+(\w+)\s*\)", re.I),
+     lambda m: f"date('now', 'localtime', {_interval_modifier(m.group(1), m.group(2))})"),
+    (re.compile(r"CURDATE\(\)\s*-\s*INTERVAL\s+(\d+)\s+(\w+)", re.I),
+     lambda m: f"date('now', 'localtime', {_interval_modifier(m.group(1), m.group(2))})"),
+    (re.compile(r"GROUP_CONCAT\((.*?)\s+SEPARATOR\s+('[^']*')\s*\)", re.I | re.S),
+     lambda m: f"GROUP_CONCAT({m.group(1)}, {m.group(2)})"),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), lambda m: "INSERT OR IGNORE"),
+    (re.compile(r"\s+FOR\s+UPDATE\b", re.I), lambda m: ""),
+]
+
+
+@lru_cache(maxsize=512)
+def translate(query):
+    """Rewrite a MySQL-dialect statement for SQLite"""
+    for pattern, repl in _REWRITES:
+        query = pattern.sub(repl, query)
+    return query.replace("%s", "?").replace("%%", "%")
+
+
+def _parse(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value
+    text = str(value)
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        return datetime.datetime.strptime(text[:10], "%Y-%m-%d")
+
+
+def _date_format(value, fmt):
+    dt = _parse(value)
+    return dt.strftime(fmt.replace("%i", "%M")) if dt else None
+
+
+def _yearweek(value, mode=0):
+    """MySQL YEARWEEK for modes 0 (the default) and 3 (ISO 8601, what backends.bucket uses)"""
+    dt = _parse(value)
+    if not dt:
+        return None
+    day = dt.date() if isinstance(dt, datetime.datetime) else dt
+    if int(mode) == 3:
+        year, week, _ = day.isocalendar()
+        return year * 100 + week
+    # Mode 0: weeks start on Sunday and belong to the year of that Sunday;
+    # week 1 starts on the year's first Sunday
+    sunday = day - datetime.timedelta(days=(day.weekday() + 1) % 7)
+    jan1 = datetime.date(sunday.year, 1, 1)
+    first_sunday = jan1 + datetime.timedelta(days=(6 - jan1.weekday()) % 7)
+    return sunday.year * 100 + (sunday - first_sunday).days // 7 + 1
+
+
+def _convert_datetime(value):
+    return _parse(value.decode("utf-8"))
+
+
+sqlite3.register_converter("DATETIME", _convert_datetime)
+sqlite3.register_converter("TIMESTAMP", _convert_datetime)
+
+
+def _register_functions(conn):
+    conn.create_function("CURDATE", 0, lambda: datetime.date.today().isoformat())
+    conn.create_function("NOW", 0, lambda: datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    conn.create_function("YEAR", 1, lambda v: _parse(v).year if v else None)
+    conn.create_function("MONTH", 1, lambda v: _parse(v).month if v else None)
+    conn.create_function("YEARWEEK", -1, _yearweek)
+    conn.create_function("DATE_FORMAT", 2, _date_format)
+    conn.create_function("CONCAT", -1, lambda *args: None if None in args else "".join(str(a) for a in args))
+
+
+def _adapt(value):
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if hasattr(value, "as_tuple"):  # Decimal
+        return float(value)
+    return value
+
+
+class StandInCursor:
+    def __init__(self, conn):
+        self._cursor = conn.cursor()
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, query, params=()):
+        try:
+            self._cursor.execute(translate(query), tuple(_adapt(p) for p in (params or ())))
+        except sqlite3.Error as e:
+            raise _error(e) from e
+        return self._cursor.rowcount
+
+    def executemany(self, query, seq_of_params):
+        try:
+            self._cursor.executemany(translate(query),
+                                     (tuple(_adapt(p) for p in params) for params in seq_of_params))
+        except sqlite3.Error as e:
+            raise _error(e) from e
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return dict(row) if row is not None else None
+
+    def fetchmany(self, size):
+        return [dict(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [dict(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    def __init__(self, path):
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30,
+                                         detect_types=sqlite3.PARSE_DECLTYPES)
+        except sqlite3.Error as e:
+            raise _error(e) from e
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        _register_functions(self._conn)
+
+    def cursor(self):
+        return StandInCursor(self._conn)
+
+    def commit(self):
+        try:
+            self._conn.commit()
+        except sqlite3.Error as e:
+            raise _error(e) from e
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def ping(self, reconnect=True):
+        pass
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(path):
+    return StandInConnection(path)
@@ -0,0 +1,89 @@
+# tests/conftest.py
+"""
+Shared fixtures. Every test gets its own SQLite database file (the sqlite
+backend, see backends.py), so no MySQL server is needed; Qt runs offscreen.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_path(tmp_path, monkeypatch):
+    """Point db at an empty SQLite file; the previous configuration is restored afterwards"""
+    saved = {key: db.DB_CONFIG[key] for key in ("backend", "sqlite_path")}
+    path = str(tmp_path / "pos.sqlite3")
+    db.configure(backend="sqlite", sqlite_path=path)
+    monkeypatch.setattr(db, "_offline_since", None)
+    monkeypatch.setattr(db, "SLOW_QUERY_MS", None)
+    yield path
+    db.configure(**saved)
+
+
+@pytest.fixture
+def pos_db(sqlite_path):
+    """An initialized database with one cashier and a few products"""
+    assert db.ensure_database()
+    db.safe_query("INSERT INTO users (username, password, role, full_name) VALUES (%s, %s, %s, %s)",
+                  ("ana", "x", "cashier", "Ana Cruz"), fetch=None)
+    cashier = db.safe_query("SELECT id FROM users WHERE username = 'ana'")
+    for barcode, name, price, stock in PRODUCTS:
+        db.safe_query("INSERT INTO products (barcode, name, category, price, stock) VALUES (%s, %s, %s, %s, %s)",
+                      (barcode, name, "Accessories", price, stock), fetch=None)
+    return {"cashier_id": cashier["id"], "products": product_ids()}
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    """The process journal in a temp file; its worker is not started, tests push explicitly"""
+    import sale_journal
+    journal = sale_journal.SaleJournal(str(tmp_path / "journal.sqlite3"))
+    monkeypatch.setattr(sale_journal, "_journal", journal)
+    monkeypatch.setattr(sale_journal, "_worker", sale_journal.SyncWorker(journal))
+    yield journal
+    journal.close()
+
+
+@pytest.fixture
+def store(qapp, pos_db, tmp_path, monkeypatch):
+    """A fresh process-wide CatalogStore loaded from the test database"""
+    import catalog
+    monkeypatch.setitem(catalog.CATALOG_CONFIG, "snapshot_path", str(tmp_path / "catalog.snapshot"))
+    monkeypatch.setattr(catalog, "_store", None)
+    store = catalog.get_store()
+    store.refresh_timer.stop()
+    return store
+
+
+PRODUCTS = [
+    ("1001", "USB Cable", 150.0, 10),
+    ("1002", "Mouse", 450.0, 3),
+    ("1003", "Keyboard", 900.0, 0),
+]
+
+
+def product_ids():
+    """{name: id} of the seeded products"""
+    return {row["name"]: row["id"] for row in db.safe_query("SELECT id, name FROM products", fetch="all")}
+
+
+def stock_of(product_id):
+    return db.safe_query("SELECT stock FROM products WHERE id = %s", (product_id,))["stock"]
+
+
+def cart_line(product_id, name, price, qty):
+    """A cart item as transactions_panel builds it"""
+    return {"id": product_id, "name": name, "price": price, "qty": qty, "subtotal": round(price * qty, 2)}
+
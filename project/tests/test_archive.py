@@ -0,0 +1,101 @@
+# tests/test_archive.py
+"""roll_archive and the reads that span the hot and archive tiers"""
+import datetime
+
+import pytest
+
+import db
+from conftest import cart_line
+
+
+def sell(pos_db, sold_at, qty=1):
+    line = cart_line(pos_db["products"]["USB Cable"], "USB Cable", 150.0, qty)
+    total = round(150.0 * qty * 1.12, 2)
+    return db.save_transaction_with_items(pos_db["cashier_id"], "ana", [line], total, total, 0.0,
+                                          sold_at=sold_at)
+
+
+def walk_pages(page_size):
+    rows, cursor = [], None
+    while True:
+        page = db.get_transactions_page(cursor, page_size)
+        rows += page["transactions"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+def reads(old_day, ids):
+    """Every tier-spanning read, as the history, reports and receipts make them"""
+    today = datetime.date.today()
+    return {
+        "total": db.get_sales_total(),
+        "total_since_old_day": db.get_sales_total(old_day),
+        "count": db.get_transaction_count(),
+        "history": db.get_all_transactions_detailed(),
+        "history_stream": list(db.get_all_transactions_detailed(stream=True)),
+        "pages": walk_pages(page_size=2),
+        "between": db.get_transactions_between(old_day, today + datetime.timedelta(days=1)),
+        "daily": db.get_daily_sales_report(old_day),
+        "by_month": db.get_sales_by_period("month"),
+        "product_sales": db.get_product_sales(),
+        "details": [db.get_transaction_details(tid, with_receipt=True) for tid in ids],
+        "details_batch": db.get_transactions_details(ids),
+    }
+
+
+@pytest.fixture
+def sales(pos_db):
+    """Three sales older than the hot window (two on one day) and two recent ones"""
+    db.safe_query("UPDATE products SET stock = 100", fetch=None)
+    old = datetime.datetime.combine(db.hot_since(), datetime.time(10)) - datetime.timedelta(days=400)
+    ids = [sell(pos_db, old), sell(pos_db, old + datetime.timedelta(hours=2), qty=2),
+           sell(pos_db, old + datetime.timedelta(days=40)),
+           sell(pos_db, datetime.datetime.now() - datetime.timedelta(days=1)), sell(pos_db, None, qty=3)]
+    return old.date(), ids
+
+
+def test_rolled_sales_read_the_same_as_before(sales):
+    old_day, ids = sales
+    before = reads(old_day, ids)
+    assert len(before["history"]) == 5 and before["daily"]["transaction_count"] == 2
+
+    assert db.roll_archive(batch_size=2) == 3
+    stats = db.get_archive_stats()
+    assert (stats["hot"]["transactions"], stats["archive"]["transactions"]) == (2, 3)
+    assert reads(old_day, ids) == before
+    assert db.roll_archive() == 0
+
+
+def test_a_sale_saved_after_the_roll_is_still_read(sales, pos_db):
+    old_day, ids = sales
+    db.roll_archive()
+    # A journaled sale from before the window, synced late: it stays hot until the next roll
+    straggler = sell(pos_db, datetime.datetime.combine(old_day, datetime.time(18)))
+    newest_first = [ids[4], ids[3], ids[2], straggler, ids[1], ids[0]]
+    assert [row["id"] for row in walk_pages(page_size=2)] == newest_first
+    assert [row["id"] for row in db.get_all_transactions_detailed()] == newest_first
+    assert [row["id"] for row in db.get_all_transactions_detailed(stream=True)] == newest_first
+    assert [row["id"] for row in db.get_daily_sales_report(old_day)["transactions"]] == [ids[0], ids[1], straggler]
+
+    assert db.roll_archive() == 1
+    assert db.get_daily_sales_report(old_day)["transaction_count"] == 3
+
+
+def test_rolling_inside_the_hot_window_is_refused(pos_db):
+    with pytest.raises(ValueError):
+        db.roll_archive(db.hot_since() + datetime.timedelta(days=1))
+
+
+def test_replaying_an_archived_sale_does_not_save_it_twice(pos_db):
+    line = cart_line(pos_db["products"]["USB Cable"], "USB Cable", 150.0, 1)
+    sold_at = datetime.datetime.combine(db.hot_since(), datetime.time(10)) - datetime.timedelta(days=40)
+    sale = dict(cashier_id=pos_db["cashier_id"], cashier_name="ana", items=[line], total_amount=168.0,
+                amount_paid=168.0, change_amount=0.0, sold_at=sold_at, sale_uuid="5a1e0000-0000")
+    first = db.save_transaction_with_items(**sale)
+    assert db.roll_archive() == 1
+
+    # The lane crashed before marking it synced, and replays it after the roll
+    assert db.save_transaction_with_items(**sale) == first
+    assert db.get_transaction_count() == 1
+    assert db.safe_query("SELECT stock FROM products WHERE id = %s", (line["id"],))["stock"] == 9
@@ -0,0 +1,28 @@
+# tests/test_backends.py
+"""Dialect builders agree across backends"""
+import datetime
+
+import db
+import sqlite_standin
+
+
+def test_week_buckets_are_iso_weeks_on_both_dialects(sqlite_path):
+    days = [datetime.date(2020, 12, 27) + datetime.timedelta(days=n) for n in range(0, 1200, 3)]
+    sqlite_bucket = db.get_backend().bucket("d", "week")
+    mysql_bucket = "YEARWEEK(d, 3)"  # MySQLBackend.bucket, run through the stand-in's UDF
+    with db.pooled_connection() as (conn, _):
+        cursor = conn.cursor()
+        for day in days:
+            expected = day.isocalendar()[0] * 100 + day.isocalendar()[1]
+            for expression in (sqlite_bucket, mysql_bucket):
+                cursor.execute(f"SELECT {expression} AS week FROM (SELECT %s AS d)", (day,))
+                assert cursor.fetchone()["week"] == expected, (expression, day)
+    assert db.backends.MySQLBackend({}).bucket("transaction_date", "week") == "YEARWEEK(transaction_date, 3)"
+
+
+def test_stand_in_yearweek_default_mode_matches_mysql():
+    # Examples from the MySQL manual and the turn of 2023/2024 (mode 0: Sunday start)
+    assert sqlite_standin._yearweek("1987-01-01") == 198652
+    assert sqlite_standin._yearweek("2023-12-31") == 202353
+    assert sqlite_standin._yearweek("2024-01-06") == 202353
+    assert sqlite_standin._yearweek("2024-01-07") == 202401
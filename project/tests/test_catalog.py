@@ -0,0 +1,119 @@
+# tests/test_catalog.py
+"""CatalogStore loading, delta refresh and the on-disk snapshot"""
+import datetime
+
+import catalog
+import db
+import sqlite_standin
+
+
+def read_snapshot(store):
+    """What the store has written, once its pending snapshot write has run"""
+    store.flush_snapshot()
+    return catalog.read_snapshot(catalog.CATALOG_CONFIG["snapshot_path"])
+
+
+def snapshot_ids(store):
+    rows, watermark = read_snapshot(store)
+    return sorted(row["id"] for row in rows)
+
+
+def test_failed_queries_keep_the_rows_and_the_snapshot(store, pos_db):
+    ids = sorted(pos_db["products"].values())
+    assert sorted(store.rows) == ids and snapshot_ids(store) == ids
+
+    db.safe_query("ALTER TABLE products RENAME TO products_moved", fetch=None)
+    store.load()
+    store.refresh()
+    assert sorted(store.rows) == ids
+    assert snapshot_ids(store) == ids
+
+
+def test_failed_deletion_diff_keeps_the_rows(store, pos_db, monkeypatch):
+    ids = sorted(pos_db["products"].values())
+    db.safe_query("DELETE FROM products WHERE id = %s", (ids[-1],), fetch=None)
+
+    connection_lost = [True]
+
+    def query_rows(query, params=None):
+        if query == "SELECT id FROM products" and connection_lost[0]:
+            raise sqlite_standin.StandInError(2013, "Lost connection")
+        return db.query_rows(query, params)
+
+    monkeypatch.setattr(catalog, "query_rows", query_rows)
+    store.refresh()
+    assert sorted(store.rows) == ids
+
+    connection_lost[0] = False
+    store.refresh()
+    assert sorted(store.rows) == ids[:-1]
+    assert snapshot_ids(store) == ids[:-1]
+
+
+def test_sales_share_one_snapshot_write(store, pos_db, monkeypatch):
+    store.flush_snapshot()
+    writes = []
+    monkeypatch.setattr(catalog, "write_snapshot", lambda path, products, watermark: writes.append(
+        {p.id: p.stock for p in products}))
+    mouse = pos_db["products"]["Mouse"]
+    for _ in range(3):
+        store.apply_sale([{"id": mouse, "qty": 1}])
+    assert writes == [] and store.snapshot_timer.isActive()
+
+    store.flush_snapshot()  # what the timer (or quitting) does
+    store.flush_snapshot()
+    assert [stock[mouse] for stock in writes] == [0]
+
+
+def test_refresh_moves_the_watermark_past_sales_already_applied(store, pos_db, monkeypatch):
+    mouse = pos_db["products"]["Mouse"]
+    sold_at = datetime.datetime(2030, 1, 1, 9, 30)
+    store.apply_sale([{"id": mouse, "qty": 1}])
+    # The server saved the same sale: its row now matches the store, only newer
+    db.safe_query("UPDATE products SET stock = stock - 1, updated_at = %s WHERE id = %s",
+                  (sold_at, mouse), fetch=None)
+
+    store.refresh()
+    assert store.watermark == sold_at
+    assert read_snapshot(store)[1] == sold_at
+
+    fetched = []
+
+    def query_rows(query, params=None):
+        rows = db.query_rows(query, params)
+        if "updated_at >=" in query:
+            fetched.extend(row["id"] for row in rows)
+        return rows
+
+    monkeypatch.setattr(catalog, "query_rows", query_rows)
+    store.refresh()
+    assert fetched == [mouse]  # only the row at the watermark itself
+
+
+def test_refresh_sees_deletions_hidden_by_as_many_inserts(store, pos_db):
+    ids = sorted(pos_db["products"].values())
+    # Another terminal swaps one product for a new one, imported with an updated_at
+    # older than the watermark: the delta misses it and the count is unchanged
+    db.safe_query("DELETE FROM products WHERE id = %s", (ids[0],), fetch=None)
+    db.safe_query("INSERT INTO products (barcode, name, price, stock, updated_at) "
+                  "VALUES ('2001', 'Webcam', 1200, 4, '2001-01-01 00:00:00')", fetch=None)
+    new_id = db.safe_query("SELECT id FROM products WHERE barcode = '2001'")["id"]
+
+    store.refresh()
+    assert sorted(store.rows) == ids[1:] + [new_id]
+    assert snapshot_ids(store) == ids[1:] + [new_id]
+
+
+def test_refresh_rereads_rows_committed_late_behind_the_watermark(store, pos_db):
+    ids = pos_db["products"]
+    watermark = datetime.datetime(2030, 1, 1, 9, 30)
+    db.safe_query("UPDATE products SET updated_at = %s WHERE id = %s", (watermark, ids["USB Cable"]), fetch=None)
+    store.refresh()
+    assert store.watermark == watermark
+
+    # Stamped two seconds earlier by a statement that only committed now
+    db.safe_query("UPDATE products SET stock = 7, updated_at = %s WHERE id = %s",
+                  (watermark - datetime.timedelta(seconds=2), ids["Mouse"]), fetch=None)
+    store.refresh()
+    assert store.get(ids["Mouse"]).stock == 7
+    assert store.watermark == watermark
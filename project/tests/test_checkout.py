@@ -0,0 +1,71 @@
+# tests/test_checkout.py
+"""Stock checks at the till (transactions_panel.complete_transaction) and in db"""
+import time
+
+import pytest
+
+import db
+import sale_journal
+from conftest import cart_line, stock_of
+
+
+def test_get_stock_shortages_sums_repeated_products(pos_db):
+    ids = pos_db["products"]
+    cart = [cart_line(ids["Mouse"], "Mouse", 450.0, 2), cart_line(ids["Mouse"], "Mouse", 450.0, 2),
+            cart_line(ids["USB Cable"], "USB Cable", 150.0, 1), cart_line(ids["Keyboard"], "Keyboard", 900.0, 1)]
+    assert db.get_stock_shortages(cart) == [
+        {"id": ids["Mouse"], "name": "Mouse", "requested": 4, "available": 3},
+        {"id": ids["Keyboard"], "name": "Keyboard", "requested": 1, "available": 0},
+    ]
+    assert stock_of(ids["Mouse"]) == 3  # only a read
+
+
+@pytest.fixture
+def panel(store, journal, pos_db, monkeypatch):
+    """A TransactionsPanel with its modal dialogs recorded instead of shown"""
+    import transactions_panel
+    from PyQt6.QtWidgets import QMessageBox
+    shown = []
+    monkeypatch.setattr(QMessageBox, "information",
+                        lambda parent, title, text, *args: shown.append(title) or QMessageBox.StandardButton.Ok)
+    monkeypatch.setattr(QMessageBox, "warning", lambda parent, title, text: shown.append(title))
+    monkeypatch.setattr(QMessageBox, "critical", lambda parent, title, text: shown.append(title))
+    monkeypatch.setattr(transactions_panel.ReceiptDialog, "exec", lambda self: shown.append("Receipt"))
+    panel = transactions_panel.TransactionsPanel(pos_db["cashier_id"], "ana")
+    panel.dialogs = shown
+    return panel
+
+
+def checkout(panel, product, qty):
+    panel.cart = [{"id": product.id, "name": product.name, "price": product.price, "qty": qty}]
+    panel.payment_input.setText("100000")
+    panel.complete_transaction()
+
+
+def test_online_checkout_refuses_more_than_the_database_holds(panel, store, journal, pos_db):
+    mouse = store.get(pos_db["products"]["Mouse"])
+    db.safe_query("UPDATE products SET stock = 1 WHERE id = %s", (mouse.id,), fetch=None)  # another lane sold 2
+
+    checkout(panel, mouse, 2)
+    assert panel.dialogs == ["Insufficient Stock"]  # no change was announced
+    assert journal.counts() == {}
+    assert panel.cart  # kept for the cashier to adjust
+
+    checkout(panel, mouse, 1)
+    assert panel.dialogs[1:] == ["Payment Received", "Receipt"]
+    assert journal.counts() == {sale_journal.PENDING: 1}
+    assert journal.pending(1)[0][1]["offline"] is False
+
+
+def test_offline_checkout_is_checked_against_the_catalog(panel, store, journal, pos_db, monkeypatch):
+    mouse = store.get(pos_db["products"]["Mouse"])
+    monkeypatch.setattr(db, "_offline_since", time.monotonic())
+
+    checkout(panel, mouse, 4)
+    assert panel.dialogs == ["Insufficient Stock"]
+
+    checkout(panel, mouse, 3)
+    assert panel.dialogs[-1] == "Receipt"
+    assert journal.counts() == {sale_journal.PENDING: 1}
+    assert journal.pending(1)[0][1]["offline"] is True
+    assert store.get(mouse.id).stock == 0
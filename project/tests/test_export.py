@@ -0,0 +1,50 @@
+# tests/test_export.py
+"""export_transactions: a failed export leaves no CSV behind"""
+import sys
+
+import pytest
+
+import db
+import export_transactions
+import sqlite_standin
+from conftest import cart_line
+
+
+def sell(pos_db):
+    line = cart_line(pos_db["products"]["USB Cable"], "USB Cable", 150.0, 1)
+    return db.save_transaction_with_items(pos_db["cashier_id"], "ana", [line], 168.0, 200.0, 32.0)
+
+
+def test_export_writes_every_transaction(pos_db, tmp_path):
+    sell(pos_db)
+    sell(pos_db)
+    path = tmp_path / "sales.csv"
+    assert export_transactions.export(str(path)) == 2
+    assert path.read_text(encoding="utf-8").startswith(",".join(export_transactions.COLUMNS))
+
+
+def test_a_failed_query_removes_the_partial_file(pos_db, tmp_path):
+    sell(pos_db)
+    db.safe_query("ALTER TABLE transactions RENAME TO transactions_moved", fetch=None)
+    path = tmp_path / "sales.csv"
+    with pytest.raises(Exception):
+        export_transactions.export(str(path))
+    assert not path.exists()
+
+
+def test_an_error_mid_export_exits_non_zero(pos_db, tmp_path, monkeypatch, capsys):
+    sell(pos_db)
+    stream = db.get_all_transactions_detailed
+
+    def lost_connection(**kwargs):
+        yield from stream(**kwargs)
+        raise sqlite_standin.StandInError(2013, "Lost connection")
+
+    monkeypatch.setattr(db, "get_all_transactions_detailed", lost_connection)
+    path = tmp_path / "sales.csv"
+    monkeypatch.setattr(sys, "argv", ["export_transactions.py", "--output", str(path)])
+    with pytest.raises(SystemExit) as exit_info:
+        export_transactions.main()
+    assert exit_info.value.code == 1
+    assert "Lost connection" in capsys.readouterr().out
+    assert not path.exists()
@@ -0,0 +1,124 @@
+# tests/test_migrations.py
+"""Schema migrations on the SQLite backend, starting from the original (unversioned) tables"""
+import json
+import sqlite3
+
+import backends
+import db
+from conftest import cart_line
+
+# The tables as the first release created them: no schema_version table yet
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL,
+    full_name TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    barcode TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT,
+    price NUMERIC NOT NULL,
+    stock INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    transaction_date DATETIME NOT NULL,
+    cashier_id INTEGER NOT NULL REFERENCES users(id),
+    cashier_name TEXT,
+    total_amount NUMERIC NOT NULL,
+    amount_paid NUMERIC NOT NULL,
+    change_amount NUMERIC NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE transaction_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    transaction_id INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    product_name TEXT NOT NULL,
+    product_barcode TEXT,
+    quantity INTEGER NOT NULL,
+    unit_price NUMERIC NOT NULL,
+    subtotal NUMERIC NOT NULL
+);
+CREATE TABLE receipts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    transaction_id INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+    receipt_data TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+def create_baseline(path):
+    """A first-release database with one sale of 2 mice and its JSON receipt"""
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO users (username, password, role) VALUES ('admin', 'x', 'admin')")
+    conn.execute("INSERT INTO products (barcode, name, price, stock) VALUES ('1002', 'Mouse', 450, 8)")
+    conn.execute("INSERT INTO transactions (transaction_date, cashier_id, cashier_name, total_amount, "
+                 "amount_paid, change_amount) VALUES ('2024-03-05 10:15:00', 1, 'admin', 1008, 1100, 92)")
+    conn.execute("INSERT INTO transaction_items (transaction_id, product_id, product_name, product_barcode, "
+                 "quantity, unit_price, subtotal) VALUES (1, 1, 'Mouse', '1002', 2, 450, 900)")
+    conn.execute("INSERT INTO receipts (transaction_id, receipt_data) VALUES (1, ?)", (json.dumps({
+        "transaction_id": "0000000001", "date": "2024-03-05", "time": "10:15:00", "cashier": "admin",
+        "items": [], "subtotal": 900, "tax": 108.0, "total": 1008, "payment": 1100, "change": 92,
+    }),))
+    conn.commit()
+    conn.close()
+
+
+def test_unversioned_database_is_migrated_from_version_1(sqlite_path):
+    create_baseline(sqlite_path)
+    assert db.get_schema_version() == backends.UNVERSIONED_SCHEMA
+
+    assert db.ensure_database()
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+
+    # Migration 5 backfilled the summary; the *_all views over the new columns work
+    sale = db.get_all_transactions_detailed()[0]
+    assert sale["items_summary"] == "Mouse (2x @ ₱450.00)"
+    assert (sale["item_count"], sale["unit_count"]) == (1, 2)
+    assert db.get_sales_total() == 1008.0
+
+    # Migration 6 froze the receipt
+    details = db.get_transaction_details(1, with_receipt=True)
+    assert details["frozen"] == {"receipt_no": "0000000001", "tax_rate": 0.12}
+
+    # Migration 2: journaled checkouts are idempotent on sale_uuid
+    line = cart_line(1, "Mouse", 450.0, 1)
+    first = db.save_transaction_with_items(1, "admin", [line], 504.0, 504.0, 0.0, sale_uuid="abcd1234-0000")
+    again = db.save_transaction_with_items(1, "admin", [line], 504.0, 504.0, 0.0, sale_uuid="abcd1234-0000")
+    assert first == again
+    assert db.safe_query("SELECT stock FROM products WHERE id = 1")["stock"] == 7
+
+
+def test_new_database_starts_at_the_current_version(sqlite_path):
+    assert db.get_schema_version() is None
+    assert db.ensure_database()
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+    assert db.safe_query("SELECT username FROM users")["username"] == "admin"
+
+
+def test_compacted_receipts_keep_the_number_printed_at_checkout(sqlite_path):
+    create_baseline(sqlite_path)
+    conn = sqlite3.connect(sqlite_path)
+    conn.execute("INSERT INTO transactions (transaction_date, cashier_id, cashier_name, total_amount, "
+                 "amount_paid, change_amount) VALUES ('2024-03-06 11:00:00', 1, 'admin', 504, 504, 0)")
+    # A journaled sale: the till printed its sale id prefix, the DB id came later
+    conn.execute("INSERT INTO receipts (transaction_id, receipt_data) VALUES (2, ?)", (json.dumps({
+        "transaction_id": "0000000002", "sale_uuid": "abcd1234-5e6f-4a7b-8c9d-0123456789ab",
+        "subtotal": 450, "tax": 54.0, "total": 504, "payment": 504, "change": 0,
+    }),))
+    conn.commit()
+    conn.close()
+
+    assert db.ensure_database()
+    assert db.get_transaction_details(1, with_receipt=True)["frozen"]["receipt_no"] == "0000000001"
+    assert db.get_transaction_details(2, with_receipt=True)["frozen"]["receipt_no"] == "ABCD1234"
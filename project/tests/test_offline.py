@@ -0,0 +1,59 @@
+# tests/test_offline.py
+"""Going offline and back: db.is_online() / db.probe() and who probes"""
+import time
+
+import db
+import sale_journal
+
+
+def go_offline(tmp_path, monkeypatch):
+    """Lose the server a minute ago: connects now fail with error 2003"""
+    db.configure(sqlite_path=str(tmp_path / "missing" / "pos.sqlite3"))
+    monkeypatch.setattr(db, "_offline_since", time.monotonic() - 60)
+
+
+def test_is_online_stays_false_until_a_probe_succeeds(pos_db, tmp_path, monkeypatch):
+    path = db.DB_CONFIG["sqlite_path"]
+    go_offline(tmp_path, monkeypatch)
+    assert not db.is_online()
+    assert not db.probe()
+    assert not db.is_online()
+
+    db.configure(sqlite_path=path)
+    assert db.probe()
+    assert db.is_online()
+
+
+def test_status_tick_never_connects_while_offline(store, journal, pos_db, tmp_path, monkeypatch):
+    import transactions_panel
+    panel = transactions_panel.TransactionsPanel(pos_db["cashier_id"], "ana")
+    panel.set_offline(True)
+    go_offline(tmp_path, monkeypatch)
+
+    backend = db.get_backend()
+    connects = []
+    monkeypatch.setattr(backend, "connect", lambda: connects.append(1) or type(backend).connect(backend))
+    panel.update_sync_status()
+    store.refresh()
+    assert connects == []
+    assert panel.offline
+    assert "Offline" in panel.offline_label.text()
+
+
+def test_sync_worker_brings_the_lane_back_online(pos_db, journal, tmp_path, monkeypatch):
+    path = db.DB_CONFIG["sqlite_path"]
+    monkeypatch.setattr(db, "OFFLINE_RETRY_SECONDS", 0.05)
+    go_offline(tmp_path, monkeypatch)
+    worker = sale_journal.SyncWorker(journal)
+    worker.start()
+    try:
+        time.sleep(0.2)
+        assert not db.is_online()
+        db.configure(sqlite_path=path)  # the server is back
+        deadline = time.monotonic() + 5
+        while not db.is_online() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert db.is_online()
+    finally:
+        worker.stop()
+        worker.join(5)
@@ -0,0 +1,41 @@
+# tests/test_pool.py
+"""ConnectionPool pings only stale connections, and configure() closes the pool it replaces"""
+import sqlite3
+
+import pytest
+
+import db
+import sqlite_standin
+
+
+@pytest.fixture
+def pings(monkeypatch):
+    calls = []
+    monkeypatch.setattr(sqlite_standin.StandInConnection, "ping", lambda self, reconnect=True: calls.append(self))
+    return calls
+
+
+def test_fresh_connections_are_not_pinged(sqlite_path, pings):
+    for _ in range(3):
+        assert db.safe_query("SELECT 1 AS one")["one"] == 1
+    assert pings == []
+
+
+def test_idle_connections_are_pinged(sqlite_path, pings, monkeypatch):
+    db.safe_query("SELECT 1 AS one")
+    monkeypatch.setattr(db, "POOL_PING_AFTER_S", -1)
+    db.safe_query("SELECT 1 AS one")
+    assert len(pings) == 1
+
+
+def test_configure_closes_the_replaced_pool(sqlite_path):
+    with db.pooled_connection() as (busy, _):
+        db.safe_query("SELECT 1 AS one")  # leaves a second connection idle
+        idle, _ = db.pool._idle.queue[0]
+        db.configure(sqlite_path=sqlite_path)
+        with pytest.raises(sqlite3.ProgrammingError):
+            idle._conn.execute("SELECT 1")
+        busy._conn.execute("SELECT 1")  # still usable by its holder...
+    with pytest.raises(sqlite3.ProgrammingError):
+        busy._conn.execute("SELECT 1")  # ...and closed once released
+    assert db.pool.stats()["open"] == 0
@@ -0,0 +1,25 @@
+# tests/test_receipt.py
+"""Receipt numbers and the rendered receipt"""
+import datetime
+
+import db
+import receipt
+from conftest import cart_line
+
+SALE_UUID = "3f2b9c1e-7a4d-4e8b-9c21-5d6e7f8a9b0c"
+
+
+def test_journaled_sales_print_their_whole_sale_id(pos_db):
+    line = cart_line(pos_db["products"]["Mouse"], "Mouse", 450.0, 1)
+    tid = db.save_transaction_with_items(pos_db["cashier_id"], "ana", [line], 504.0, 504.0, 0.0,
+                                         sale_uuid=SALE_UUID, sold_at=datetime.datetime(2026, 5, 4, 9, 30))
+    sale = db.get_transaction_details(tid, with_receipt=True)
+    assert sale["frozen"]["receipt_no"] == SALE_UUID
+
+    text = receipt.render(receipt.from_transaction(sale))
+    assert SALE_UUID in text
+    assert max(len(line) for line in text.splitlines()) <= receipt.WIDTH
+
+
+def test_sales_without_a_sale_id_print_the_padded_db_id():
+    assert receipt.receipt_number(42) == "0000000042"
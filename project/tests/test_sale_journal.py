@@ -0,0 +1,120 @@
+# tests/test_sale_journal.py
+"""Journal replay (sale_journal.SyncWorker.push_pending) against the SQLite backend"""
+import datetime
+
+import pytest
+
+import db
+import sale_journal
+from conftest import cart_line, stock_of
+
+
+def sale(pos_db, *lines):
+    total = round(sum(line["subtotal"] for line in lines) * 1.12, 2)
+    return {"cashier_id": pos_db["cashier_id"], "cashier_name": "ana", "items": list(lines),
+            "total_amount": total, "amount_paid": total, "change_amount": 0.0,
+            "sold_at": datetime.datetime(2026, 5, 4, 9, 30)}
+
+
+def test_replaying_a_saved_sale_does_not_save_it_twice(pos_db, journal):
+    ids = pos_db["products"]
+    sale_uuid = journal.append(sale(pos_db, cart_line(ids["USB Cable"], "USB Cable", 150.0, 2)))
+    # The worker saved it, then crashed before marking it synced
+    first_id = db.save_transaction_with_items(sale_uuid=sale_uuid, **journal.pending(1)[0][1])
+
+    assert sale_journal.SyncWorker(journal).push_pending()
+    assert journal.counts() == {sale_journal.SYNCED: 1}
+    assert db.safe_query("SELECT COUNT(*) AS n FROM transactions")["n"] == 1
+    assert db.safe_query("SELECT id FROM transactions WHERE sale_uuid = %s", (sale_uuid,))["id"] == first_id
+    assert stock_of(ids["USB Cable"]) == 8
+
+
+def test_a_sale_the_server_refuses_is_set_aside_after_max_attempts(pos_db, journal, monkeypatch):
+    monkeypatch.setitem(sale_journal.JOURNAL_CONFIG, "max_attempts", 2)
+    ids = pos_db["products"]
+    # The product was deleted on the server after it was sold: the items insert hits its foreign key
+    bad = journal.append(sale(pos_db, cart_line(9999, "Old stock", 99.0, 1)))
+    good = journal.append(sale(pos_db, cart_line(ids["USB Cable"], "USB Cable", 150.0, 1)))
+    worker = sale_journal.SyncWorker(journal)
+
+    assert not worker.push_pending()  # first failure: retried later, the queue waits in order
+    assert journal.counts() == {sale_journal.PENDING: 2}
+
+    assert worker.push_pending()
+    assert journal.counts() == {sale_journal.FAILED: 1, sale_journal.SYNCED: 1}
+    assert sale_journal.failed_count() == 1
+    row = journal.conn.execute("SELECT attempts, last_error FROM sales WHERE sale_uuid = ?", (bad,)).fetchone()
+    assert row["attempts"] == 2 and "FOREIGN KEY" in row["last_error"]
+    assert db.safe_query("SELECT sale_uuid FROM transactions")["sale_uuid"] == good
+
+
+def test_an_unreadable_payload_does_not_stop_the_worker(pos_db, journal, monkeypatch):
+    monkeypatch.setitem(sale_journal.JOURNAL_CONFIG, "max_attempts", 1)
+    ids = pos_db["products"]
+    journal.conn.execute("INSERT INTO sales (sale_uuid, sold_at, payload) VALUES ('torn', '', '{\"items\": [')")
+    journal.append(sale(pos_db, cart_line(ids["USB Cable"], "USB Cable", 150.0, 1)))
+
+    assert sale_journal.SyncWorker(journal).push_pending()
+    assert journal.counts() == {sale_journal.FAILED: 1, sale_journal.SYNCED: 1}
+
+
+def test_an_unreachable_server_never_sets_sales_aside(pos_db, journal, monkeypatch, tmp_path):
+    monkeypatch.setitem(sale_journal.JOURNAL_CONFIG, "max_attempts", 1)
+    ids = pos_db["products"]
+    journal.append(sale(pos_db, cart_line(ids["USB Cable"], "USB Cable", 150.0, 1)))
+    db.configure(sqlite_path=str(tmp_path / "missing" / "pos.sqlite3"))  # connect fails: error 2003
+
+    worker = sale_journal.SyncWorker(journal)
+    for _ in range(3):
+        assert not worker.push_pending()
+    assert journal.counts() == {sale_journal.PENDING: 1}
+    assert journal.conn.execute("SELECT attempts FROM sales").fetchone()["attempts"] == 0
+
+
+def test_offline_sales_are_reconciled_against_the_server_stock(pos_db, journal):
+    mouse = pos_db["products"]["Mouse"]
+    reconciled = db.checkout_stats["reconciled"]
+    journal.append(dict(sale(pos_db, cart_line(mouse, "Mouse", 450.0, 5)), offline=True))
+
+    assert sale_journal.SyncWorker(journal).push_pending()
+    assert journal.counts() == {sale_journal.SYNCED: 1}
+    assert stock_of(mouse) == 0  # 5 sold, 3 on record: clamped, logged for a stock count
+    assert db.checkout_stats["reconciled"] == reconciled + 1
+    assert db.safe_query("SELECT unit_count FROM transactions")["unit_count"] == 5
+
+
+def test_online_sales_that_lost_a_stock_race_are_still_recorded(pos_db, journal):
+    mouse = pos_db["products"]["Mouse"]
+    # Checked at the till and paid, then another lane sold the last units before this one synced
+    journal.append(dict(sale(pos_db, cart_line(mouse, "Mouse", 450.0, 2)), offline=False))
+    db.safe_query("UPDATE products SET stock = 1 WHERE id = %s", (mouse,), fetch=None)
+
+    assert sale_journal.SyncWorker(journal).push_pending()
+    assert journal.counts() == {sale_journal.SYNCED: 1}
+    assert stock_of(mouse) == 0
+    assert db.safe_query("SELECT unit_count FROM transactions")["unit_count"] == 2
+
+
+def test_failed_sales_can_be_queued_again(pos_db, journal, monkeypatch):
+    monkeypatch.setitem(sale_journal.JOURNAL_CONFIG, "max_attempts", 1)
+    ids = pos_db["products"]
+    bad = journal.append(sale(pos_db, cart_line(9999, "Old stock", 99.0, 1)))
+    other = journal.append(sale(pos_db, cart_line(ids["USB Cable"], "USB Cable", 150.0, 1)))
+    worker = sale_journal.SyncWorker(journal)
+    assert worker.push_pending()
+    assert [row["sale_uuid"] for row in journal.failed()] == [bad]
+    assert journal.requeue_failed(other) == 0  # synced, not failed
+
+    # The manager restores the product, then retries
+    db.safe_query("INSERT INTO products (id, barcode, name, price, stock) VALUES (9999, '9999', 'Old stock', 99, 0)",
+                  fetch=None)
+    assert journal.requeue_failed() == 1
+    assert journal.counts() == {sale_journal.PENDING: 1, sale_journal.SYNCED: 1}
+    assert worker.push_pending()
+    assert journal.counts() == {sale_journal.SYNCED: 2}
+    assert stock_of(9999) == 0
+
+
+@pytest.mark.parametrize("code, retryable", [(2003, True), (2013, True), (1213, True), (1452, False), (1054, False)])
+def test_is_retryable(code, retryable):
+    assert db.is_retryable(Exception(code, "message")) is retryable
@@ -0,0 +1,20 @@
+# tests/test_session.py
+"""MainWindow.start_session re-binds the panels that hold the signed-in user"""
+import main_window
+
+
+def test_switching_user_rebinds_the_till(qapp, store, journal, pos_db):
+    win = main_window.MainWindow(1, "admin", "admin")
+    try:
+        dashboard = win.get_panel("dashboard")
+        till = win.get_panel("transactions")
+        till.cart.append({"id": pos_db["products"]["Mouse"], "name": "Mouse", "price": 450.0, "qty": 1})
+
+        win.start_session(pos_db["cashier_id"], "ana", "cashier")
+        assert (till.user_id, till.cashier_name) == (pos_db["cashier_id"], "ana")
+        assert till.cart == []  # the previous user's cart doesn't carry over
+        assert win.stack.currentWidget() is till
+        assert win.panels["dashboard"] is dashboard  # kept, not rebuilt; it holds no user state
+    finally:
+        win.close()
+        win.deleteLater()
@@ -0,0 +1,44 @@
+# tests/test_theme.py
+"""theme: each qss file styles only the window or panel that used to load it"""
+import re
+
+import pytest
+from PyQt6.QtGui import QPalette
+from PyQt6.QtWidgets import QPushButton, QVBoxLayout, QWidget
+
+import theme
+
+
+@pytest.fixture
+def themed(qapp):
+    qapp.setStyleSheet(theme.build_stylesheet())
+    yield qapp
+    qapp.setStyleSheet("")
+
+
+def button_in(app, object_name):
+    window = QWidget()
+    window.setObjectName(object_name)
+    button = QPushButton("+", window)
+    QVBoxLayout(window).addWidget(button)
+    window.show()
+    app.processEvents()
+    return window, button
+
+
+def test_login_look_stays_in_the_login_window(themed):
+    login, login_button = button_in(themed, "loginWindow")
+    panel, panel_button = button_in(themed, "transactionsPanel")
+    assert login_button.palette().color(QPalette.ColorRole.Button).name() == "#0066ff"
+    assert login.palette().color(QPalette.ColorRole.Window).name() == "#ffffff"  # the window itself too
+    assert panel_button.palette().color(QPalette.ColorRole.Button).name() != "#0066ff"
+    assert panel_button.sizeHint().height() < login_button.sizeHint().height()  # no padding: 10px
+    login.close()
+    panel.close()
+
+
+def test_only_the_listed_files_are_loaded():
+    stylesheet = theme.build_stylesheet()
+    assert "#loginWindow QPushButton" in stylesheet
+    assert not re.search(r"^\s*Q\w+[^{]*\{", stylesheet, re.M)  # no type selector left unscoped
+    assert "productsPanel" not in stylesheet and "adminsPanel" not in stylesheet
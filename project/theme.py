@@ -0,0 +1,95 @@
+# theme.py
+"""
+Application-wide theme.
+
+The qss files in THEME_SCOPES are read once at startup and installed as a
+single application stylesheet. Widgets are styled by objectName (and dynamic
+properties for state), so building a product card or a cart row never parses
+CSS. Each file is scoped to the objectName of the window or panel that used
+to load it, which keeps its type selectors (QPushButton, QLineEdit...) from
+leaking into other windows.
+
+State changes go through set_state(), which flips a dynamic property and
+re-polishes only that widget:
+
+    theme.set_state(self.complete_btn, "ready", True)
+    QPushButton#completeButton[ready="true"] { ... }
+"""
+import os
+import re
+
+THEME_CONFIG = {
+    "dir": "qss",
+}
+
+# file -> objectName of the widget it styles (None: whole app). Only these
+# files are loaded: products.qss and admin.qss were never applied, and their
+# panels keep their inline styles.
+THEME_SCOPES = {
+    "login.qss": "loginWindow",
+    "sidebar.qss": None,  # objectName selectors only
+    "dashboard.qss": "dashboardPanel",
+    "transactions.qss": "transactionsPanel",
+}
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_TYPE_SELECTOR = re.compile(r"([A-Za-z]\w*)((?::[\w-]+)*)")
+
+_stylesheet = None
+
+
+def scope_rules(qss, scope):
+    """
+    Prefix every selector in `qss` with `#scope `. Bare type selectors
+    (QWidget, QPushButton:hover) also match the scope widget itself, as they
+    did when the file was that widget's own stylesheet.
+    """
+    if not scope:
+        return qss
+    rules = []
+    for selectors, body in _RULE.findall(_COMMENT.sub("", qss)):
+        scoped = []
+        for s in (s.strip() for s in selectors.split(",")):
+            if not s:
+                continue
+            scoped.append(f"#{scope} {s}")
+            bare = _TYPE_SELECTOR.fullmatch(s)
+            if bare:
+                scoped.append(f"{bare[1]}#{scope}{bare[2]}")
+        rules.append(f"{', '.join(scoped)} {{{body}}}")
+    return "\n".join(rules)
+
+
+def build_stylesheet(directory=None):
+    """Concatenate the theme files, app-wide ones first"""
+    directory = directory or THEME_CONFIG["dir"]
+    names = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+    names = [n for n in names if n in THEME_SCOPES]
+    names.sort(key=lambda n: THEME_SCOPES[n] is not None)
+
+    parts = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                parts.append(scope_rules(f.read(), THEME_SCOPES[name]))
+        except OSError as e:
+            print(f"⚠️ Could not load {name}: {e}")
+    return "\n".join(parts)
+
+
+def apply(app):
+    """Install the theme on the QApplication (files are read only once)"""
+    global _stylesheet
+    if _stylesheet is None:
+        _stylesheet = build_stylesheet()
+    app.setStyleSheet(_stylesheet)
+
+
+def set_state(widget, name, value):
+    """Set a dynamic style property; re-polish only when it actually changes"""
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
@@ -3,11 +3,16 @@ from PyQt6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QMessageBox, QScrollArea, QFrame, QGridLayout,
     QComboBox, QSpacerItem, QSizePolicy, QDialog, QTextEdit
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from functools import partial
-from db import safe_query
+from db import safe_query, is_online, find_shortages, get_stock_shortages
+import catalog
+import metrics
+import receipt
+import sale_journal
+import theme
 import datetime
-import json
+import time
 
 
 class ReceiptDialog(QDialog):
@@ -70,50 +75,24 @@ class ReceiptDialog(QDialog):
         self.receipt_text = receipt_text
 
     def build_receipt(self, data):
-        """Build formatted receipt text"""
-        receipt = []
-        receipt.append("=" * 48)
-        receipt.append("          TECHSTORE POS RECEIPT")
-        receipt.append("=" * 48)
-        receipt.append("")
-        receipt.append(f"Date: {data['date']}")
-        receipt.append(f"Time: {data['time']}")
-        receipt.append(f"Transaction ID: {data['transaction_id']}")
-        receipt.append(f"Cashier: {data['cashier']}")
-        receipt.append("")
-        receipt.append("-" * 48)
-        receipt.append(f"{'ITEM':<25} {'QTY':<6} {'PRICE':>10}")
-        receipt.append("-" * 48)
-
-        for item in data['items']:
-            name = item['name'][:25]  # Truncate long names
-            receipt.append(f"{name:<25} {item['qty']:<6} ₱{item['price']:>9.2f}")
-            total_price = item['qty'] * item['price']
-            receipt.append(f"{'':>33} ₱{total_price:>9.2f}")
-
-        receipt.append("-" * 48)
-        receipt.append(f"{'Subtotal:':<35} ₱{data['subtotal']:>9.2f}")
-        receipt.append(f"{'Tax (12%):':<35} ₱{data['tax']:>9.2f}")
-        receipt.append("=" * 48)
-        receipt.append(f"{'TOTAL:':<35} ₱{data['total']:>9.2f}")
-        receipt.append(f"{'Payment:':<35} ₱{data['payment']:>9.2f}")
-        receipt.append(f"{'Change:':<35} ₱{data['change']:>9.2f}")
-        receipt.append("=" * 48)
-        receipt.append("")
-        receipt.append("     Thank you for shopping with us!")
-        receipt.append("          Please come again!")
-        receipt.append("=" * 48)
-
-        return "\n".join(receipt)
+        """Build formatted receipt text (same renderer as reprints, see receipt.py)"""
+        return receipt.render(data)
 
 
 class TransactionsPanel(QWidget):
-    def __init__(self, user_id):
+    def __init__(self, user_id, username=None):
         super().__init__()
         self.setWindowTitle("Transactions")
+        self.setObjectName("transactionsPanel")  # scope of qss/transactions.qss
 
         self.user_id = user_id
         self.cart = []  # list of {id, name, price, qty}
+        self.cashier_name = username  # looked up on the first checkout when not given
+        self.offline = False
+        self.store = catalog.get_store()
+        self.shown = {}  # product id -> (name, category, price) of the cards on screen
+        self.cards = {}  # product id -> card widget, in grid order
+        self.reload_pending = False
 
         # ===== Main Layout =====
         main_layout = QVBoxLayout(self)
@@ -128,6 +107,24 @@ class TransactionsPanel(QWidget):
         header_layout.addWidget(subtitle)
         main_layout.addLayout(header_layout)
 
+        # ===== Offline Banner =====
+        self.offline_label = QLabel()
+        self.offline_label.setStyleSheet("""
+            background: #fff3cd;
+            color: #856404;
+            border: 1px solid #ffeeba;
+            border-radius: 6px;
+            padding: 8px;
+            font-size: 13px;
+        """)
+        self.offline_label.hide()
+        main_layout.addWidget(self.offline_label)
+
+        # Check connectivity / queued sales every 5 seconds while visible
+        self.status_timer = QTimer(self)
+        self.status_timer.setInterval(5000)
+        self.status_timer.timeout.connect(self.update_sync_status)
+
         # ===== Search + Filter =====
         filter_card = QFrame()
         filter_card.setStyleSheet("""
@@ -147,10 +144,7 @@ class TransactionsPanel(QWidget):
 
         self.category_filter = QComboBox()
         self.category_filter.addItem("All Categories")
-        categories = safe_query("SELECT DISTINCT category FROM products", fetch="all")
-        if categories:
-            for c in categories:
-                self.category_filter.addItem(c["category"])
+        self.category_filter.addItems(self.store.categories())
         self.category_filter.currentTextChanged.connect(self.search_products)
         self.category_filter.setStyleSheet("""
             QComboBox {
@@ -253,16 +247,8 @@ class TransactionsPanel(QWidget):
         right_layout.addWidget(self.payment_input)
 
         self.complete_btn = QPushButton("Complete Transaction")
+        self.complete_btn.setObjectName("completeButton")
         self.complete_btn.setEnabled(False)
-        self.complete_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #cccccc;
-                color: #666666;
-                border-radius: 6px;
-                padding: 10px;
-                font-weight: bold;
-            }
-        """)
         self.complete_btn.clicked.connect(self.complete_transaction)
         right_layout.addWidget(self.complete_btn)
 
@@ -270,26 +256,26 @@ class TransactionsPanel(QWidget):
 
         self.load_products()
 
+        # ✅ Rebuild the grid only when a catalog change affects what is on screen
+        self.store.rowChanged.connect(self.on_product_changed)
+        self.store.rowsInserted.connect(lambda ids: self.schedule_reload())
+        self.store.rowsRemoved.connect(lambda ids: self.schedule_reload())
+
     # ===== Load Products =====
+    @metrics.timed("transactions")
     def load_products(self, category=None, search_text=None):
-        query = "SELECT * FROM products WHERE stock > 0"
-        params = []
-
-        if category and category != "All Categories":
-            query += " AND category=%s"
-            params.append(category)
-
-        if search_text:
-            query += " AND (name LIKE %s OR id LIKE %s)"
-            like = f"%{search_text}%"
-            params.extend([like, like])
-
-        products = safe_query(query, tuple(params), fetch="all") or []
+        # The store falls back to the local catalog snapshot while the database is unreachable
+        products = self.store.search(search_text, category, in_stock=True, fields=("name", "id"))
+        self.shown = {p.id: (p.name, p.category, p.price) for p in products}
+        if self.offline and is_online():
+            sale_journal.wake()  # back online: replay queued sales now
+        self.set_offline(not is_online())
 
         for i in reversed(range(self.products_layout.count())):
             item = self.products_layout.itemAt(i).widget()
             if item:
                 item.setParent(None)
+        self.cards = {}
 
         # Always 3 columns per row
         for idx, p in enumerate(products):
@@ -302,18 +288,7 @@ class TransactionsPanel(QWidget):
             # Width will stretch to fit panel nicely
             # =======================================
 
-            card.setStyleSheet("""
-                QFrame#productCard {
-                    border: 1px solid #ccc;
-                    border-radius: 8px;
-                    padding: 10px;
-                    background: white;
-                }
-                QFrame#productCard:hover {
-                    border: 1px solid #007BFF;
-                    background: #f8f9fa;
-                }
-            """)
+            # Styled by qss/transactions.qss through object names: no per-card CSS parsing
             vbox = QVBoxLayout(card)
             vbox.setSpacing(6)
             vbox.setContentsMargins(8, 8, 8, 8)
@@ -322,30 +297,16 @@ class TransactionsPanel(QWidget):
             name.setObjectName("productName")
             name.setWordWrap(True)
             name.setMaximumHeight(40)
-            name.setStyleSheet("font-size: 13px; font-weight: bold; color: #333;")
 
             category_label = QLabel(p["category"])
-            category_label.setStyleSheet("font-size: 11px; color: #666;")
+            category_label.setObjectName("productCategory")
 
             price = QLabel(f"₱{p['price']:.2f}")
             price.setObjectName("productPrice")
-            price.setStyleSheet("font-size: 14px; font-weight: bold; color: #007BFF;")
 
             add_btn = QPushButton("Add to Cart")
+            add_btn.setObjectName("addToCartButton")
             add_btn.setFixedHeight(30)
-            add_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #007BFF;
-                    color: white;
-                    border: none;
-                    border-radius: 5px;
-                    font-weight: bold;
-                    font-size: 12px;
-                }
-                QPushButton:hover {
-                    background-color: #0056b3;
-                }
-            """)
             add_btn.clicked.connect(partial(self.add_to_cart, p))
 
             vbox.addWidget(name)
@@ -356,6 +317,7 @@ class TransactionsPanel(QWidget):
 
             row, col = divmod(idx, 3)
             self.products_layout.addWidget(card, row, col)
+            self.cards[p["id"]] = card
 
         # Make columns stretch equally to fill space
         for col in range(3):
@@ -364,6 +326,111 @@ class TransactionsPanel(QWidget):
         # Add stretch to bottom to prevent cards from stretching vertically
         self.products_layout.setRowStretch(self.products_layout.rowCount(), 1)
 
+    def set_session(self, user_id, username):
+        """Re-bind the panel to the cashier who just signed in"""
+        self.user_id = user_id
+        self.cashier_name = username
+        self.cart.clear()
+        self.refresh_cart()
+        self.payment_input.clear()
+        self.search_input.clear()
+
+    def on_product_changed(self, pid):
+        """Only name/category/price changes, or stock running out or coming back, affect the grid"""
+        p = self.store.get(pid)
+        visible = p is not None and p.stock > 0 and self.matches_filter(p)
+        key = (p.name, p.category, p.price) if visible else None
+        if self.shown.get(pid) == key:
+            return
+        if key is None and pid in self.cards:
+            self.remove_card(pid)  # sold out: drop just this card
+        else:
+            self.schedule_reload()
+
+    def remove_card(self, pid):
+        """Take one card out of the grid and close the gap without rebuilding the others"""
+        self.shown.pop(pid, None)
+        card = self.cards.pop(pid)
+        self.products_layout.removeWidget(card)
+        card.deleteLater()
+
+        for card in self.cards.values():
+            self.products_layout.removeWidget(card)
+        for idx, card in enumerate(self.cards.values()):
+            row, col = divmod(idx, 3)
+            self.products_layout.addWidget(card, row, col)
+
+    def matches_filter(self, product):
+        category = self.category_filter.currentText()
+        text = self.search_input.text().strip().lower()
+        return (category == "All Categories" or product.category == category) and \
+            (not text or text in product.name.lower() or text in str(product.id))
+
+    def schedule_reload(self):
+        """Coalesce a burst of catalog signals into one grid rebuild"""
+        if not self.reload_pending:
+            self.reload_pending = True
+            QTimer.singleShot(0, self.reload_products)
+
+    def reload_products(self):
+        self.reload_pending = False
+        for name in self.store.categories():
+            if self.category_filter.findText(name) < 0:
+                self.category_filter.addItem(name)
+        self.search_products()
+
+    def set_offline(self, offline):
+        """Show or hide the offline banner with the number of queued and failed sales"""
+        self.offline = offline
+        queued = sale_journal.pending_count()
+        failed = sale_journal.failed_count()
+        lines = []
+        if offline:
+            lines.append(f"⚠️ Offline — selling from the saved catalog. {queued} sale(s) waiting to sync.")
+        elif queued:
+            lines.append(f"⏳ Syncing {queued} sale(s) to the database...")
+        if failed:
+            lines.append(f"❌ {failed} sale(s) could not be saved to the database. Please tell a manager.")
+        self.offline_label.setText("\n".join(lines))
+        self.offline_label.setVisible(bool(lines))
+
+    def check_stock(self, items):
+        """
+        (short lines, offline) for the cart, checked against the database while
+        it is reachable, else against the catalog's last known stock (which
+        includes this lane's queued sales). Short lines are None when the
+        database is reachable but the check failed.
+        """
+        if is_online():
+            try:
+                return get_stock_shortages(items), False
+            except Exception as e:
+                print(f"❌ Stock check failed: {e}")
+                if is_online():
+                    return None, False  # not a connection problem: don't sell blind
+        known = {item["id"]: getattr(self.store.get(item["id"]), "stock", 0) for item in items}
+        return find_shortages(items, known), True
+
+    def update_sync_status(self):
+        """
+        Timer tick: reload from the database once the journal's sync worker
+        has found it reachable again (is_online() only reads its flag).
+        """
+        if self.offline and is_online():
+            self.store.refresh()
+            self.search_products()
+        else:
+            self.set_offline(self.offline)
+
+    def showEvent(self, event):
+        if not self.status_timer.isActive():
+            self.status_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.status_timer.stop()
+        super().hideEvent(event)
+
     def search_products(self):
         text = self.search_input.text().strip()
         category = self.category_filter.currentText()
@@ -385,6 +452,7 @@ class TransactionsPanel(QWidget):
         self.refresh_cart()
 
     # ===== Refresh Cart Table =====
+    @metrics.timed("transactions")
     def refresh_cart(self):
         self.cart_table.setRowCount(0)
         for item in self.cart:
@@ -401,50 +469,21 @@ class TransactionsPanel(QWidget):
             action_layout.setSpacing(5)
 
             minus_btn = QPushButton("-")
+            minus_btn.setObjectName("qtyButton")
             minus_btn.setFixedSize(30, 30)
-            minus_btn.setStyleSheet("""
-                QPushButton {
-                    font-size: 16px;
-                    font-weight: bold;
-                    border: 1px solid #ccc;
-                    border-radius: 4px;
-                    background-color: #007BFF;
-                }
-                QPushButton:hover {
-                    background-color: #0056b3;
-                }
-            """)
             minus_btn.clicked.connect(partial(self.update_quantity, item["id"], -1))
 
             qty_input = QLineEdit(str(item["qty"]))
             qty_input.setAlignment(Qt.AlignmentFlag.AlignCenter)
             qty_input.setFixedWidth(45)
+            qty_input.setObjectName("qtyInput")
             qty_input.setFixedHeight(30)
-            qty_input.setStyleSheet("""
-                QLineEdit {
-                    border: 1px solid #ccc;
-                    border-radius: 4px;
-                    padding: 2px;
-                    font-size: 13px;
-                }
-            """)
             qty_input.textChanged.connect(partial(self.validate_quantity_input, qty_input, item["id"]))
             qty_input.editingFinished.connect(partial(self.update_quantity_from_input, qty_input, item["id"]))
 
             plus_btn = QPushButton("+")
+            plus_btn.setObjectName("qtyButton")
             plus_btn.setFixedSize(30, 30)
-            plus_btn.setStyleSheet("""
-                QPushButton {
-                    font-size: 16px;
-                    font-weight: bold;
-                    border: 1px solid #ccc;
-                    border-radius: 4px;
-                    background-color: #007BFF;
-                }
-                QPushButton:hover {
-                    background-color: #0056b3;
-                }
-            """)
             plus_btn.clicked.connect(partial(self.update_quantity, item["id"], 1))
 
             action_layout.addWidget(minus_btn)
@@ -499,7 +538,7 @@ class TransactionsPanel(QWidget):
 
     def update_totals(self):
         subtotal = sum(item["price"] * item["qty"] for item in self.cart)
-        tax = subtotal * 0.12
+        tax = subtotal * receipt.TAX_RATE
         total = subtotal + tax
         self.subtotal_label.setText(f"Subtotal: ₱{subtotal:.2f}")
         self.tax_label.setText(f"Tax (12%): ₱{tax:.2f}")
@@ -529,46 +568,18 @@ class TransactionsPanel(QWidget):
 
         # Calculate total
         subtotal = sum(item["price"] * item["qty"] for item in self.cart)
-        tax = subtotal * 0.12
+        tax = subtotal * receipt.TAX_RATE
         total = subtotal + tax
 
         # Check if payment is valid and sufficient
         try:
             payment = float(payment_text) if payment_text else 0
-            if payment >= total and total > 0:
-                self.complete_btn.setEnabled(True)
-                self.complete_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #007BFF;
-                        color: white;
-                        border-radius: 6px;
-                        padding: 10px;
-                        font-weight: bold;
-                    }
-                    QPushButton:hover { background-color: #0056b3; }
-                """)
-            else:
-                self.complete_btn.setEnabled(False)
-                self.complete_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #cccccc;
-                        color: #666666;
-                        border-radius: 6px;
-                        padding: 10px;
-                        font-weight: bold;
-                    }
-                """)
+            ready = payment >= total and total > 0
         except ValueError:
-            self.complete_btn.setEnabled(False)
-            self.complete_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #cccccc;
-                    color: #666666;
-                    border-radius: 6px;
-                    padding: 10px;
-                    font-weight: bold;
-                }
-            """)
+            ready = False
+        # ✅ Runs on every keystroke: a property flip, re-polished only when it changes
+        self.complete_btn.setEnabled(ready)
+        theme.set_state(self.complete_btn, "ready", ready)
 
     def complete_transaction(self):
         if not self.cart:
@@ -582,7 +593,7 @@ class TransactionsPanel(QWidget):
             return
 
         subtotal = sum(item["price"] * item["qty"] for item in self.cart)
-        tax = subtotal * 0.12
+        tax = subtotal * receipt.TAX_RATE
         total = subtotal + tax
 
         if payment < total:
@@ -590,61 +601,81 @@ class TransactionsPanel(QWidget):
             return
 
         change = payment - total
+        checkout_start = time.perf_counter()
+
+        # Get cashier name (once per session)
+        if self.cashier_name is None:
+            cashier_data = safe_query("SELECT username FROM users WHERE id = %s", (self.user_id,))
+            self.cashier_name = cashier_data["username"] if cashier_data else None
+        cashier_name = self.cashier_name or "Unknown"
+
+        items = [dict(item, subtotal=round(item["price"] * item["qty"], 2)) for item in self.cart]
+        units = sum(item["qty"] for item in items)
+
+        # ✅ Refuse short lines before the sale is journaled
+        shortages, offline = self.check_stock(items)
+        if shortages is None:
+            metrics.record_checkout(time.perf_counter() - checkout_start, units, outcome="error")
+            QMessageBox.critical(self, "Error", "Transaction could not be saved. Please try again.")
+            return
+        if shortages:
+            metrics.record_checkout(time.perf_counter() - checkout_start, units, outcome="out_of_stock")
+            lines = "\n".join(f"• {s['name']}: {s['requested']} requested, {s['available']} in stock"
+                               for s in shortages)
+            QMessageBox.warning(self, "Insufficient Stock",
+                                f"Not enough stock for:\n\n{lines}\n\nAdjust the cart and try again.")
+            self.load_products()
+            return
 
-        # Show change confirmation
-        confirm = QMessageBox.information(
+        # Show change confirmation, only once the sale is sure to go through
+        shown = time.perf_counter()
+        QMessageBox.information(
             self,
             "Payment Received",
             f"Payment: ₱{payment:.2f}\nTotal: ₱{total:.2f}\n\nChange: ₱{change:.2f}",
             QMessageBox.StandardButton.Ok
         )
-
-        # Get cashier name
-        cashier_data = safe_query("SELECT username FROM users WHERE id = %s", (self.user_id,))
-        cashier_name = cashier_data["username"] if cashier_data else "Unknown"
+        checkout_start += time.perf_counter() - shown  # the cashier's time isn't checkout latency
+
+        # ✅ Journal the sale locally; the sync worker saves it to the database
+        now = datetime.datetime.now().replace(microsecond=0)
+        sale_uuid = sale_journal.submit({
+            "cashier_id": self.user_id,
+            "cashier_name": cashier_name,
+            "items": items,
+            "total_amount": round(total, 2),
+            "amount_paid": round(payment, 2),
+            "change_amount": round(change, 2),
+            "sold_at": now,
+            "offline": offline,  # stock was checked against the catalog, not the database
+        })
 
         # Prepare receipt data
-        now = datetime.datetime.now()
         receipt_data = {
             'date': now.strftime("%Y-%m-%d"),
             'time': now.strftime("%H:%M:%S"),
-            'transaction_id': '',  # Will be set after insert
+            'transaction_id': receipt.receipt_number(None, sale_uuid),  # DB id is assigned on sync
             'cashier': cashier_name,
-            'items': self.cart.copy(),
+            'items': items,
             'subtotal': subtotal,
             'tax': tax,
+            'tax_rate': receipt.TAX_RATE,
             'total': total,
             'payment': payment,
             'change': change
         }
 
-        # Process transaction - Insert into transactions table
-        safe_query("INSERT INTO transactions (user_id, total) VALUES (%s, %s)", (self.user_id, total), fetch=None)
-        transaction_id = safe_query("SELECT LAST_INSERT_ID() as id")["id"]
-
-        receipt_data['transaction_id'] = str(transaction_id).zfill(10)
-
-        # Insert transaction items
-        for item in self.cart:
-            safe_query(
-                "INSERT INTO transaction_items (transaction_id, product_id, quantity, price) VALUES (%s, %s, %s, %s)",
-                (transaction_id, item["id"], item["qty"], item["price"]), fetch=None
-            )
-            safe_query("UPDATE products SET stock = stock - %s WHERE id = %s", (item["qty"], item["id"]), fetch=None)
-
-        # Save receipt to database
-        receipt_json = json.dumps(receipt_data)
-        safe_query(
-            "INSERT INTO receipts (transaction_id, receipt_data, created_at) VALUES (%s, %s, %s)",
-            (transaction_id, receipt_json, now), fetch=None
-        )
+        metrics.record_checkout(time.perf_counter() - checkout_start, units)
 
         # Show receipt dialog
         receipt_dialog = ReceiptDialog(self, receipt_data)
         receipt_dialog.exec()
 
+        # ✅ Apply the sold quantities locally; cards that sell out drop out of the grid.
+        # The store's background refresh reconciles with the database once the sale syncs.
+        self.store.apply_sale(items)
+
         # Clear cart
         self.cart.clear()
         self.refresh_cart()
-        self.payment_input.clear()
-        self.load_products()
\ No newline at end of file
+        self.payment_input.clear()
\ No newline at end of file
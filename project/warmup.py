@@ -0,0 +1,74 @@
+# warmup.py
+"""
+Background warm-up while the login window is up.
+
+The cashier spends a few seconds typing a password; this thread uses them to
+do the work MainWindow construction would otherwise do synchronously after a
+successful sign-in:
+
+    schema    db.ensure_database() (handle_login then finds it done)
+    pool      open pooled connections so the first queries skip the handshake
+    catalog   catalog.prefetch(): snapshot + delta, or the full products table;
+              get_store() adopts the rows on the GUI thread
+    modules   import main_window and the panel modules (matplotlib included)
+
+Nothing here touches widgets or QObjects: the catalog rows are handed over as
+plain dicts and the GUI thread builds the store from them.
+"""
+import importlib
+import os
+import threading
+import time
+
+import catalog
+import db
+import metrics
+
+WARMUP_CONFIG = {
+    "enabled": os.environ.get("POS_WARMUP", "1") != "0",
+    "pool_connections": 2,
+    # Cashier-only terminals can skip the admin panels with
+    # POS_WARMUP_MODULES=main_window,transactions_panel
+    "modules": os.environ.get(
+        "POS_WARMUP_MODULES",
+        "main_window,transactions_panel,products_panel,admins_panel,dashboard_panel").split(","),
+}
+
+warmup_seconds = metrics.register(metrics.Histogram(
+    "pos_warmup_seconds", "Duration of each login warm-up stage", ("stage",)))
+
+_thread = None
+
+
+def _stage(name, func):
+    start = time.perf_counter()
+    try:
+        return func()
+    except Exception as e:
+        print(f"⚠️ Warm-up stage '{name}' failed: {e}")
+    finally:
+        warmup_seconds.observe(time.perf_counter() - start, stage=name)
+
+
+def _import_modules():
+    for name in WARMUP_CONFIG["modules"]:
+        if name.strip():
+            importlib.import_module(name.strip())
+
+
+def run():
+    """All warm-up stages, in the order MainWindow will need them"""
+    online = _stage("schema", db.ensure_database)
+    if online:
+        _stage("pool", lambda: db.pool.prefill(WARMUP_CONFIG["pool_connections"]))
+    _stage("catalog", catalog.prefetch)
+    _stage("modules", _import_modules)
+
+
+def start():
+    """Start the warm-up thread once per process (call after the login window is shown)"""
+    global _thread
+    if _thread is None and WARMUP_CONFIG["enabled"]:
+        _thread = threading.Thread(target=run, name="login-warmup", daemon=True)
+        _thread.start()
+    return _thread
@@ -0,0 +1,136 @@
+# watchdog.py
+"""
+Qt event-loop stall detector.
+
+A QTimer on the GUI thread records a heartbeat; a helper thread checks it.
+When the GUI thread has not beaten for longer than the threshold, the helper
+captures the GUI thread's Python stack, works out which panel/dialog method
+was running and writes it to a rotating stall log (logs/stall.log).
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from logging.handlers import RotatingFileHandler
+
+from PyQt6.QtCore import QObject, QTimer
+
+import metrics
+
+WATCHDOG_CONFIG = {
+    "enabled": os.environ.get("POS_STALL_WATCHDOG", "1") != "0",
+    "threshold_ms": int(os.environ.get("POS_STALL_MS", "250")),
+    "interval_ms": 50,  # heartbeat period on the GUI thread
+    "log_path": os.path.join("logs", "stall.log"),
+    "max_bytes": 1_000_000,
+    "backup_count": 5,
+}
+
+event_loop_lag = metrics.register(metrics.Histogram(
+    "pos_event_loop_lag_seconds", "Delay of the GUI heartbeat timer beyond its interval",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)))
+stalls = metrics.register(metrics.Counter(
+    "pos_event_loop_stalls_total", "GUI thread stalls longer than the threshold", ("panel", "handler")))
+
+
+def _stall_logger(path):
+    logger = logging.getLogger("techstore_pos.stall")
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=WATCHDOG_CONFIG["max_bytes"],
+                                      backupCount=WATCHDOG_CONFIG["backup_count"], encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def attribute(frame):
+    """
+    Walk a stack from the innermost frame outward and return
+    (panel, handler, entry): the widget class and method running innermost,
+    and the outermost method of a widget on the stack (the Qt entry point).
+    Widgets are recognised as `self` being a QObject subclass from this app.
+    """
+    found = []
+    while frame is not None:
+        obj = frame.f_locals.get("self")
+        if isinstance(obj, QObject) and not type(obj).__module__.startswith(("PyQt6", "watchdog")):
+            found.append((type(obj).__name__, frame.f_code.co_name))
+        frame = frame.f_back
+    if not found:
+        return None, None, None
+    panel, handler = found[0]
+    return panel, handler, f"{found[-1][0]}.{found[-1][1]}"
+
+
+class StallWatchdog(QObject):
+    def __init__(self, threshold_ms=None, interval_ms=None, log_path=None):
+        super().__init__()
+        self.threshold = (threshold_ms or WATCHDOG_CONFIG["threshold_ms"]) / 1000
+        self.interval = (interval_ms or WATCHDOG_CONFIG["interval_ms"]) / 1000
+        self.logger = _stall_logger(log_path or WATCHDOG_CONFIG["log_path"])
+        self.main_thread_id = threading.get_ident()
+
+        self._last_beat = time.perf_counter()
+        self._stop = threading.Event()
+        self._reported = None  # (beat time, panel, handler) of the stall already logged
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(self.interval * 1000))
+        self.timer.timeout.connect(self._beat)
+        self.thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+
+    def start(self):
+        self._last_beat = time.perf_counter()
+        self.timer.start()
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.timer.stop()
+
+    def _beat(self):
+        """GUI thread: record the heartbeat and how late it was"""
+        now = time.perf_counter()
+        event_loop_lag.observe(max(now - self._last_beat - self.interval, 0.0))
+        if self._reported and self._reported[0] == self._last_beat:
+            _, panel, handler = self._reported
+            self.logger.info("Stall ended after %.0f ms in %s.%s",
+                             (now - self._last_beat) * 1000, panel, handler)
+        self._last_beat = now
+
+    def _watch(self):
+        """Helper thread: capture the GUI stack when the heartbeat is overdue"""
+        while not self._stop.wait(self.interval / 2):
+            beat = self._last_beat
+            blocked = time.perf_counter() - beat - self.interval
+            if blocked < self.threshold or (self._reported and self._reported[0] == beat):
+                continue
+
+            frame = sys._current_frames().get(self.main_thread_id)
+            if frame is None:
+                continue
+            panel, handler, entry = attribute(frame)
+            stack = "".join(traceback.format_stack(frame))
+            del frame
+
+            self._reported = (beat, panel, handler)
+            stalls.inc(panel=panel or "unknown", handler=handler or "unknown")
+            self.logger.info("GUI thread blocked for %.0f ms in %s.%s (entry: %s)\n%s",
+                             blocked * 1000, panel, handler, entry, stack)
+
+
+_watchdog = None
+
+
+def start():
+    """Start the process-wide stall watchdog from the GUI thread, if enabled"""
+    global _watchdog
+    if _watchdog is None and WATCHDOG_CONFIG["enabled"]:
+        _watchdog = StallWatchdog()
+        _watchdog.start()
+    return _watchdog